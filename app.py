@@ -11,6 +11,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils import render_sidebar
+from utils.cassette import cassette_mode
+from utils.key_pool import load_api_keys
 
 # --- Configuração da página ---
 st.set_page_config(
@@ -21,7 +23,9 @@ st.set_page_config(
 )
 
 # --- Verificação da chave de API ---
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+# Aceita GEMINI_API_KEY ou um pool de chaves (GEMINI_API_KEYS / GEMINI_API_KEYS_FILE);
+# reproduzindo um cassete (FORGE_CASSETTE_MODE=replay) nenhuma chave é necessária
+GEMINI_API_KEY = bool(load_api_keys()) or cassette_mode() == 'replay'
 if not GEMINI_API_KEY:
     st.error('⚠️ **GEMINI_API_KEY não encontrada!**')
     st.markdown("""
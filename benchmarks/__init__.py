@@ -0,0 +1,4 @@
+"""
+Ferramentas de desempenho do Game Concept Forge.
+Contém o backend falso do Gemini e as suítes de benchmark executadas offline.
+"""
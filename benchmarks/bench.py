@@ -0,0 +1,342 @@
+"""
+Suíte de microbenchmarks dos caminhos quentes do Game Concept Forge.
+Roda totalmente offline contra o backend falso e compara com um baseline em JSON.
+
+Uso:
+    python -m benchmarks.bench                   # executa e imprime os resultados
+    python -m benchmarks.bench --save            # grava o baseline
+    python -m benchmarks.bench --compare         # compara com o baseline e falha em regressões
+    python -m benchmarks.bench --filter render   # executa apenas os casos que contêm "render"
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from streamlit import config as streamlit_config  # noqa: E402
+import streamlit.logger as streamlit_logger  # noqa: E402
+
+from benchmarks.fake_gemini import fake_backend, fake_payload  # noqa: E402
+from benchmarks.stub_server import stub_backend  # noqa: E402
+
+DEFAULT_BASELINE = ROOT_DIR / "benchmarks" / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+# Cada caso é uma factory: faz o setup e devolve uma função de amostra que
+# retorna {"seconds": <tempo por chamada>, **métricas extras}.
+Sample = Callable[[], Dict[str, float]]
+_CASES: Dict[str, Callable[[], Sample]] = {}
+
+
+def benchmark(name: str):
+    """Registra uma factory de benchmark com o nome informado."""
+    def decorator(factory: Callable[[], Sample]) -> Callable[[], Sample]:
+        _CASES[name] = factory
+        return factory
+    return decorator
+
+
+def _loop(fn: Callable[[], Any], number: int) -> Sample:
+    """Amostra que executa `fn` `number` vezes e retorna o tempo médio por chamada."""
+    def sample() -> Dict[str, float]:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return {"seconds": (time.perf_counter() - start) / number}
+    return sample
+
+
+def _load_mock_gdd() -> Dict[str, Any]:
+    with open(ROOT_DIR / "data" / "mock_game_design.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sample_pitch_deck() -> Dict[str, Any]:
+    from utils.schemas import PITCH_DECK_SCHEMA
+    return fake_payload(PITCH_DECK_SCHEMA)
+
+
+# --- PDF ---
+@benchmark("pdf.generate_pitch_deck_pdf")
+def _bench_pdf() -> Sample:
+    from utils.pdf_generator import generate_pitch_deck_pdf
+    pitch_deck = _sample_pitch_deck()
+    return _loop(lambda: generate_pitch_deck_pdf(pitch_deck), 3)
+
+
+# --- Decodificação e validação dos schemas ---
+def _make_schema_case(schema_name: str):
+    def factory() -> Sample:
+        from utils.schemas import RESPONSE_SCHEMAS, validate_against_schema
+        schema = RESPONSE_SCHEMAS[schema_name]
+        raw = json.dumps(fake_payload(schema), ensure_ascii=False)
+
+        def decode_and_validate():
+            errors = validate_against_schema(json.loads(raw), schema, require_all=True)
+            assert not errors, errors
+        return _loop(decode_and_validate, 1000)
+    return factory
+
+
+def _register_schema_cases():
+    from utils.schemas import RESPONSE_SCHEMAS
+    for schema_name in RESPONSE_SCHEMAS:
+        benchmark(f"schema.{schema_name}.decode_validate")(_make_schema_case(schema_name))
+
+
+_register_schema_cases()
+
+
+@benchmark("schema.pitch_deck.repair_truncated")
+def _bench_repair_truncated() -> Sample:
+    from utils.json_repair import parse_json_response
+    from utils.schemas import PITCH_DECK_SCHEMA
+    raw = json.dumps(_sample_pitch_deck(), ensure_ascii=False)
+    # Corta no último campo, como uma resposta interrompida por MAX_TOKENS
+    truncated = raw[:raw.rindex('"') - 3]
+
+    number = 200
+
+    def sample() -> Dict[str, float]:
+        # Um reparo rejeitado não pode passar despercebido como uma iteração rápida
+        rejected = 0
+        start = time.perf_counter()
+        for _ in range(number):
+            try:
+                parse_json_response(truncated, PITCH_DECK_SCHEMA)
+            except ValueError:
+                rejected += 1
+        return {"seconds": (time.perf_counter() - start) / number, "rejected": rejected}
+    return sample
+
+
+# --- Construção do prompt do pitch deck ---
+@benchmark("prompt.build_pitch_deck_prompt")
+def _bench_pitch_deck_prompt() -> Sample:
+    from utils.gemini_client import GeminiClient
+    concept = _load_mock_gdd()
+    return _loop(lambda: GeminiClient.build_pitch_deck_prompt(concept), 2000)
+
+
+@benchmark("client.generate_pitch_deck")
+def _bench_generate_pitch_deck() -> Sample:
+    from utils.gemini_client import GeminiClient
+    concept = _load_mock_gdd()
+    with fake_backend():
+        client = GeminiClient()
+    return _loop(lambda: client.generate_pitch_deck(concept), 20)
+
+
+@benchmark("client.generate_pitch_deck.http")
+def _bench_generate_pitch_deck_http() -> Sample:
+    # Mesmo caso pelo SDK real e HTTP local: mede o custo do lado do cliente que o backend falso esconde
+    from utils.gemini_client import GeminiClient
+    concept = _load_mock_gdd()
+
+    def sample() -> Dict[str, float]:
+        with stub_backend():
+            client = GeminiClient()
+            start = time.perf_counter()
+            for _ in range(20):
+                client.generate_pitch_deck(concept)
+            return {"seconds": (time.perf_counter() - start) / 20}
+    return sample
+
+
+# --- Import a frio (cold start do servidor e primeiro acesso às páginas) ---
+def _make_import_case(module: str):
+    def factory() -> Sample:
+        from utils.diagnostics import measure_cold_import
+
+        def sample() -> Dict[str, float]:
+            entry = measure_cold_import(module, top=0)
+            return {"seconds": entry["total_ms"] / 1000, "modules_loaded": entry["modules_loaded"]}
+        return sample
+    return factory
+
+
+for _module in ("utils", "utils.sidebar", "utils.gemini_client", "utils.pdf_generator"):
+    benchmark(f"import.{_module}")(_make_import_case(_module))
+
+
+# --- Histórico da sessão ---
+@benchmark("session.history_cycle")
+def _bench_session_history() -> Sample:
+    import streamlit as st
+    from utils.sidebar import add_to_concept_history, clear_session_data, get_session_summary
+    gdd = _load_mock_gdd()
+
+    def cycle():
+        st.session_state['current_gdd'] = gdd
+        for i in range(20):
+            add_to_concept_history(f"Conceito {i}", gdd, "ideia")
+        get_session_summary()
+        clear_session_data()
+        st.session_state.concept_history = []
+    return _loop(cycle, 50)
+
+
+# --- Renderização das páginas via AppTest ---
+def _tree_stats(app_test) -> Dict[str, float]:
+    """Conta os elementos renderizados e o tamanho total dos protos enviados."""
+    elements = 0
+    payload = 0
+    stack = [app_test._tree]
+    while stack:
+        node = stack.pop()
+        proto = getattr(node, "proto", None)
+        if proto is not None and not getattr(node, "children", None):
+            elements += 1
+            payload += proto.ByteSize()
+        stack.extend(getattr(node, "children", {}).values())
+    return {"elements": elements, "payload_bytes": payload}
+
+
+def _page_case(page_file: str, button_prefix: Optional[str], session: Dict[str, Any],
+               text_input: Optional[str] = None) -> Callable[[], Sample]:
+    def factory() -> Sample:
+        from streamlit.testing.v1 import AppTest
+        from benchmarks.load_test import finish_jobs
+        path = str(ROOT_DIR / "pages" / page_file)
+
+        def sample() -> Dict[str, float]:
+            with fake_backend():
+                at = AppTest.from_file(path, default_timeout=60)
+                for key, value in session.items():
+                    at.session_state[key] = value
+                at.run()
+                if text_input is not None:
+                    at.text_area[0].input(text_input)
+                if button_prefix is not None:
+                    next(b for b in at.button if b.label.startswith(button_prefix)).click()
+                start = time.perf_counter()
+                at.run()
+                finish_jobs(at, 60)
+                elapsed = time.perf_counter() - start
+            if at.exception:
+                raise RuntimeError(f"{page_file}: {at.exception[0].message}")
+            return {"seconds": elapsed, **_tree_stats(at)}
+        return sample
+    return factory
+
+
+def _register_page_cases():
+    gdd = _load_mock_gdd()
+    concept_session = {'current_gdd': gdd, 'current_concept': gdd['premissa_conceito_central']}
+    cases = {
+        "render.display_gdd_concept": ("01_concept_generator.py", "🚀", {}, "Um roguelike de cartas no Rio antigo"),
+        "render.display_competitor_analysis": ("02_competitor_analysis.py", "🔍 Analisar", concept_session, None),
+        "render.display_core_loop_detailed": ("03_core_loop_developer.py", "🔄 Desenvolver", concept_session, None),
+        "render.display_game_flow": ("04_game_flow_creator.py", "🎯 Criar", concept_session, None),
+        "render.display_pitch_deck": ("05_pitch_deck_creator.py", None,
+                                      {**concept_session, 'current_pitch_deck': _sample_pitch_deck()}, None),
+    }
+    # Cada página é medida nos dois modos de renderização para comparar deltas e payload
+    for mode in ('per_item', 'coalesced'):
+        for name, (page_file, button_prefix, session, text_input) in cases.items():
+            benchmark(f"{name}[{mode}]")(
+                _page_case(page_file, button_prefix, {**session, 'render_mode': mode}, text_input)
+            )
+
+
+_register_page_cases()
+
+
+# --- Execução e comparação ---
+def run_benchmarks(name_filter: Optional[List[str]] = None, repeat: int = 5) -> Dict[str, Dict[str, Any]]:
+    """Executa os casos selecionados e retorna as estatísticas por caso."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, factory in _CASES.items():
+        if name_filter and not any(f in name for f in name_filter):
+            continue
+        sample = factory()
+        sample()  # aquecimento
+        samples = [sample() for _ in range(repeat)]
+        seconds = [s["seconds"] for s in samples]
+        metrics = {k: v for k, v in samples[-1].items() if k != "seconds"}
+        results[name] = {
+            "median": statistics.median(seconds),
+            "min": min(seconds),
+            "mean": statistics.fmean(seconds),
+            "stdev": statistics.stdev(seconds) if len(seconds) > 1 else 0.0,
+            "samples": len(seconds),
+            "metrics": metrics,
+        }
+        print(f"{name:<45} {results[name]['median'] * 1000:>10.3f} ms  {_format_metrics(metrics)}")
+    return results
+
+
+def compare_results(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                    threshold: float = DEFAULT_THRESHOLD, stat: str = "min") -> List[str]:
+    """Compara a estatística escolhida com o baseline e retorna os casos que regrediram além do limite."""
+    regressions = []
+    print(f"\n{'caso':<45} {'baseline':>12} {'atual':>12} {'variação':>10}")
+    for name, result in current.items():
+        if name not in baseline:
+            print(f"{name:<45} {'-':>12} {result[stat] * 1000:>9.3f} ms {'novo':>10}")
+            continue
+        base = baseline[name][stat]
+        ratio = result[stat] / base if base else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  <-- REGRESSÃO"
+        print(f"{name:<45} {base * 1000:>9.3f} ms {result[stat] * 1000:>9.3f} ms {ratio - 1:>+9.1%}{flag}")
+    return regressions
+
+
+def _format_metrics(metrics: Dict[str, float]) -> str:
+    return " ".join(f"{k}={v:g}" for k, v in metrics.items())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks do Game Concept Forge")
+    parser.add_argument("--filter", nargs="*", help="Executa apenas casos cujo nome contém um dos termos")
+    parser.add_argument("--repeat", type=int, default=5, help="Número de amostras por caso")
+    parser.add_argument("--save", nargs="?", const=str(DEFAULT_BASELINE), help="Grava os resultados como baseline")
+    parser.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE), help="Compara com um baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Variação relativa tolerada antes de sinalizar regressão")
+    parser.add_argument("--stat", choices=["min", "median", "mean"], default="min",
+                        help="Estatística comparada (min é a mais estável em máquinas compartilhadas)")
+    args = parser.parse_args(argv)
+
+    # Em modo bare o Streamlit avisa a cada acesso ao session_state
+    streamlit_config.set_option("logger.level", "error")
+    streamlit_logger.set_log_level("error")
+
+    results = run_benchmarks(args.filter, args.repeat)
+
+    if args.save:
+        payload = {
+            "meta": {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        Path(args.save).write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nBaseline gravado em {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"]
+        regressions = compare_results(results, baseline, args.threshold, args.stat)
+        if regressions:
+            print(f"\n{len(regressions)} regressão(ões) acima de {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNenhuma regressão acima do limite.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Backend falso do Gemini para benchmarks e testes de carga offline.
+Responde com objetos reais de `google.genai.types`, preenchendo o response
+schema da requisição com dados sintéticos determinísticos.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Iterator, Optional
+
+from google import genai
+from google.genai import types
+
+from utils.key_pool import reset_key_pool
+
+IMAGE_MODEL_MARKER = "image"
+
+_WORDS = (
+    "jogador cidade carta mapa recurso torre herói missão cristal reino mercado "
+    "estratégia progressão clã arena evento desafio baralho relíquia exploração "
+    "comércio diplomacia crafting coleção batalha narrativa mistério ritmo energia"
+).split()
+
+
+def _schema_to_dict(schema: Any) -> Dict[str, Any]:
+    """Normaliza dicts e `types.Schema` para o formato de dict do app."""
+    if schema is None:
+        return {}
+    if hasattr(schema, "model_dump"):
+        return schema.model_dump(exclude_none=True, mode="json")
+    return schema
+
+
+def _sentence(rng: random.Random, min_words: int = 6, max_words: int = 18) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def fake_payload(schema: Any, rng: Optional[random.Random] = None, list_size: int = 5) -> Any:
+    """Gera um valor sintético compatível com o schema (dict ou REST)."""
+    rng = rng or random.Random(0)
+    schema = _schema_to_dict(schema)
+    kind = str(schema.get("type", "string")).lower()
+
+    if kind == "object":
+        return {
+            key: fake_payload(sub_schema, rng, list_size)
+            for key, sub_schema in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = rng.randint(max(1, list_size - 2), list_size + 2)
+        return [fake_payload(schema.get("items", {}), rng, list_size) for _ in range(count)]
+    if kind in ("number", "integer"):
+        return rng.randint(1, 1000)
+    if kind == "boolean":
+        return rng.random() > 0.5
+    return _sentence(rng)
+
+
+@lru_cache(maxsize=4)
+def fake_image_bytes(size: int = 512) -> bytes:
+    """PNG sintético (gradiente) usado como resposta do modelo de imagem."""
+    from PIL import Image
+
+    image = Image.new("RGB", (size, size))
+    image.putdata([(x % 256, y % 256, (x + y) % 256) for y in range(size) for x in range(size)])
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _FakeModels:
+    """Imita `genai.Client().models` com latência configurável."""
+
+    def __init__(self, latency: float, tokens_per_second: float, jitter: float, truncate_rate: float = 0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.truncate_rate = truncate_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+        # Texto parcial devolvido com MAX_TOKENS -> texto completo (para as continuações)
+        self._truncated: Dict[str, str] = {}
+
+    def _continuation(self, contents: Any) -> Optional[str]:
+        """Se a requisição é uma continuação de uma resposta truncada, devolve o trecho que falta."""
+        if not isinstance(contents, list):
+            return None
+        for content in contents:
+            if getattr(content, "role", None) == "model":
+                partial = "".join(part.text or "" for part in content.parts)
+                with self._lock:
+                    full = self._truncated.pop(partial, None)
+                if full is not None:
+                    return full[len(partial):]
+        return None
+
+    def _sleep(self, output_tokens: int, rng: random.Random):
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += output_tokens / self.tokens_per_second
+        if self.jitter:
+            delay *= 1 + rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def generate_content(self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None):
+        with self._lock:
+            self.calls += 1
+        prompt = contents if isinstance(contents, str) else json.dumps(contents, default=str)
+        # Como na API, a seed da config muda a resposta (modo variações do Concept Generator)
+        config_seed = getattr(config, "seed", None) if config else None
+        key = f"{model}:{prompt}" if config_seed is None else f"{model}:{prompt}:{config_seed}"
+        seed = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+
+        finish_reason = types.FinishReason.STOP
+        continuation = self._continuation(contents)
+        if continuation is not None:
+            text = continuation
+            parts = [types.Part(text=text)]
+        elif IMAGE_MODEL_MARKER in model:
+            parts = [
+                types.Part(text="Arte conceitual gerada."),
+                types.Part.from_bytes(data=fake_image_bytes(), mime_type="image/png"),
+            ]
+            text = ""
+        else:
+            schema = getattr(config, "response_schema", None) if config else None
+            text = json.dumps(fake_payload(schema, rng), ensure_ascii=False) if schema else _sentence(rng, 40, 80)
+            if schema and self.truncate_rate and rng.random() < self.truncate_rate:
+                # Simula o corte por limite de tokens no meio do JSON
+                full, text = text, text[:rng.randint(len(text) // 3, len(text) - 1)]
+                with self._lock:
+                    self._truncated[text] = full
+                finish_reason = types.FinishReason.MAX_TOKENS
+            parts = [types.Part(text=text)]
+
+        output_tokens = _estimate_tokens(text) if text else 1290
+        self._sleep(output_tokens, rng)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(
+                content=types.Content(role="model", parts=parts),
+                finish_reason=finish_reason,
+            )],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=_estimate_tokens(prompt),
+                candidates_token_count=output_tokens,
+                total_token_count=_estimate_tokens(prompt) + output_tokens,
+            ),
+        )
+
+
+class FakeGenaiClient:
+    """Substituto de `genai.Client` que nunca acessa a rede."""
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0, jitter: float = 0.0,
+                 truncate_rate: float = 0.0, **_: Any):
+        self.models = _FakeModels(latency, tokens_per_second, jitter, truncate_rate)
+
+
+@contextmanager
+def fake_backend(latency: float = 0.0, tokens_per_second: float = 0.0, jitter: float = 0.0,
+                 truncate_rate: float = 0.0) -> Iterator[None]:
+    """
+    Substitui `genai.Client` pelo cliente falso enquanto o contexto estiver ativo.
+
+    Args:
+        latency: Latência base por chamada, em segundos
+        tokens_per_second: Taxa de geração simulada (0 = instantânea)
+        jitter: Variação relativa aleatória aplicada à latência (0.2 = ±20%)
+        truncate_rate: Fração das respostas JSON cortadas com finish_reason MAX_TOKENS
+    """
+    original_client = genai.Client
+    original_key = os.environ.get("GEMINI_API_KEY")
+    os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+    genai.Client = lambda *args, **kwargs: FakeGenaiClient(latency, tokens_per_second, jitter, truncate_rate)
+    # O pool guarda um cliente por chave: recria para usar o cliente falso
+    reset_key_pool()
+    try:
+        yield
+    finally:
+        genai.Client = original_client
+        reset_key_pool()
+        if original_key is None:
+            os.environ.pop("GEMINI_API_KEY", None)
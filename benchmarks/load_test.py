@@ -0,0 +1,243 @@
+"""
+Teste de carga com sessões concorrentes simuladas nas páginas do Streamlit.
+Cada sessão percorre as páginas 01 a 05 via `streamlit.testing` contra o backend
+falso (com latência realista), aumentando a concorrência em degraus. Com
+`--backend stub`, as chamadas passam pelo SDK real e por HTTP até o stand-in local
+(benchmarks/stub_server.py), incluindo serialização e 429 injetados.
+
+Todas as sessões rodam em um único processo, como no servidor: dividem o escalonador,
+o pool de chaves, o gerenciador de jobs e os caches, e o RSS e as threads medidos são
+os desse processo. Só a execução do script pelo AppTest é serializada (`run_page`),
+porque ele troca o Runtime global do Streamlit a cada execução; as gerações rodam nos
+jobs em segundo plano, em paralelo, enquanto as sessões esperam por elas.
+
+Uso:
+    python -m benchmarks.load_test --levels 1,4,8,16 --latency 1.5 --tokens-per-second 250
+    python -m benchmarks.load_test --backend stub --levels 4,8 --throttle-rate 0.05
+    python -m benchmarks.load_test --levels 2,4 --rounds 1 --output load.json
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from streamlit import config as streamlit_config  # noqa: E402
+import streamlit.logger as streamlit_logger  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from benchmarks.fake_gemini import fake_backend  # noqa: E402
+from benchmarks.stub_server import StubBehavior, stub_backend  # noqa: E402
+
+# Página, prefixo do botão de geração e se a página usa o text_area da ideia
+PAGE_FLOW = [
+    ("01_concept_generator.py", "🚀 Gerar Conceito", True),
+    ("02_competitor_analysis.py", "🔍 Analisar", False),
+    ("03_core_loop_developer.py", "🔄 Desenvolver", False),
+    ("04_game_flow_creator.py", "🎯 Criar", False),
+    ("05_pitch_deck_creator.py", "🚀 Gerar Pitch Deck", False),
+]
+SESSION_KEYS = ('current_gdd', 'current_concept', 'concept_history', 'analysis_history',
+                'core_loop_history', 'flow_history', 'pitch_deck_history', 'current_pitch_deck')
+# Com --prefetch, a sessão (e os jobs pré-carregados dela) também passa de uma página para outra
+PREFETCH_KEYS = ('_forge_session_id', 'prefetch_enabled', '_prefetch_jobs', '_prefetch_stale', '_prefetch_stats')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil pelo método nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def current_rss_mb() -> float:
+    """RSS atual do processo em MB (Linux); usa o pico do getrusage como fallback."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ResourceMonitor:
+    """Amostra RSS e número de threads em segundo plano e guarda os picos."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-monitor", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "ResourceMonitor":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# O AppTest instala um Runtime falso em `Runtime._instance` durante cada execução e o
+# remove ao final: duas execuções simultâneas no mesmo processo se atropelam
+_run_lock = threading.Lock()
+
+
+def run_page(at: AppTest) -> AppTest:
+    """Executa o script da página; uma execução por vez no processo."""
+    with _run_lock:
+        return at.run()
+
+
+def finish_jobs(at: AppTest, timeout: float):
+    """Aguarda os jobs em segundo plano da sessão e reexecuta a página para coletá-los."""
+    from utils.jobs import SESSION_ID_KEY, get_job_manager
+    if SESSION_ID_KEY in at.session_state:
+        manager = get_job_manager()
+        session_id = at.session_state[SESSION_ID_KEY]
+        # Jobs derivados (as artes do conceito) surgem enquanto o job que os enviou roda
+        while not all(job.finished for job in manager.session_jobs(session_id)):
+            if not manager.wait_session(session_id, timeout):
+                raise TimeoutError("jobs em segundo plano não terminaram a tempo")
+    run_page(at)
+
+
+def run_session(idea: str, timeout: float, prefetch: bool = False) -> Dict[str, float]:
+    """Percorre as cinco páginas como um usuário e retorna a latência de cada geração."""
+    latencies: Dict[str, float] = {}
+    state: Dict[str, Any] = {'prefetch_enabled': True} if prefetch else {}
+    keys = SESSION_KEYS + PREFETCH_KEYS if prefetch else SESSION_KEYS
+    for page_file, button_prefix, uses_idea in PAGE_FLOW:
+        at = AppTest.from_file(str(ROOT_DIR / "pages" / page_file), default_timeout=timeout)
+        for key, value in state.items():
+            at.session_state[key] = value
+        run_page(at)
+        if uses_idea:
+            at.text_area[0].input(idea)
+        next(b for b in at.button if b.label.startswith(button_prefix)).click()
+        start = time.perf_counter()
+        run_page(at)
+        finish_jobs(at, timeout)
+        latencies[page_file] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{page_file}: {at.exception[0].message}")
+        state = {key: at.session_state[key] for key in keys if key in at.session_state}
+    return latencies
+
+
+def run_level(concurrency: int, rounds: int, timeout: float, prefetch: bool = False) -> Dict[str, Any]:
+    """Executa `concurrency` sessões simultâneas por `rounds` rodadas."""
+    per_page: Dict[str, List[float]] = {page: [] for page, _, _ in PAGE_FLOW}
+    errors: List[str] = []
+    total_sessions = concurrency * rounds
+
+    with ResourceMonitor() as monitor:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as pool:
+            futures = [
+                pool.submit(run_session, f"Ideia de jogo número {i}: cartas e exploração", timeout, prefetch)
+                for i in range(total_sessions)
+            ]
+            for future in futures:
+                try:
+                    for page, latency in future.result().items():
+                        per_page[page].append(latency)
+                except Exception as e:
+                    errors.append(str(e))
+        wall = time.perf_counter() - start
+
+    generations = sum(len(v) for v in per_page.values())
+    return {
+        "concurrency": concurrency,
+        "sessions": total_sessions,
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_generations_per_s": generations / wall if wall else 0.0,
+        "throughput_sessions_per_min": 60 * (total_sessions - len(errors)) / wall if wall else 0.0,
+        "peak_rss_mb": monitor.peak_rss_mb,
+        "peak_threads": monitor.peak_threads,
+        "pages": {
+            page: {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "count": len(values),
+            }
+            for page, values in per_page.items()
+        },
+    }
+
+
+def print_level(result: Dict[str, Any]):
+    print(f"\n=== Concorrência {result['concurrency']} "
+          f"({result['sessions']} sessões, {result['wall_seconds']:.1f}s) ===")
+    print(f"Throughput: {result['throughput_generations_per_s']:.2f} gerações/s, "
+          f"{result['throughput_sessions_per_min']:.1f} sessões/min | "
+          f"RSS pico: {result['peak_rss_mb']:.0f} MB | threads pico: {result['peak_threads']}")
+    print(f"{'página':<30} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for page, stats in result["pages"].items():
+        print(f"{page:<30} {stats['p50']:>7.2f}s {stats['p95']:>7.2f}s {stats['p99']:>7.2f}s")
+    if result["errors"]:
+        print(f"Erros ({len(result['errors'])}): {result['errors'][0]}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões concorrentes")
+    parser.add_argument("--levels", default="1,2,4,8", help="Níveis de concorrência, separados por vírgula")
+    parser.add_argument("--rounds", type=int, default=2, help="Rodadas de sessões por nível")
+    parser.add_argument("--latency", type=float, default=1.5, help="Latência base do backend falso (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="Taxa de geração simulada")
+    parser.add_argument("--jitter", type=float, default=0.3, help="Variação relativa da latência")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout de cada execução de página (s)")
+    parser.add_argument("--backend", choices=["fake", "stub"], default="fake",
+                        help="fake: cliente falso em processo; stub: SDK real contra o servidor HTTP local")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fração das chamadas respondidas com 429 (apenas --backend stub)")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Liga o pré-carregamento especulativo das páginas 02–04")
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    streamlit_config.set_option("logger.level", "error")
+    streamlit_logger.set_log_level("error")
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    results = []
+    if args.backend == "stub":
+        backend = stub_backend(StubBehavior(args.latency, args.tokens_per_second, args.jitter, args.throttle_rate))
+    else:
+        backend = fake_backend(latency=args.latency, tokens_per_second=args.tokens_per_second, jitter=args.jitter)
+    with backend:
+        for concurrency in levels:
+            result = run_level(concurrency, args.rounds, args.timeout, args.prefetch)
+            print_level(result)
+            results.append(result)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultados gravados em {args.output}")
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
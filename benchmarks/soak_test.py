@@ -0,0 +1,227 @@
+"""
+Teste de longa duração (soak) para crescimento de memória e vazamentos.
+Repete milhares de ciclos gerar → carregar do histórico → exportar nas cinco páginas
+via `streamlit.testing`, contra o backend falso. Sessões simuladas se alternam e são
+descartadas a cada `--session-cycles` ciclos, como usuários que saem.
+
+Ao longo do tempo, acompanha:
+- RSS do processo;
+- alocações Python (tracemalloc);
+- threads e descritores de arquivo;
+- tamanho do cache do Streamlit e dos registros em memória do app (jobs, traces);
+- tamanho do session_state.
+
+Depois do aquecimento, o crescimento por ciclo é a inclinação da regressão linear de
+cada métrica. O teste falha se alguma passar do limite e mostra as linhas que mais
+cresceram no tracemalloc: buffers de `generate_pitch_deck_pdf`, imagens e históricos
+de sessão que não são liberados aparecem aí antes do release.
+
+Uso:
+    python -m benchmarks.soak_test --cycles 2000
+    python -m benchmarks.soak_test --cycles 100 --warmup 20 --sample-every 5 --output soak.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from streamlit import config as streamlit_config  # noqa: E402
+import streamlit.logger as streamlit_logger  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from benchmarks.fake_gemini import fake_backend  # noqa: E402
+from benchmarks.load_test import PAGE_FLOW, SESSION_KEYS, current_rss_mb, finish_jobs  # noqa: E402
+
+# Botão "carregar do histórico" de cada página (o primeiro item do histórico)
+HISTORY_BUTTONS = {
+    "01_concept_generator.py": "load_0",
+    "02_competitor_analysis.py": "load_analysis_0",
+    "03_core_loop_developer.py": "load_core_loop_0",
+    "04_game_flow_creator.py": "load_flow_0",
+    "05_pitch_deck_creator.py": "load_pitch_1",
+}
+EXPORT_JSON_LABEL = "📄 Exportar como JSON"
+
+# A sessão simulada leva o próprio identificador (jobs, traces) de uma página para outra
+CARRIED_KEYS = SESSION_KEYS + ('_forge_session_id', 'competitor_analysis', 'core_loop_detailed', 'game_flow')
+
+
+def open_fds() -> Optional[int]:
+    """Descritores de arquivo abertos pelo processo (None fora do Linux)."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def cache_sizes() -> Dict[str, int]:
+    """Tamanho dos caches do Streamlit e dos registros em memória do app."""
+    from streamlit.runtime.caching import get_data_cache_stats_provider
+
+    from utils import tracing
+    from utils.jobs import get_job_manager
+
+    manager = get_job_manager()
+    families = get_data_cache_stats_provider().get_stats()
+    return {
+        'st_cache_data_bytes': sum(stat.byte_length for stats in families.values() for stat in stats),
+        'jobs': len(getattr(manager, '_jobs', ())),
+        'traces': len(tracing._traces),
+    }
+
+
+def run_cycle(state: Dict[str, Any], idea: str, timeout: float) -> Dict[str, Any]:
+    """Gera, carrega do histórico e exporta em cada página; retorna o session_state levado adiante."""
+    from utils import generate_pitch_deck_pdf
+
+    for page_file, button_prefix, uses_idea in PAGE_FLOW:
+        at = AppTest.from_file(str(ROOT_DIR / "pages" / page_file), default_timeout=timeout)
+        for key, value in state.items():
+            at.session_state[key] = value
+        at.run()
+        if uses_idea:
+            at.text_area[0].input(idea)
+        next(b for b in at.button if b.label.startswith(button_prefix)).click()
+        at.run()
+        finish_jobs(at, timeout)
+
+        at.button(key=HISTORY_BUTTONS[page_file]).click()
+        at.run()
+        export = next((b for b in at.button if b.label == EXPORT_JSON_LABEL), None)
+        if export is not None:
+            export.click()
+            at.run()
+        if at.exception:
+            raise RuntimeError(f"{page_file}: {at.exception[0].message}")
+        state = {key: at.session_state[key] for key in CARRIED_KEYS if key in at.session_state}
+
+    # Exportação do PDF fora do cache da página: cada ciclo monta um buffer novo
+    generate_pitch_deck_pdf(state['current_pitch_deck']).getvalue()
+    return state
+
+
+def sample(cycle: int, sessions: List[Dict[str, Any]], trace_heap: bool) -> Dict[str, Any]:
+    from utils.memory import measure_state
+
+    gc.collect()
+    return {
+        'cycle': cycle,
+        'time': time.time(),
+        'rss_mb': current_rss_mb(),
+        'heap_kb': tracemalloc.get_traced_memory()[0] / 1024 if trace_heap else None,
+        'threads': threading.active_count(),
+        'fds': open_fds(),
+        'session_state_kb': max((measure_state(s)['total_bytes'] for s in sessions), default=0) / 1024,
+        **cache_sizes(),
+    }
+
+
+def slope(samples: List[Dict[str, Any]], metric: str) -> Optional[float]:
+    """Crescimento por ciclo (inclinação da regressão linear) de uma métrica."""
+    points = [(s['cycle'], s[metric]) for s in samples if s.get(metric) is not None]
+    if len(points) < 3:
+        return None
+    cycles, values = zip(*points)
+    return statistics.linear_regression(cycles, values).slope
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Soak test de memória e vazamentos")
+    parser.add_argument("--cycles", type=int, default=2000, help="Ciclos gerar/carregar/exportar")
+    parser.add_argument("--warmup", type=int, default=50, help="Ciclos ignorados no cálculo do crescimento")
+    parser.add_argument("--sample-every", type=int, default=10, help="Intervalo de amostragem (ciclos)")
+    parser.add_argument("--sessions", type=int, default=4, help="Sessões simuladas que se alternam")
+    parser.add_argument("--session-cycles", type=int, default=10,
+                        help="Ciclos de cada sessão antes de ser descartada (usuário que sai)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência do backend falso (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout de cada execução de página (s)")
+    parser.add_argument("--max-rss-kb", type=float, default=256.0, help="Crescimento máximo de RSS por ciclo (KB)")
+    parser.add_argument("--max-heap-kb", type=float, default=64.0,
+                        help="Crescimento máximo das alocações Python por ciclo (KB)")
+    parser.add_argument("--max-threads", type=float, default=0.01, help="Crescimento máximo de threads por ciclo")
+    parser.add_argument("--max-fds", type=float, default=0.01, help="Crescimento máximo de descritores por ciclo")
+    parser.add_argument("--max-jobs", type=float, default=0.1, help="Crescimento máximo de jobs retidos por ciclo")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Desliga o tracemalloc (menos overhead)")
+    parser.add_argument("--top", type=int, default=10, help="Linhas do tracemalloc que mais cresceram")
+    parser.add_argument("--output", help="Grava amostras e resultado em JSON")
+    args = parser.parse_args(argv)
+
+    streamlit_config.set_option("logger.level", "error")
+    streamlit_logger.set_log_level("error")
+
+    trace_heap = not args.no_tracemalloc
+    if trace_heap:
+        tracemalloc.start()
+    sessions: List[Dict[str, Any]] = [{} for _ in range(args.sessions)]
+    session_age = [0] * args.sessions
+    samples: List[Dict[str, Any]] = []
+    baseline = None
+    started = time.perf_counter()
+
+    with fake_backend(latency=args.latency):
+        for cycle in range(1, args.cycles + 1):
+            index = cycle % args.sessions
+            if session_age[index] == args.session_cycles:
+                sessions[index], session_age[index] = {}, 0
+            session_age[index] += 1
+            sessions[index] = run_cycle(sessions[index], f"Ideia de jogo número {cycle}: cartas e exploração",
+                                        args.timeout)
+            if cycle == args.warmup and trace_heap:
+                gc.collect()
+                baseline = tracemalloc.take_snapshot()
+            if cycle % args.sample_every == 0 or cycle == args.cycles:
+                samples.append(sample(cycle, sessions, trace_heap))
+                last = samples[-1]
+                print(f"ciclo {cycle:>5}: RSS {last['rss_mb']:.0f} MB"
+                      + (f", heap {last['heap_kb'] / 1024:.1f} MB" if trace_heap else "")
+                      + f", threads {last['threads']}, fds {last['fds']}, jobs {last['jobs']}, "
+                        f"traces {last['traces']}, sessão {last['session_state_kb']:.0f} KB", flush=True)
+
+    steady = [s for s in samples if s['cycle'] >= args.warmup]
+    limits = {'rss_mb': args.max_rss_kb / 1024, 'heap_kb': args.max_heap_kb, 'threads': args.max_threads,
+              'fds': args.max_fds, 'jobs': args.max_jobs}
+    growth = {metric: slope(steady, metric) for metric in limits}
+    failures = [f"{metric}: {value:+.4f}/ciclo (limite {limits[metric]})"
+                for metric, value in growth.items() if value is not None and value > limits[metric]]
+
+    print(f"\n=== {args.cycles} ciclos em {time.perf_counter() - started:.0f}s ===")
+    for metric, value in growth.items():
+        print(f"crescimento {metric:<8} {value:+.4f}/ciclo" if value is not None else
+              f"crescimento {metric:<8} (amostras insuficientes)")
+
+    top_allocations = []
+    if trace_heap and baseline is not None:
+        gc.collect()
+        for stat in tracemalloc.take_snapshot().compare_to(baseline, 'lineno')[:args.top]:
+            frame = stat.traceback[0]
+            top_allocations.append({'location': f"{frame.filename}:{frame.lineno}",
+                                    'size_diff_kb': stat.size_diff / 1024, 'count_diff': stat.count_diff})
+        print("\nAlocações que mais cresceram desde o aquecimento:")
+        for allocation in top_allocations:
+            print(f"  {allocation['size_diff_kb']:>+10.1f} KB {allocation['count_diff']:>+8} "
+                  f"objs  {allocation['location']}")
+
+    if failures:
+        print("\nFALHOU: " + "; ".join(failures))
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            'cycles': args.cycles, 'growth_per_cycle': growth, 'failures': failures,
+            'top_allocations': top_allocations, 'samples': samples,
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultados gravados em {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Servidor HTTP local que fala o protocolo REST do Gemini, para testar o app sem a rede.
+Diferente do backend falso em processo (fake_gemini.py), aqui o `genai.Client()` real
+faz todo o caminho do SDK (montagem da requisição, HTTP, serialização, retries e
+parsing), então dá para medir e carregar esse caminho de ponta a ponta.
+
+Endpoints (v1beta e v1):
+    POST /models/{modelo}:generateContent        resposta completa
+    POST /models/{modelo}:streamGenerateContent  SSE (?alt=sse), texto em pedaços
+    POST /models/{modelo}:countTokens            {"totalTokens": N}
+    GET  /models/{modelo}                        metadados do modelo (models.get)
+    GET  /stats                                  contadores por chave e por método
+
+O response schema da requisição é preenchido por `fake_payload`; modelos de imagem
+devolvem uma parte inlineData, e partes de imagem na requisição contam tokens como na
+API real. A latência tem uma parte fixa (até o primeiro byte) e uma proporcional aos
+tokens gerados, com variação aleatória opcional. Cada chave tem uma cota por minuto:
+acima dela, ou aleatoriamente com --throttle-rate, a resposta é 429 RESOURCE_EXHAUSTED
+com RetryInfo, como a API real.
+
+Uso:
+    python -m benchmarks.stub_server --port 8765 --rpm 10 --latency 0.8 --tokens-per-second 250
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEYS=k1,k2,k3 streamlit run app.py
+    curl localhost:8765/stats
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.fake_gemini import (  # noqa: E402
+    IMAGE_MODEL_MARKER, _estimate_tokens, _sentence, fake_image_bytes, fake_payload
+)
+
+_ROUTE = re.compile(r"^/(?:v1beta|v1)/models/(?P<model>[^:/]+):(?P<method>\w+)$")
+_MODEL_ROUTE = re.compile(r"^/(?:v1beta|v1)/models/(?P<model>[^:/]+)$")
+
+# Custo em tokens de uma imagem na entrada e na saída (valores da API do Gemini)
+IMAGE_INPUT_TOKENS = 258
+IMAGE_OUTPUT_TOKENS = 1290
+
+# Tamanho de cada pedaço de texto no streaming (tokens)
+STREAM_CHUNK_TOKENS = 32
+
+
+@dataclass
+class StubBehavior:
+    """Latência e falhas simuladas pelo servidor."""
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    jitter: float = 0.0
+    throttle_rate: float = 0.0
+    throttle_retry: float = 1.0
+
+    def delays(self, output_tokens: int, rng: random.Random) -> Tuple[float, float]:
+        """(espera até o primeiro byte, tempo de geração dos tokens), já com a variação."""
+        factor = 1 + rng.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+        generation = output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        return self.latency * factor, generation * factor
+
+
+class KeyQuota:
+    """Janela deslizante de um minuto com as requisições e os tokens de cada chave."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._requests: Dict[str, Deque[float]] = defaultdict(deque)
+        self._tokens: Dict[str, Deque[Tuple[float, int]]] = defaultdict(deque)
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'requests': 0, 'throttled': 0, 'injected': 0, 'tokens': 0})
+        self.methods: Counter = Counter()
+
+    def admit(self, key: str) -> Optional[float]:
+        """Registra a requisição se houver cota; senão retorna os segundos até liberar."""
+        now = time.monotonic()
+        with self._lock:
+            requests, tokens = self._requests[key], self._tokens[key]
+            while requests and requests[0] <= now - 60:
+                requests.popleft()
+            while tokens and tokens[0][0] <= now - 60:
+                tokens.popleft()
+            retry = None
+            if self.rpm and len(requests) >= self.rpm:
+                retry = requests[0] + 60 - now
+            if self.tpm and sum(n for _, n in tokens) >= self.tpm:
+                retry = max(retry or 0.0, tokens[0][0] + 60 - now)
+            if retry is not None:
+                self.counters[key]['throttled'] += 1
+                return max(retry, 0.1)
+            requests.append(now)
+            self.counters[key]['requests'] += 1
+            return None
+
+    def inject(self, key: str):
+        """Conta um 429 injetado (que não consome a cota da chave)."""
+        with self._lock:
+            self.counters[key]['injected'] += 1
+
+    def charge(self, key: str, tokens: int):
+        with self._lock:
+            self._tokens[key].append((time.monotonic(), tokens))
+            self.counters[key]['tokens'] += tokens
+
+    def count_method(self, method: str):
+        with self._lock:
+            self.methods[method] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'keys': {f"…{key[-4:]}": dict(values) for key, values in self.counters.items()},
+                'methods': dict(self.methods),
+            }
+
+
+def _error(code: int, status: str, message: str, details: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    error: Dict[str, Any] = {'code': code, 'message': message, 'status': status}
+    if details:
+        error['details'] = details
+    return {'error': error}
+
+
+def _quota_error(retry: float) -> Dict[str, Any]:
+    return _error(429, 'RESOURCE_EXHAUSTED', "Resource has been exhausted (e.g. check quota).",
+                  [{'@type': 'type.googleapis.com/google.rpc.RetryInfo', 'retryDelay': f"{retry:.0f}s"}])
+
+
+def _parts(body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Todas as partes da requisição (contents e systemInstruction)."""
+    contents = body.get('contents') or []
+    if isinstance(contents, dict):
+        contents = [contents]
+    system = body.get('systemInstruction') or (body.get('generateContentRequest') or {}).get('systemInstruction')
+    for content in contents + ([system] if system else []):
+        yield from content.get('parts') or []
+
+
+def count_tokens(body: Dict[str, Any]) -> int:
+    """Tokens de entrada: texto pela estimativa do backend falso, imagens pelo custo fixo."""
+    if 'generateContentRequest' in body:
+        body = body['generateContentRequest']
+    total = 0
+    for part in _parts(body):
+        if 'text' in part:
+            total += _estimate_tokens(part['text'])
+        elif 'inlineData' in part or 'fileData' in part:
+            total += IMAGE_INPUT_TOKENS
+    return max(1, total)
+
+
+def _prompt_seed(model: str, body: Dict[str, Any]) -> str:
+    # Imagens da requisição entram pelo tamanho, para a semente não depender de megabytes de base64
+    parts = [part.get('text') if 'text' in part else f"<{len(str(part))}>" for part in _parts(body)]
+    # Como na API, a seed da config muda a resposta
+    seed = (body.get('generationConfig') or {}).get('seed')
+    key = f"{model}:{json.dumps(parts, ensure_ascii=False)}"
+    return key if seed is None else f"{key}:{seed}"
+
+
+def generate_response(model: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Resposta sintética de generateContent no formato REST."""
+    rng = random.Random(_prompt_seed(model, body))
+    config = body.get('generationConfig') or {}
+    if IMAGE_MODEL_MARKER in model:
+        parts = [{'text': "Arte conceitual gerada."},
+                 {'inlineData': {'mimeType': 'image/png', 'data': base64.b64encode(fake_image_bytes()).decode()}}]
+        output_tokens = IMAGE_OUTPUT_TOKENS
+    else:
+        schema = config.get('responseSchema') or config.get('responseJsonSchema')
+        text = json.dumps(fake_payload(schema, rng), ensure_ascii=False) if schema else _sentence(rng, 40, 80)
+        parts = [{'text': text}]
+        output_tokens = _estimate_tokens(text)
+    prompt_tokens = count_tokens(body)
+    return {
+        'candidates': [{'content': {'role': 'model', 'parts': parts}, 'finishReason': 'STOP', 'index': 0}],
+        'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': output_tokens,
+                          'totalTokenCount': prompt_tokens + output_tokens},
+        'modelVersion': model,
+    }
+
+
+def stream_chunks(response: Dict[str, Any], chunk_tokens: int = STREAM_CHUNK_TOKENS) -> List[Dict[str, Any]]:
+    """
+    Divide uma resposta completa nos pedaços do streamGenerateContent.
+
+    O texto sai em pedaços de ~`chunk_tokens` tokens, imagens saem inteiras; o último
+    pedaço leva o finishReason e o usageMetadata, como na API real.
+    """
+    candidate = response['candidates'][0]
+    pieces: List[Dict[str, Any]] = []
+    step = chunk_tokens * 4
+    for part in candidate['content']['parts']:
+        if 'text' in part:
+            text = part['text']
+            pieces += [{'text': text[i:i + step]} for i in range(0, len(text), step)] or [{'text': ""}]
+        else:
+            pieces.append(part)
+    chunks = [{'candidates': [{'content': {'role': 'model', 'parts': [piece]}, 'index': 0}],
+               'modelVersion': response['modelVersion']} for piece in pieces]
+    chunks[-1]['candidates'][0]['finishReason'] = candidate['finishReason']
+    chunks[-1]['usageMetadata'] = response['usageMetadata']
+    return chunks
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    server_version = "StubGemini/1.0"
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em writes separados: sem TCP_NODELAY, Nagle + ACK atrasado somam ~40 ms
+    disable_nagle_algorithm = True
+
+    @property
+    def quota(self) -> KeyQuota:
+        return self.server.quota  # type: ignore[attr-defined]
+
+    @property
+    def behavior(self) -> StubBehavior:
+        return self.server.behavior  # type: ignore[attr-defined]
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, chunks: List[Dict[str, Any]], generation: float):
+        # Server-sent events com Transfer-Encoding chunked; o tempo de geração é dividido entre os pedaços
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pause = generation / len(chunks)
+        for chunk in chunks:
+            if pause > 0:
+                time.sleep(pause)
+            event = f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode('utf-8')
+            self.wfile.write(f"{len(event):X}\r\n".encode('ascii') + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _api_key(self, query: Dict[str, List[str]]) -> str:
+        return self.headers.get('x-goog-api-key') or (query.get('key') or [''])[0]
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/stats':
+            return self._send_json(HTTPStatus.OK, self.quota.stats())
+        match = _MODEL_ROUTE.match(path)
+        if match is not None:
+            self.quota.count_method('get')
+            return self._send_json(HTTPStatus.OK, {
+                'name': f"models/{match['model']}", 'displayName': match['model'],
+                'inputTokenLimit': 1048576, 'outputTokenLimit': 65536,
+                'supportedGenerationMethods': ['generateContent', 'countTokens'],
+            })
+        self._send_json(HTTPStatus.NOT_FOUND, _error(404, 'NOT_FOUND', "rota não encontrada"))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        match = _ROUTE.match(url.path)
+        if match is None or match['method'] not in ('generateContent', 'streamGenerateContent', 'countTokens'):
+            return self._send_json(HTTPStatus.NOT_FOUND, _error(404, 'NOT_FOUND', f"rota não suportada: {url.path}"))
+        method = match['method']
+        self.quota.count_method(method)
+
+        key = self._api_key(parse_qs(url.query))
+        if not key:
+            return self._send_json(HTTPStatus.FORBIDDEN, _error(403, 'PERMISSION_DENIED', "API key ausente"))
+        try:
+            body = json.loads(raw)
+        except json.JSONDecodeError:
+            return self._send_json(HTTPStatus.BAD_REQUEST, _error(400, 'INVALID_ARGUMENT', "JSON inválido"))
+        if method == 'countTokens':
+            return self._send_json(HTTPStatus.OK, {'totalTokens': count_tokens(body)})
+
+        behavior = self.behavior
+        if behavior.throttle_rate and random.random() < behavior.throttle_rate:
+            self.quota.inject(key)
+            return self._send_json(HTTPStatus.TOO_MANY_REQUESTS, _quota_error(behavior.throttle_retry))
+        retry = self.quota.admit(key)
+        if retry is not None:
+            return self._send_json(HTTPStatus.TOO_MANY_REQUESTS, _quota_error(retry))
+
+        response = generate_response(match['model'], body)
+        usage = response['usageMetadata']
+        first_byte, generation = behavior.delays(usage['candidatesTokenCount'], random.Random())
+        if first_byte > 0:
+            time.sleep(first_byte)
+        self.quota.charge(key, usage['totalTokenCount'])
+        if method == 'streamGenerateContent':
+            return self._send_stream(stream_chunks(response), generation)
+        if generation > 0:
+            time.sleep(generation)
+        self._send_json(HTTPStatus.OK, response)
+
+    def log_message(self, format: str, *args):
+        if not self.server.quiet:  # type: ignore[attr-defined]
+            super().log_message(format, *args)
+
+
+def create_stub_server(host: str = "127.0.0.1", port: int = 8765, rpm: int = 0, tpm: int = 0,
+                       latency: float = 0.0, quiet: bool = True,
+                       behavior: Optional[StubBehavior] = None) -> ThreadingHTTPServer:
+    """Cria o servidor (porta 0 escolhe uma livre; veja server.server_address)."""
+    server = ThreadingHTTPServer((host, port), StubGeminiHandler)
+    server.daemon_threads = True
+    server.quota = KeyQuota(rpm, tpm)  # type: ignore[attr-defined]
+    server.behavior = behavior or StubBehavior(latency=latency)  # type: ignore[attr-defined]
+    server.quiet = quiet  # type: ignore[attr-defined]
+    return server
+
+
+@contextmanager
+def stub_backend(behavior: Optional[StubBehavior] = None, rpm: int = 0, tpm: int = 0) -> Iterator[ThreadingHTTPServer]:
+    """
+    Sobe o servidor em uma thread e aponta o `genai.Client` real para ele enquanto o contexto estiver ativo.
+
+    Define GEMINI_BASE_URL (e GEMINI_API_KEY, se ausente) e recria o pool de chaves.
+    """
+    from utils.key_pool import reset_key_pool
+
+    server = create_stub_server(port=0, rpm=rpm, tpm=tpm, behavior=behavior)
+    thread = threading.Thread(target=server.serve_forever, name="stub-gemini", daemon=True)
+    thread.start()
+    original = {name: os.environ.get(name) for name in ("GEMINI_BASE_URL", "GEMINI_API_KEY")}
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+    reset_key_pool()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        for name, value in original.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        reset_key_pool()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stand-in local da API REST do Gemini")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=0, help="Requisições por minuto por chave (0 = sem limite)")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokens por minuto por chave (0 = sem limite)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência até o primeiro byte (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Taxa de geração simulada (0 = instantânea)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variação relativa da latência (0.2 = ±20%%)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fração das gerações respondidas com 429 injetado")
+    parser.add_argument("--throttle-retry", type=float, default=1.0, help="retryDelay dos 429 injetados (s)")
+    parser.add_argument("--verbose", action="store_true", help="Registra cada requisição")
+    args = parser.parse_args(argv)
+
+    behavior = StubBehavior(args.latency, args.tokens_per_second, args.jitter, args.throttle_rate, args.throttle_retry)
+    server = create_stub_server(args.host, args.port, args.rpm, args.tpm, quiet=not args.verbose, behavior=behavior)
+    print(f"Stand-in do Gemini em http://{args.host}:{server.server_address[1]} "
+          f"(GEMINI_BASE_URL=http://{args.host}:{server.server_address[1]})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
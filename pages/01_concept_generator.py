@@ -4,15 +4,23 @@ Gera conceitos de jogos a partir de ideias iniciais.
 """
 
 import streamlit as st
-from PIL import Image
-from typing import Optional, cast
+from typing import Any, Dict, cast
+import random
 import sys
 import os
+import uuid
 
 # Adiciona o diretório raiz ao path para importar os módulos utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils import GeminiClient, OnePageGDD, render_sidebar, add_to_concept_history
+from utils import GeminiClient, OnePageGDD, render_sidebar
+from utils.image_store import THUMBNAIL_WIDTHS, get_image_store, placeholder_data_url
+from utils.jobs import BATCH_META_KEY, latest_result, pending_jobs, render_job_status, submit_job
+from utils.rendering import MarkdownSection
+from utils.scheduler import get_scheduler
+from utils.tasks import MAX_ART_CANDIDATES, adopt_concept, art_label, concept_art, concept_art_prompt
+from utils.variants import MAX_VARIANTS, MIN_VARIANTS, rank_variants, variant_settings
+from utils.tracing import traced
 
 # --- Configuração da página ---
 st.set_page_config(layout="wide", page_title="Concept Generator - Game Concept Forge")
@@ -40,87 +48,161 @@ def get_gemini_client():
 
 client = get_gemini_client()
 
+# --- Arte conceitual ---
+def render_concept_art(prompt: str, candidates: int):
+    """Espaço da arte conceitual: as candidatas prontas ou o placeholder enquanto são geradas."""
+    art = concept_art(prompt)
+    pending = [job for job in pending_jobs("concept_art") if job.params['prompt'] == prompt]
+
+    # O navegador recebe miniaturas WebP na largura exibida, como data URL (sem decodificar aqui)
+    store = get_image_store()
+    width = THUMBNAIL_WIDTHS[-1] if len(art['image_ids']) == 1 else THUMBNAIL_WIDTHS[0]
+    images = [url for url in (store.data_url(image_id, width) for image_id in art['image_ids']) if url is not None]
+
+    if len(images) == 1:
+        st.image(images[0], caption="Arte Conceitual Gerada", use_container_width=True)
+    elif images:
+        for i, (column, image) in enumerate(zip(st.columns(len(images)), images)):
+            with column:
+                st.image(image, caption=f"Arte Conceitual {i+1}", use_container_width=True)
+    else:
+        # Placeholder gerado localmente uma vez por processo
+        st.image(placeholder_data_url(), caption="Arte Conceitual (Placeholder)", use_container_width=True)
+
+    # As artes rodam em jobs próprios: o monitor da sidebar reexecuta a página quando cada uma chega
+    if pending:
+        st.caption(f"🎨 Gerando {len(pending)} arte(s) conceitual(is); elas aparecem aqui assim que ficarem prontas.")
+    if art['failed']:
+        st.caption(f"⚠️ {art['failed']} arte(s) não puderam ser geradas.")
+    if st.button("🎨 Gerar mais artes", key="more_art"):
+        first = len(art['image_ids']) + art['failed'] + len(pending)
+        for candidate in range(first, first + candidates):
+            submit_job("concept_art", art_label(candidate), client=client, prompt=prompt, candidate=candidate)
+        st.rerun()
+
 # --- Função para exibir o GDD de forma estruturada ---
-def display_gdd_concept(gdd_data: OnePageGDD, generated_image: Optional[Image.Image] = None):
+@traced("display.gdd_concept")
+def display_gdd_concept(gdd_data: OnePageGDD, art_candidates: int = 1):
     """Exibe o GDD de forma estruturada e moderna."""
     st.subheader(f"✨ Conceito de Jogo: {gdd_data.get('titulo_provisorio', 'Sem Título')}")
 
-    # Apresenta a imagem gerada ou o placeholder
-    if generated_image:
-        st.image(generated_image, caption="Arte Conceitual Gerada", use_container_width=True)
-    else:
-        # URL de placeholder
-        image_url = "https://placehold.co/600x300/007bff/ffffff?text=Arte+Conceitual+Gerada"
-        st.image(image_url, caption="Arte Conceitual (Placeholder)", use_container_width =True)
+    # Apresenta as artes geradas ou o placeholder (o texto não espera pelas imagens)
+    render_concept_art(concept_art_prompt(gdd_data), art_candidates)
 
     st.markdown("---")
 
     # Informações básicas em colunas
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown(f"**Gênero:** {gdd_data.get('genero', 'N/A')}")
-        st.markdown(f"**Plataformas Alvo:** {', '.join(gdd_data.get('plataformas_alvo', ['N/A']))}")
+        with MarkdownSection() as md:
+            md.add(f"**Gênero:** {gdd_data.get('genero', 'N/A')}")
+            md.add(f"**Plataformas Alvo:** {', '.join(gdd_data.get('plataformas_alvo', ['N/A']))}")
     with col2:
         st.markdown(f"**Público-Alvo:** {', '.join(gdd_data.get('publico_alvo', ['N/A']))}")
 
-    st.markdown("---")
-    st.markdown(f"**Premissa/Conceito Central:** {gdd_data.get('premissa_conceito_central', 'N/A')}")
-    st.markdown("---")
+    with MarkdownSection() as md:
+        md.add("---")
+        md.add(f"**Premissa/Conceito Central:** {gdd_data.get('premissa_conceito_central', 'N/A')}")
+        md.add("---")
 
     # Core Loop
     with st.expander("🔄 Core Loop", expanded=True):
         core_loop = gdd_data.get('core_loop', {})
-        st.markdown(f"**Ação:** {core_loop.get('acao', 'N/A')}")
-        st.markdown(f"**Recompensa:** {core_loop.get('recompensa', 'N/A')}")
-        st.markdown(f"**Progressão:** {core_loop.get('progressao', 'N/A')}")
+        with MarkdownSection() as md:
+            md.add(f"**Ação:** {core_loop.get('acao', 'N/A')}")
+            md.add(f"**Recompensa:** {core_loop.get('recompensa', 'N/A')}")
+            md.add(f"**Progressão:** {core_loop.get('progressao', 'N/A')}")
 
     # Mecânicas Principais
     with st.expander("⚙️ Mecânicas Principais"):
         mecanicas = gdd_data.get('mecanicas_principais', [])
-        if mecanicas:
-            for mec in mecanicas:
-                st.markdown(f"**{mec.get('nome', 'N/A')}**: {mec.get('descricao', 'N/A')}")
-        else:
-            st.markdown("Nenhuma mecânica principal detalhada.")
+        with MarkdownSection() as md:
+            if mecanicas:
+                for mec in mecanicas:
+                    md.add(f"**{mec.get('nome', 'N/A')}**: {mec.get('descricao', 'N/A')}")
+            else:
+                md.add("Nenhuma mecânica principal detalhada.")
 
     # Monetização Opcional
     if gdd_data.get('monetizacao_opcional'):
         with st.expander("💰 Monetização Opcional"):
             monetizacoes = gdd_data.get('monetizacao_opcional', [])
-            if monetizacoes:
-                for mon in monetizacoes:
-                    st.markdown(f"**{mon.get('tipo', 'N/A')}**: {mon.get('descricao', 'N/A')}")
-            else:
-                st.markdown("Nenhuma opção de monetização sugerida.")
+            with MarkdownSection() as md:
+                if monetizacoes:
+                    for mon in monetizacoes:
+                        md.add(f"**{mon.get('tipo', 'N/A')}**: {mon.get('descricao', 'N/A')}")
+                else:
+                    md.add("Nenhuma opção de monetização sugerida.")
 
     # Pontos de Venda Únicos (USPs)
     with st.expander("🌟 Pontos de Venda Únicos (USPs)"):
         usps = gdd_data.get('pontos_de_venda_unicos_usps', [])
-        if usps:
-            for usp in usps:
-                st.markdown(f"- {usp}")
-        else:
-            st.markdown("Nenhum USP detalhado.")
+        with MarkdownSection() as md:
+            if usps:
+                md.items(usps, "- {item}")
+            else:
+                md.add("Nenhum USP detalhado.")
 
     st.markdown("---")
     st.info("Esta é uma minuta de One-Page GDD gerada por IA. Use-a como ponto de partida para seu design!")
 
-# --- Instruções do Modelo Gemini ---
-system_instruction = """
-Você é um "Arquiteto de Conceitos de Jogo", uma inteligência artificial especializada em transformar ideias iniciais de usuários em conceitos de jogo estruturados. Sua função principal é:
-
-1. **Analisar a Ideia Central:** Compreender a essência da ideia do usuário para o jogo.
-2. **Desenvolver o Core Loop:** Descrever o ciclo fundamental de atividades que o jogador repetirá no jogo, incluindo Ação, Recompensa e Progressão.
-3. **Propor Mecânicas de Jogo:** Detalhar as regras e sistemas que governam a interação do jogador com o mundo do jogo e seus elementos.
-4. **Elaborar uma Minuta de One-Page GDD:** Gerar um documento conciso que resuma os elementos chave do conceito.
-
-**Restrições e Diretrizes:**
-* Mantenha a concisão e a clareza. O objetivo é uma "minuta" de GDD de uma página.
-* Concentre-se em conceitos jogáveis e viáveis.
-* Evite jargões excessivos sem explicação.
-* Se a ideia do usuário for vaga, faça suposições razoáveis e criativas para preencher as lacunas.
-* Sempre retorne o conceito de jogo estruturado e a minuta do GDD.
-"""
+# --- Variações ---
+VARIANT_COLUMNS = 3
+
+def use_variant(gdd: Dict[str, Any], idea: str):
+    """Adota uma variação como o conceito atual (exibido acima da grade)."""
+    adopt_concept(gdd, idea)
+    st.session_state.setdefault('job_results', {})['concept'] = {'gdd': gdd, 'image_ids': []}
+
+def submit_variants(idea: str, count: int, model: str):
+    """Envia as variações como jobs paralelos, cada uma com temperatura e seed próprias."""
+    batch_id = uuid.uuid4().hex[:8]
+    st.session_state['concept_variants'] = {'id': batch_id, 'idea': idea, 'total': count, 'results': {}}
+    base_seed = random.randrange(2**31 - MAX_VARIANTS)
+    for index, settings in enumerate(variant_settings(count, base_seed)):
+        # Mesmo meta[BATCH_META_KEY]: o escalonador admite as variações juntas, em uma rodada
+        submit_job("concept_variant", f"Variação {index + 1} de {count}",
+                   meta={BATCH_META_KEY: batch_id, 'index': index},
+                   client=client, idea=idea, model=model, **settings)
+
+@traced("display.concept_variants")
+def display_concept_variants(batch: Dict[str, Any]):
+    """Grade comparável das variações, da mais bem avaliada para a pior."""
+    results = batch['results']
+    pending = [job for job in pending_jobs("concept_variant") if job.meta.get(BATCH_META_KEY) == batch['id']]
+    failed = batch['total'] - len(results) - len(pending)
+
+    st.markdown(f"### 🎲 Variações ({len(results)} de {batch['total']})")
+    if pending:
+        st.caption(f"⏳ {len(pending)} variação(ões) em andamento; a grade é atualizada quando cada uma chega.")
+    if failed:
+        st.caption(f"⚠️ {failed} variação(ões) não puderam ser geradas.")
+
+    # O ranking só é recalculado quando chega uma variação nova
+    order = sorted(results)
+    if batch.get('ranked') != order:
+        batch['ranking'] = rank_variants([results[index] for index in order])
+        batch['ranked'] = order
+
+    ranking = batch['ranking']
+    for row in range(0, len(ranking), VARIANT_COLUMNS):
+        for column, (position, entry) in zip(st.columns(VARIANT_COLUMNS),
+                                             enumerate(ranking[row:row + VARIANT_COLUMNS], start=row + 1)):
+            gdd, variant = entry['gdd'], order[entry['index']] + 1
+            with column, st.container(border=True):
+                st.markdown(f"**#{position} · {gdd.get('titulo_provisorio', 'Sem Título')}**")
+                st.caption(f"Variação {variant} · nota {entry['score']:.2f} · completude {entry['completeness']:.0%} "
+                           f"· diversidade {entry['diversity']:.0%}")
+                if entry['duplicate_of'] is not None:
+                    st.caption(f"⚠️ Quase igual à variação {order[entry['duplicate_of']] + 1}")
+                with MarkdownSection() as md:
+                    md.add(f"**Gênero:** {gdd.get('genero', 'N/A')}")
+                    md.add(f"**Premissa:** {gdd.get('premissa_conceito_central', 'N/A')}")
+                    mecanicas = [m.get('nome', 'N/A') for m in gdd.get('mecanicas_principais', [])]
+                    md.add(f"**Mecânicas:** {', '.join(mecanicas) or 'N/A'}")
+                    md.items(gdd.get('pontos_de_venda_unicos_usps', [])[:3], "- {item}")
+                st.button("✅ Usar este conceito", key=f"use_variant_{variant}", on_click=use_variant,
+                          args=(gdd, batch['idea']), use_container_width=True)
 
 # --- Interface principal ---
 st.markdown("### 💡 Conte sua ideia de jogo")
@@ -130,9 +212,20 @@ ideia = st.text_area(
     height=150
 )
 
+modo = st.radio("Modo de geração:", ["Conceito único", "Variações"], horizontal=True,
+                help="Variações gera várias versões da ideia em paralelo e as ordena por completude e diversidade.")
+if modo == "Variações":
+    variant_count = st.slider("Quantidade de variações", MIN_VARIANTS, MAX_VARIANTS, 5)
+    max_inflight = get_scheduler().max_inflight
+    if variant_count > max_inflight:
+        st.caption(f"O servidor faz até {max_inflight} chamadas simultâneas: acima disso, "
+                   f"as variações restantes esperam a primeira rodada terminar.")
+
 # Opções avançadas
 with st.expander("⚙️ Opções Avançadas"):
     generate_image = st.checkbox("Gerar arte conceitual", value=True)
+    art_candidates = st.slider("Artes candidatas (geradas em paralelo)", 1, MAX_ART_CANDIDATES, 1,
+                               disabled=not generate_image)
     model_choice = st.selectbox(
         "Modelo Gemini:",
         ["gemini-2.5-flash", "gemini-1.5-flash"],
@@ -140,82 +233,28 @@ with st.expander("⚙️ Opções Avançadas"):
     )
 
 # --- Botão de processamento ---
-if st.button("🚀 Gerar Conceito", type="primary") and ideia:
-    with st.spinner("Estou gerando um conceito incrível para o seu jogo..."):
-        try:
-            # Gera o conceito
-            gdd_data = client.generate_content(
-                prompt=ideia,
-                system_instruction=system_instruction,
-                response_schema={
-                    "type": "object",
-                    "properties": {
-                        "titulo_provisorio": {"type": "string"},
-                        "genero": {"type": "string"},
-                        "plataformas_alvo": {"type": "array", "items": {"type": "string"}},
-                        "premissa_conceito_central": {"type": "string"},
-                        "publico_alvo": {"type": "array", "items": {"type": "string"}},
-                        "core_loop": {
-                            "type": "object",
-                            "properties": {
-                                "acao": {"type": "string"},
-                                "recompensa": {"type": "string"},
-                                "progressao": {"type": "string"}
-                            }
-                        },
-                        "mecanicas_principais": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "nome": {"type": "string"},
-                                    "descricao": {"type": "string"}
-                                }
-                            }
-                        },
-                        "monetizacao_opcional": {
-                            "type": "array",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "tipo": {"type": "string"},
-                                    "descricao": {"type": "string"}
-                                }
-                            }
-                        },
-                        "pontos_de_venda_unicos_usps": {"type": "array", "items": {"type": "string"}}
-                    }
-                },
-                model=model_choice
-            )
-
-            gdd_data: OnePageGDD = cast(OnePageGDD, gdd_data)
-
-            # Gera imagem se solicitado
-            image_generated = None
-            if generate_image:
-                with st.spinner("Gerando arte conceitual..."):
-                    image_generated = client.generate_image(
-                        f"arte conceitual do jogo: {gdd_data['premissa_conceito_central']}"
-                    )
-
-            # Exibe o resultado
-            display_gdd_concept(gdd_data, image_generated)
-
-            # Salva na sessão
-            st.session_state['current_gdd'] = gdd_data
-            st.session_state['current_concept'] = ideia
-
-            # Adiciona ao histórico
-            add_to_concept_history(
-                gdd_data.get('titulo_provisorio', 'Sem título'),
-                gdd_data,
-                ideia
-            )
-
-        except Exception as e:
-            st.error(f"Erro ao gerar conceito: {e}")
-            st.info("Verifique se sua chave de API está configurada corretamente.")
+if modo == "Variações":
+    if st.button("🎲 Gerar Variações", type="primary") and ideia:
+        submit_variants(ideia, variant_count, model_choice)
+        st.rerun()
+elif st.button("🚀 Gerar Conceito", type="primary") and ideia:
+    # O conceito é gerado em segundo plano e sobrevive à troca de página; as artes partem
+    # em jobs próprios assim que a premissa existe
+    submit_job("concept", "Conceito de jogo", client=client,
+               idea=ideia, model=model_choice, with_image=generate_image, art_candidates=art_candidates)
+    st.rerun()
+
+render_job_status("concept", "Erro ao gerar conceito")
+render_job_status("concept_variant", "Erro ao gerar uma das variações")
+
+# Exibe o último conceito gerado nesta sessão
+concept_result = latest_result("concept")
+if concept_result:
+    display_gdd_concept(cast(OnePageGDD, concept_result['gdd']), art_candidates)
+
+# Grade das variações do último lote
+if st.session_state.get('concept_variants'):
+    display_concept_variants(st.session_state['concept_variants'])
 
 # --- Seção de ajuda ---
 with st.expander("❓ Como usar"):
@@ -234,11 +273,23 @@ with st.expander("❓ Como usar"):
     """)
 
 # --- Histórico de conceitos ---
-if 'concept_history' in st.session_state and st.session_state.concept_history:
-    with st.expander("📚 Histórico de Conceitos"):
-        for i, concept in enumerate(st.session_state.concept_history):
-            st.markdown(f"**{i+1}. {concept['title']}** - {concept['date']}")
-            if st.button(f"Carregar conceito {i+1}", key=f"load_{i}"):
-                st.session_state['current_gdd'] = concept['gdd']
-                st.session_state['current_concept'] = concept['concept']
-                st.rerun()
\ No newline at end of file
+def load_concept(concept: dict):
+    """Define um conceito do histórico como o conceito atual da sessão."""
+    st.session_state['current_gdd'] = concept['gdd']
+    st.session_state['current_concept'] = concept['concept']
+
+@st.fragment
+def render_concept_history():
+    """Exibe o histórico; navegar nele reexecuta apenas este fragmento."""
+    if 'concept_history' in st.session_state and st.session_state.concept_history:
+        with st.expander("📚 Histórico de Conceitos"):
+            for i, concept in enumerate(st.session_state.concept_history):
+                st.markdown(f"**{i+1}. {concept['title']}** - {concept['date']}")
+                if st.session_state.get('current_gdd') is concept['gdd']:
+                    st.caption("✅ Conceito atual")
+                if st.button(f"Carregar conceito {i+1}", key=f"load_{i}"):
+                    load_concept(concept)
+                    # A barra lateral ("Conceito carregado") fica fora do fragmento
+                    st.rerun(scope="app")
+
+render_concept_history()
@@ -12,6 +12,9 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils import GeminiClient, AnaliseConcorrentes, render_sidebar
+from utils.jobs import latest_result, render_job_status, submit_job
+from utils.rendering import MarkdownSection
+from utils.tracing import traced
 
 # --- Configuração da página ---
 st.set_page_config(layout="wide", page_title="Competitor Analysis - Game Concept Forge")
@@ -40,6 +43,7 @@ def get_gemini_client():
 client = get_gemini_client()
 
 # --- Função para exibir análise de concorrentes ---
+@traced("display.competitor_analysis")
 def display_competitor_analysis(analysis: AnaliseConcorrentes):
     """Exibe a análise de concorrentes de forma estruturada."""
 
@@ -58,69 +62,48 @@ def display_competitor_analysis(analysis: AnaliseConcorrentes):
 
     # Concorrentes Diretos
     with st.expander("🎯 Concorrentes Diretos", expanded=True):
-        concorrentes = analysis.get('concorrentes_diretos', [])
-        if concorrentes:
-            for i, concorrente in enumerate(concorrentes, 1):
-                st.markdown(f"**{i}.** {concorrente}")
-        else:
-            st.info("Nenhum concorrente direto identificado.")
+        with MarkdownSection() as md:
+            md.items(analysis.get('concorrentes_diretos', []), "**{i}.** {item}",
+                     "Nenhum concorrente direto identificado.")
 
     # Jogos Similares
     with st.expander("🎮 Jogos Similares"):
-        similares = analysis.get('jogos_similares', [])
-        if similares:
-            for i, jogo in enumerate(similares, 1):
-                st.markdown(f"**{i}.** {jogo}")
-        else:
-            st.info("Nenhum jogo similar identificado.")
+        with MarkdownSection() as md:
+            md.items(analysis.get('jogos_similares', []), "**{i}.** {item}",
+                     "Nenhum jogo similar identificado.")
 
     # Análise SWOT dos Concorrentes
     col1, col2 = st.columns(2)
 
     with col1:
         with st.expander("✅ Pontos Fortes dos Concorrentes"):
-            pontos_fortes = analysis.get('pontos_fortes_concorrentes', [])
-            if pontos_fortes:
-                for ponto in pontos_fortes:
-                    st.markdown(f"• {ponto}")
-            else:
-                st.info("Nenhum ponto forte identificado.")
+            with MarkdownSection() as md:
+                md.items(analysis.get('pontos_fortes_concorrentes', []), "• {item}",
+                         "Nenhum ponto forte identificado.")
 
     with col2:
         with st.expander("❌ Pontos Fracos dos Concorrentes"):
-            pontos_fracos = analysis.get('pontos_fracos_concorrentes', [])
-            if pontos_fracos:
-                for ponto in pontos_fracos:
-                    st.markdown(f"• {ponto}")
-            else:
-                st.info("Nenhum ponto fraco identificado.")
+            with MarkdownSection() as md:
+                md.items(analysis.get('pontos_fracos_concorrentes', []), "• {item}",
+                         "Nenhum ponto fraco identificado.")
 
     # Oportunidades de Diferenciação
     with st.expander("💡 Oportunidades de Diferenciação", expanded=True):
-        oportunidades = analysis.get('oportunidades_diferencacao', [])
-        if oportunidades:
-            for i, oportunidade in enumerate(oportunidades, 1):
-                st.markdown(f"**{i}.** {oportunidade}")
-        else:
-            st.info("Nenhuma oportunidade de diferenciação identificada.")
+        with MarkdownSection() as md:
+            md.items(analysis.get('oportunidades_diferencacao', []), "**{i}.** {item}",
+                     "Nenhuma oportunidade de diferenciação identificada.")
 
     # Tendências de Mercado
     with st.expander("📈 Tendências de Mercado"):
-        tendencias = analysis.get('tendencias_mercado', [])
-        if tendencias:
-            for i, tendencia in enumerate(tendencias, 1):
-                st.markdown(f"**{i}.** {tendencia}")
-        else:
-            st.info("Nenhuma tendência de mercado identificada.")
+        with MarkdownSection() as md:
+            md.items(analysis.get('tendencias_mercado', []), "**{i}.** {item}",
+                     "Nenhuma tendência de mercado identificada.")
 
     # Recomendações
     with st.expander("🎯 Recomendações Estratégicas", expanded=True):
-        recomendacoes = analysis.get('recomendacoes', [])
-        if recomendacoes:
-            for i, recomendacao in enumerate(recomendacoes, 1):
-                st.markdown(f"**{i}.** {recomendacao}")
-        else:
-            st.info("Nenhuma recomendação disponível.")
+        with MarkdownSection() as md:
+            md.items(analysis.get('recomendacoes', []), "**{i}.** {item}",
+                     "Nenhuma recomendação disponível.")
 
     st.markdown("---")
     st.success("Análise de concorrentes concluída! Use essas informações para posicionar seu jogo estrategicamente.")
@@ -168,42 +151,16 @@ with st.expander("⚙️ Opções de Análise"):
 
 # --- Botão de análise ---
 if st.button("🔍 Analisar Concorrentes", type="primary") and concept_for_analysis:
-    with st.spinner("Analisando concorrentes e mercado..."):
-        try:
-            # Gera a análise
-            analysis = client.analyze_competitors(concept_for_analysis)
-
-            # Exibe o resultado
-            display_competitor_analysis(analysis)
-
-            # Salva na sessão
-            st.session_state['competitor_analysis'] = analysis
-            st.session_state['analysis_concept'] = concept_for_analysis
-
-            # Adiciona ao histórico
-            if 'analysis_history' not in st.session_state:
-                st.session_state.analysis_history = []
-
-            st.session_state.analysis_history.append({
-                'concept': concept_for_analysis,
-                'analysis': analysis,
-                'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                'depth': analysis_depth
-            })
-
-        except Exception as e:
-            st.error(f"Erro ao analisar concorrentes: {e}")
-            st.info("Verifique se sua chave de API está configurada corretamente.")
-
-# --- Histórico de análises ---
-if 'analysis_history' in st.session_state and st.session_state.analysis_history:
-    with st.expander("📚 Histórico de Análises"):
-        for i, analysis_record in enumerate(st.session_state.analysis_history):
-            st.markdown(f"**{i+1}. Análise {analysis_record['depth']}** - {analysis_record['date']}")
-            if st.button(f"Carregar análise {i+1}", key=f"load_analysis_{i}"):
-                st.session_state['competitor_analysis'] = analysis_record['analysis']
-                st.session_state['analysis_concept'] = analysis_record['concept']
-                st.rerun()
+    # A análise roda em segundo plano e sobrevive à troca de página
+    submit_job("competitor_analysis", "Análise de concorrentes", client=client,
+               meta={'depth': analysis_depth}, game_concept=concept_for_analysis)
+    st.rerun()
+
+render_job_status("competitor_analysis", "Erro ao analisar concorrentes")
+
+# Exibe a última análise gerada nesta sessão
+if latest_result("competitor_analysis"):
+    display_competitor_analysis(latest_result("competitor_analysis"))
 
 # --- Seção de ajuda ---
 with st.expander("❓ Como usar a análise de concorrentes"):
@@ -222,27 +179,46 @@ with st.expander("❓ Como usar a análise de concorrentes"):
     - Considere diferentes plataformas e mercados
     """)
 
-# --- Exportar análise ---
-if 'competitor_analysis' in st.session_state:
-    st.markdown("---")
-    st.markdown("### 📤 Exportar Análise")
-
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("📄 Exportar como JSON"):
-            import json
-            analysis_data = {
-                'concept': st.session_state.get('analysis_concept', ''),
-                'analysis': st.session_state['competitor_analysis'],
-                'date': datetime.now().isoformat()
-            }
-            st.download_button(
-                label="⬇️ Download JSON",
-                data=json.dumps(analysis_data, indent=2, ensure_ascii=False),
-                file_name=f"competitor_analysis_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
-                mime="application/json"
-            )
-
-    with col2:
-        if st.button("📊 Gerar Relatório"):
-            st.info("Funcionalidade de relatório em desenvolvimento!")
\ No newline at end of file
+# --- Histórico e exportação (fragmento) ---
+def load_analysis(analysis_record: dict):
+    """Define uma análise do histórico como a análise atual da sessão."""
+    st.session_state['competitor_analysis'] = analysis_record['analysis']
+    st.session_state['analysis_concept'] = analysis_record['concept']
+
+@st.fragment
+def render_analysis_panel():
+    """Histórico e exportação; interações aqui reexecutam apenas este fragmento."""
+    # --- Histórico de análises ---
+    if 'analysis_history' in st.session_state and st.session_state.analysis_history:
+        with st.expander("📚 Histórico de Análises"):
+            for i, analysis_record in enumerate(st.session_state.analysis_history):
+                st.markdown(f"**{i+1}. Análise {analysis_record['depth']}** - {analysis_record['date']}")
+                st.button(f"Carregar análise {i+1}", key=f"load_analysis_{i}",
+                          on_click=load_analysis, args=(analysis_record,))
+
+    # --- Exportar análise ---
+    if 'competitor_analysis' in st.session_state:
+        st.markdown("---")
+        st.markdown("### 📤 Exportar Análise")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("📄 Exportar como JSON"):
+                import json
+                analysis_data = {
+                    'concept': st.session_state.get('analysis_concept', ''),
+                    'analysis': st.session_state['competitor_analysis'],
+                    'date': datetime.now().isoformat()
+                }
+                st.download_button(
+                    label="⬇️ Download JSON",
+                    data=json.dumps(analysis_data, indent=2, ensure_ascii=False),
+                    file_name=f"competitor_analysis_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+                    mime="application/json"
+                )
+
+        with col2:
+            if st.button("📊 Gerar Relatório"):
+                st.info("Funcionalidade de relatório em desenvolvimento!")
+
+render_analysis_panel()
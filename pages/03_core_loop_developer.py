@@ -12,6 +12,9 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils import GeminiClient, CoreLoopDetalhado, render_sidebar
+from utils.jobs import latest_result, render_job_status, submit_job
+from utils.rendering import MarkdownSection
+from utils.tracing import traced
 
 # --- Configuração da página ---
 st.set_page_config(layout="wide", page_title="Core Loop Developer - Game Concept Forge")
@@ -40,6 +43,7 @@ def get_gemini_client():
 client = get_gemini_client()
 
 # --- Função para exibir core loop detalhado ---
+@traced("display.core_loop")
 def display_core_loop_detailed(core_loop: CoreLoopDetalhado):
     """Exibe o core loop detalhado de forma estruturada."""
 
@@ -48,12 +52,9 @@ def display_core_loop_detailed(core_loop: CoreLoopDetalhado):
 
     # Ações principais
     with st.expander("🎮 Ações Principais do Jogador", expanded=True):
-        acoes = core_loop.get('acoes_principais', [])
-        if acoes:
-            for i, acao in enumerate(acoes, 1):
-                st.markdown(f"**{i}.** {acao}")
-        else:
-            st.info("Nenhuma ação principal definida.")
+        with MarkdownSection() as md:
+            md.items(core_loop.get('acoes_principais', []), "**{i}.** {item}",
+                     "Nenhuma ação principal definida.")
 
     st.markdown("---")
 
@@ -66,21 +67,15 @@ def display_core_loop_detailed(core_loop: CoreLoopDetalhado):
 
     with col1:
         with st.expander("⚡ Recompensas Imediatas", expanded=True):
-            recompensas_imediatas = sistema_recompensas.get('recompensas_imediatas', [])
-            if recompensas_imediatas:
-                for recompensa in recompensas_imediatas:
-                    st.markdown(f"• {recompensa}")
-            else:
-                st.info("Nenhuma recompensa imediata definida.")
+            with MarkdownSection() as md:
+                md.items(sistema_recompensas.get('recompensas_imediatas', []), "• {item}",
+                         "Nenhuma recompensa imediata definida.")
 
     with col2:
         with st.expander("🎁 Recompensas de Longo Prazo"):
-            recompensas_longo_prazo = sistema_recompensas.get('recompensas_longo_prazo', [])
-            if recompensas_longo_prazo:
-                for recompensa in recompensas_longo_prazo:
-                    st.markdown(f"• {recompensa}")
-            else:
-                st.info("Nenhuma recompensa de longo prazo definida.")
+            with MarkdownSection() as md:
+                md.items(sistema_recompensas.get('recompensas_longo_prazo', []), "• {item}",
+                         "Nenhuma recompensa de longo prazo definida.")
 
     # Sistema de Progressão
     with st.expander("📈 Sistema de Progressão", expanded=True):
@@ -93,21 +88,15 @@ def display_core_loop_detailed(core_loop: CoreLoopDetalhado):
     st.subheader("🔄 Feedback Loops")
 
     with st.expander("🔄 Loops de Feedback", expanded=True):
-        feedback_loops = core_loop.get('feedback_loops', [])
-        if feedback_loops:
-            for i, loop in enumerate(feedback_loops, 1):
-                st.markdown(f"**Loop {i}:** {loop}")
-        else:
-            st.info("Nenhum feedback loop definido.")
+        with MarkdownSection() as md:
+            md.items(core_loop.get('feedback_loops', []), "**Loop {i}:** {item}",
+                     "Nenhum feedback loop definido.")
 
     # Mecânicas de Retenção
     with st.expander("🎯 Mecânicas de Retenção"):
-        mecanicas_retencao = core_loop.get('mecanicas_retencao', [])
-        if mecanicas_retencao:
-            for i, mecanica in enumerate(mecanicas_retencao, 1):
-                st.markdown(f"**{i}.** {mecanica}")
-        else:
-            st.info("Nenhuma mecânica de retenção definida.")
+        with MarkdownSection() as md:
+            md.items(core_loop.get('mecanicas_retencao', []), "**{i}.** {item}",
+                     "Nenhuma mecânica de retenção definida.")
 
     st.markdown("---")
 
@@ -130,12 +119,9 @@ def display_core_loop_detailed(core_loop: CoreLoopDetalhado):
 
     # Pontos de Ajuste
     with st.expander("🔧 Pontos de Ajuste"):
-        pontos_ajuste = balanceamento.get('pontos_ajuste', [])
-        if pontos_ajuste:
-            for i, ponto in enumerate(pontos_ajuste, 1):
-                st.markdown(f"**{i}.** {ponto}")
-        else:
-            st.info("Nenhum ponto de ajuste definido.")
+        with MarkdownSection() as md:
+            md.items(balanceamento.get('pontos_ajuste', []), "**{i}.** {item}",
+                     "Nenhum ponto de ajuste definido.")
 
     st.markdown("---")
     st.success("Core loop detalhado desenvolvido! Use essas informações para implementar o sistema de jogo.")
@@ -192,44 +178,17 @@ with st.expander("⚙️ Opções de Desenvolvimento"):
 
 # --- Botão de desenvolvimento ---
 if st.button("🔄 Desenvolver Core Loop", type="primary") and concept_for_development:
-    with st.spinner("Desenvolvendo core loop detalhado..."):
-        try:
-            # Gera o core loop detalhado
-            core_loop_detailed = client.develop_core_loop(concept_for_development)
-
-            # Exibe o resultado
-            display_core_loop_detailed(core_loop_detailed)
-
-            # Salva na sessão
-            st.session_state['core_loop_detailed'] = core_loop_detailed
-            st.session_state['core_loop_concept'] = concept_for_development
-
-            # Adiciona ao histórico
-            if 'core_loop_history' not in st.session_state:
-                st.session_state.core_loop_history = []
-
-            st.session_state.core_loop_history.append({
-                'concept': concept_for_development,
-                'core_loop': core_loop_detailed,
-                'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                'complexity': complexity_level,
-                'focus_areas': focus_area
-            })
-
-        except Exception as e:
-            st.error(f"Erro ao desenvolver core loop: {e}")
-            st.info("Verifique se sua chave de API está configurada corretamente.")
-
-# --- Histórico de core loops ---
-if 'core_loop_history' in st.session_state and st.session_state.core_loop_history:
-    with st.expander("📚 Histórico de Core Loops"):
-        for i, core_loop_record in enumerate(st.session_state.core_loop_history):
-            st.markdown(f"**{i+1}. Core Loop {core_loop_record['complexity']}** - {core_loop_record['date']}")
-            st.markdown(f"*Foco: {', '.join(core_loop_record['focus_areas'])}*")
-            if st.button(f"Carregar core loop {i+1}", key=f"load_core_loop_{i}"):
-                st.session_state['core_loop_detailed'] = core_loop_record['core_loop']
-                st.session_state['core_loop_concept'] = core_loop_record['concept']
-                st.rerun()
+    # O desenvolvimento roda em segundo plano e sobrevive à troca de página
+    submit_job("core_loop", "Core loop detalhado", client=client,
+               meta={'complexity': complexity_level, 'focus_areas': focus_area},
+               game_concept=concept_for_development)
+    st.rerun()
+
+render_job_status("core_loop", "Erro ao desenvolver core loop")
+
+# Exibe o último core loop gerado nesta sessão
+if latest_result("core_loop"):
+    display_core_loop_detailed(latest_result("core_loop"))
 
 # --- Seção de ajuda ---
 with st.expander("❓ Como desenvolver um bom core loop"):
@@ -254,46 +213,64 @@ with st.expander("❓ Como desenvolver um bom core loop"):
     - **Minecraft:** Minerar → Craftar → Construir
     """)
 
-# --- Exportar core loop ---
-if 'core_loop_detailed' in st.session_state:
-    st.markdown("---")
-    st.markdown("### 📤 Exportar Core Loop")
-
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("📄 Exportar como JSON"):
-            import json
-            core_loop_data = {
-                'concept': st.session_state.get('core_loop_concept', ''),
-                'core_loop': st.session_state['core_loop_detailed'],
-                'date': datetime.now().isoformat()
-            }
-            st.download_button(
-                label="⬇️ Download JSON",
-                data=json.dumps(core_loop_data, indent=2, ensure_ascii=False),
-                file_name=f"core_loop_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
-                mime="application/json"
-            )
+# --- Histórico, exportação e visualização (fragmento) ---
+def load_core_loop(core_loop_record: dict):
+    """Define um core loop do histórico como o core loop atual da sessão."""
+    st.session_state['core_loop_detailed'] = core_loop_record['core_loop']
+    st.session_state['core_loop_concept'] = core_loop_record['concept']
+
+@st.fragment
+def render_core_loop_panel():
+    """Histórico, exportação e visualização; interações aqui reexecutam apenas este fragmento."""
+    # --- Histórico de core loops ---
+    if 'core_loop_history' in st.session_state and st.session_state.core_loop_history:
+        with st.expander("📚 Histórico de Core Loops"):
+            for i, core_loop_record in enumerate(st.session_state.core_loop_history):
+                st.markdown(f"**{i+1}. Core Loop {core_loop_record['complexity']}** - {core_loop_record['date']}")
+                st.markdown(f"*Foco: {', '.join(core_loop_record['focus_areas'])}*")
+                st.button(f"Carregar core loop {i+1}", key=f"load_core_loop_{i}",
+                          on_click=load_core_loop, args=(core_loop_record,))
+
+    # --- Exportar core loop ---
+    if 'core_loop_detailed' in st.session_state:
+        st.markdown("---")
+        st.markdown("### 📤 Exportar Core Loop")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("📄 Exportar como JSON"):
+                import json
+                core_loop_data = {
+                    'concept': st.session_state.get('core_loop_concept', ''),
+                    'core_loop': st.session_state['core_loop_detailed'],
+                    'date': datetime.now().isoformat()
+                }
+                st.download_button(
+                    label="⬇️ Download JSON",
+                    data=json.dumps(core_loop_data, indent=2, ensure_ascii=False),
+                    file_name=f"core_loop_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+                    mime="application/json"
+                )
+
+        with col2:
+            if st.button("📊 Gerar Diagrama"):
+                st.info("Funcionalidade de diagrama em desenvolvimento!")
+
+    # --- Visualização do fluxo ---
+    if 'core_loop_detailed' in st.session_state:
+        st.markdown("---")
+        st.markdown("### 🔄 Visualização do Fluxo")
+
+        # Cria um fluxograma simples
+        core_loop = st.session_state['core_loop_detailed']
+        acoes = core_loop.get('acoes_principais', [])
 
-    with col2:
-        if st.button("📊 Gerar Diagrama"):
-            st.info("Funcionalidade de diagrama em desenvolvimento!")
+        if acoes:
+            with MarkdownSection() as md:
+                md.add("**Fluxo de Ações:**")
+                md.items(acoes[:-1], "**{i}.** {item} →")
+                md.add(f"**{len(acoes)}.** {acoes[-1]} 🔄")
+        else:
+            st.info("Nenhuma ação definida para visualização.")
 
-# --- Visualização do fluxo ---
-if 'core_loop_detailed' in st.session_state:
-    st.markdown("---")
-    st.markdown("### 🔄 Visualização do Fluxo")
-
-    # Cria um fluxograma simples
-    core_loop = st.session_state['core_loop_detailed']
-    acoes = core_loop.get('acoes_principais', [])
-
-    if acoes:
-        st.markdown("**Fluxo de Ações:**")
-        for i, acao in enumerate(acoes):
-            if i < len(acoes) - 1:
-                st.markdown(f"**{i+1}.** {acao} →")
-            else:
-                st.markdown(f"**{i+1}.** {acao} 🔄")
-    else:
-        st.info("Nenhuma ação definida para visualização.")
\ No newline at end of file
+render_core_loop_panel()
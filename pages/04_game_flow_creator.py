@@ -12,6 +12,9 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils import GeminiClient, FluxoJogo, render_sidebar
+from utils.jobs import latest_result, render_job_status, submit_job
+from utils.rendering import MarkdownSection
+from utils.tracing import traced
 
 # --- Configuração da página ---
 st.set_page_config(layout="wide", page_title="Game Flow Creator - Game Concept Forge")
@@ -40,6 +43,7 @@ def get_gemini_client():
 client = get_gemini_client()
 
 # --- Função para exibir fluxo de jogo ---
+@traced("display.game_flow")
 def display_game_flow(game_flow: FluxoJogo):
     """Exibe o fluxo de jogo de forma estruturada."""
 
@@ -50,23 +54,16 @@ def display_game_flow(game_flow: FluxoJogo):
     with st.expander("🚀 Onboarding e Tutorial", expanded=True):
         onboarding = game_flow.get('onboarding', {})
 
-        st.markdown(f"**Tutorial:** {onboarding.get('tutorial', 'N/A')}")
+        with MarkdownSection() as md:
+            md.add(f"**Tutorial:** {onboarding.get('tutorial', 'N/A')}")
 
-        st.markdown("**Primeiros Passos:**")
-        primeiros_passos = onboarding.get('primeiros_passos', [])
-        if primeiros_passos:
-            for i, passo in enumerate(primeiros_passos, 1):
-                st.markdown(f"{i}. {passo}")
-        else:
-            st.info("Nenhum primeiro passo definido.")
+            md.add("**Primeiros Passos:**")
+            md.items(onboarding.get('primeiros_passos', []), "{i}. {item}",
+                     "Nenhum primeiro passo definido.")
 
-        st.markdown("**Objetivos Iniciais:**")
-        objetivos = onboarding.get('objetivos_iniciais', [])
-        if objetivos:
-            for i, objetivo in enumerate(objetivos, 1):
-                st.markdown(f"{i}. {objetivo}")
-        else:
-            st.info("Nenhum objetivo inicial definido.")
+            md.add("**Objetivos Iniciais:**")
+            md.items(onboarding.get('objetivos_iniciais', []), "{i}. {item}",
+                     "Nenhum objetivo inicial definido.")
 
     st.markdown("---")
 
@@ -76,23 +73,16 @@ def display_game_flow(game_flow: FluxoJogo):
     with st.expander("🏆 Estrutura de Níveis", expanded=True):
         progressao = game_flow.get('progressao', {})
 
-        st.markdown(f"**Estrutura:** {progressao.get('estrutura_niveis', 'N/A')}")
+        with MarkdownSection() as md:
+            md.add(f"**Estrutura:** {progressao.get('estrutura_niveis', 'N/A')}")
 
-        st.markdown("**Desbloqueios:**")
-        desbloqueios = progressao.get('desbloqueios', [])
-        if desbloqueios:
-            for i, desbloqueio in enumerate(desbloqueios, 1):
-                st.markdown(f"{i}. {desbloqueio}")
-        else:
-            st.info("Nenhum desbloqueio definido.")
+            md.add("**Desbloqueios:**")
+            md.items(progressao.get('desbloqueios', []), "{i}. {item}",
+                     "Nenhum desbloqueio definido.")
 
-        st.markdown("**Momentos Chave:**")
-        momentos_chave = progressao.get('momentos_chave', [])
-        if momentos_chave:
-            for i, momento in enumerate(momentos_chave, 1):
-                st.markdown(f"{i}. {momento}")
-        else:
-            st.info("Nenhum momento chave definido.")
+            md.add("**Momentos Chave:**")
+            md.items(progressao.get('momentos_chave', []), "{i}. {item}",
+                     "Nenhum momento chave definido.")
 
     st.markdown("---")
 
@@ -100,21 +90,15 @@ def display_game_flow(game_flow: FluxoJogo):
     st.subheader("🤔 Momentos de Decisão")
 
     with st.expander("🎯 Decisões do Jogador", expanded=True):
-        decisoes = game_flow.get('decisoes_jogador', [])
-        if decisoes:
-            for i, decisao in enumerate(decisoes, 1):
-                st.markdown(f"**Decisão {i}:** {decisao}")
-        else:
-            st.info("Nenhuma decisão do jogador definida.")
+        with MarkdownSection() as md:
+            md.items(game_flow.get('decisoes_jogador', []), "**Decisão {i}:** {item}",
+                     "Nenhuma decisão do jogador definida.")
 
     # Checkpoints
     with st.expander("📍 Pontos de Checkpoint"):
-        checkpoints = game_flow.get('checkpoints', [])
-        if checkpoints:
-            for i, checkpoint in enumerate(checkpoints, 1):
-                st.markdown(f"**Checkpoint {i}:** {checkpoint}")
-        else:
-            st.info("Nenhum checkpoint definido.")
+        with MarkdownSection() as md:
+            md.items(game_flow.get('checkpoints', []), "**Checkpoint {i}:** {item}",
+                     "Nenhum checkpoint definido.")
 
     st.markdown("---")
 
@@ -122,12 +106,9 @@ def display_game_flow(game_flow: FluxoJogo):
     st.subheader("💰 Fluxo de Monetização")
 
     with st.expander("💳 Monetização", expanded=True):
-        fluxo_monetizacao = game_flow.get('fluxo_monetizacao', [])
-        if fluxo_monetizacao:
-            for i, monetizacao in enumerate(fluxo_monetizacao, 1):
-                st.markdown(f"{i}. {monetizacao}")
-        else:
-            st.info("Nenhum fluxo de monetização definido.")
+        with MarkdownSection() as md:
+            md.items(game_flow.get('fluxo_monetizacao', []), "{i}. {item}",
+                     "Nenhum fluxo de monetização definido.")
 
     st.markdown("---")
 
@@ -140,30 +121,21 @@ def display_game_flow(game_flow: FluxoJogo):
 
     with col1:
         with st.expander("⭐ Pontos Altos", expanded=True):
-            pontos_alto = experiencia.get('pontos_alto', [])
-            if pontos_alto:
-                for ponto in pontos_alto:
-                    st.markdown(f"• {ponto}")
-            else:
-                st.info("Nenhum ponto alto definido.")
+            with MarkdownSection() as md:
+                md.items(experiencia.get('pontos_alto', []), "• {item}",
+                         "Nenhum ponto alto definido.")
 
     with col2:
         with st.expander("⚠️ Pontos de Atenção"):
-            pontos_baixo = experiencia.get('pontos_baixo', [])
-            if pontos_baixo:
-                for ponto in pontos_baixo:
-                    st.markdown(f"• {ponto}")
-            else:
-                st.info("Nenhum ponto de atenção definido.")
+            with MarkdownSection() as md:
+                md.items(experiencia.get('pontos_baixo', []), "• {item}",
+                         "Nenhum ponto de atenção definido.")
 
     # Otimizações
     with st.expander("🔧 Otimizações Sugeridas", expanded=True):
-        otimizacoes = experiencia.get('otimizacoes', [])
-        if otimizacoes:
-            for i, otimizacao in enumerate(otimizacoes, 1):
-                st.markdown(f"**{i}.** {otimizacao}")
-        else:
-            st.info("Nenhuma otimização sugerida.")
+        with MarkdownSection() as md:
+            md.items(experiencia.get('otimizacoes', []), "**{i}.** {item}",
+                     "Nenhuma otimização sugerida.")
 
     st.markdown("---")
     st.success("Fluxo de jogo criado! Use essas informações para implementar a experiência do usuário.")
@@ -223,44 +195,17 @@ with st.expander("⚙️ Opções de Criação"):
 
 # --- Botão de criação ---
 if st.button("🎯 Criar Fluxo de Jogo", type="primary") and concept_for_flow:
-    with st.spinner("Criando fluxo de jogo detalhado..."):
-        try:
-            # Gera o fluxo de jogo
-            game_flow = client.create_game_flow(concept_for_flow)
-
-            # Exibe o resultado
-            display_game_flow(game_flow)
-
-            # Salva na sessão
-            st.session_state['game_flow'] = game_flow
-            st.session_state['flow_concept'] = concept_for_flow
-
-            # Adiciona ao histórico
-            if 'flow_history' not in st.session_state:
-                st.session_state.flow_history = []
-
-            st.session_state.flow_history.append({
-                'concept': concept_for_flow,
-                'flow': game_flow,
-                'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                'type': flow_type,
-                'audience': target_audience
-            })
-
-        except Exception as e:
-            st.error(f"Erro ao criar fluxo de jogo: {e}")
-            st.info("Verifique se sua chave de API está configurada corretamente.")
-
-# --- Histórico de fluxos ---
-if 'flow_history' in st.session_state and st.session_state.flow_history:
-    with st.expander("📚 Histórico de Fluxos"):
-        for i, flow_record in enumerate(st.session_state.flow_history):
-            st.markdown(f"**{i+1}. Fluxo {flow_record['type']}** - {flow_record['date']}")
-            st.markdown(f"*Público: {flow_record['audience']}*")
-            if st.button(f"Carregar fluxo {i+1}", key=f"load_flow_{i}"):
-                st.session_state['game_flow'] = flow_record['flow']
-                st.session_state['flow_concept'] = flow_record['concept']
-                st.rerun()
+    # A criação roda em segundo plano e sobrevive à troca de página
+    submit_job("game_flow", "Fluxo de jogo", client=client,
+               meta={'type': flow_type, 'audience': target_audience},
+               game_concept=concept_for_flow)
+    st.rerun()
+
+render_job_status("game_flow", "Erro ao criar fluxo de jogo")
+
+# Exibe o último fluxo gerado nesta sessão
+if latest_result("game_flow"):
+    display_game_flow(latest_result("game_flow"))
 
 # --- Seção de ajuda ---
 with st.expander("❓ Como criar um bom fluxo de jogo"):
@@ -286,59 +231,76 @@ with st.expander("❓ Como criar um bom fluxo de jogo"):
     - **Minecraft:** Tutorial → Sobrevivência → Exploração → Construção
     """)
 
-# --- Exportar fluxo ---
-if 'game_flow' in st.session_state:
-    st.markdown("---")
-    st.markdown("### 📤 Exportar Fluxo de Jogo")
-
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("📄 Exportar como JSON"):
-            import json
-            flow_data = {
-                'concept': st.session_state.get('flow_concept', ''),
-                'flow': st.session_state['game_flow'],
-                'date': datetime.now().isoformat()
-            }
-            st.download_button(
-                label="⬇️ Download JSON",
-                data=json.dumps(flow_data, indent=2, ensure_ascii=False),
-                file_name=f"game_flow_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
-                mime="application/json"
-            )
-
-    with col2:
-        if st.button("📊 Gerar Diagrama"):
-            st.info("Funcionalidade de diagrama em desenvolvimento!")
-
-# --- Visualização do fluxo ---
-if 'game_flow' in st.session_state:
-    st.markdown("---")
-    st.markdown("### 🎯 Visualização do Fluxo")
-
-    # Cria um fluxograma simples
-    game_flow = st.session_state['game_flow']
-
-    # Onboarding
-    onboarding = game_flow.get('onboarding', {})
-    if onboarding.get('primeiros_passos'):
-        st.markdown("**Fluxo de Onboarding:**")
-        for i, passo in enumerate(onboarding['primeiros_passos'], 1):
-            if i < len(onboarding['primeiros_passos']):
-                st.markdown(f"**{i}.** {passo} →")
-            else:
-                st.markdown(f"**{i}.** {passo} ✅")
-
-    # Progressão
-    progressao = game_flow.get('progressao', {})
-    if progressao.get('momentos_chave'):
-        st.markdown("**Momentos Chave da Progressão:**")
-        for i, momento in enumerate(progressao['momentos_chave'], 1):
-            st.markdown(f"**{i}.** {momento}")
-
-    # Decisões
-    decisoes = game_flow.get('decisoes_jogador', [])
-    if decisoes:
-        st.markdown("**Pontos de Decisão:**")
-        for i, decisao in enumerate(decisoes, 1):
-            st.markdown(f"**{i}.** {decisao} 🤔")
\ No newline at end of file
+# --- Histórico, exportação e visualização (fragmento) ---
+def load_flow(flow_record: dict):
+    """Define um fluxo do histórico como o fluxo atual da sessão."""
+    st.session_state['game_flow'] = flow_record['flow']
+    st.session_state['flow_concept'] = flow_record['concept']
+
+@st.fragment
+def render_game_flow_panel():
+    """Histórico, exportação e visualização; interações aqui reexecutam apenas este fragmento."""
+    # --- Histórico de fluxos ---
+    if 'flow_history' in st.session_state and st.session_state.flow_history:
+        with st.expander("📚 Histórico de Fluxos"):
+            for i, flow_record in enumerate(st.session_state.flow_history):
+                st.markdown(f"**{i+1}. Fluxo {flow_record['type']}** - {flow_record['date']}")
+                st.markdown(f"*Público: {flow_record['audience']}*")
+                st.button(f"Carregar fluxo {i+1}", key=f"load_flow_{i}",
+                          on_click=load_flow, args=(flow_record,))
+
+    # --- Exportar fluxo ---
+    if 'game_flow' in st.session_state:
+        st.markdown("---")
+        st.markdown("### 📤 Exportar Fluxo de Jogo")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("📄 Exportar como JSON"):
+                import json
+                flow_data = {
+                    'concept': st.session_state.get('flow_concept', ''),
+                    'flow': st.session_state['game_flow'],
+                    'date': datetime.now().isoformat()
+                }
+                st.download_button(
+                    label="⬇️ Download JSON",
+                    data=json.dumps(flow_data, indent=2, ensure_ascii=False),
+                    file_name=f"game_flow_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+                    mime="application/json"
+                )
+
+        with col2:
+            if st.button("📊 Gerar Diagrama"):
+                st.info("Funcionalidade de diagrama em desenvolvimento!")
+
+    # --- Visualização do fluxo ---
+    if 'game_flow' in st.session_state:
+        st.markdown("---")
+        st.markdown("### 🎯 Visualização do Fluxo")
+
+        # Cria um fluxograma simples
+        game_flow = st.session_state['game_flow']
+
+        with MarkdownSection() as md:
+            # Onboarding
+            onboarding = game_flow.get('onboarding', {})
+            primeiros_passos = onboarding.get('primeiros_passos', [])
+            if primeiros_passos:
+                md.add("**Fluxo de Onboarding:**")
+                md.items(primeiros_passos[:-1], "**{i}.** {item} →")
+                md.add(f"**{len(primeiros_passos)}.** {primeiros_passos[-1]} ✅")
+
+            # Progressão
+            progressao = game_flow.get('progressao', {})
+            if progressao.get('momentos_chave'):
+                md.add("**Momentos Chave da Progressão:**")
+                md.items(progressao['momentos_chave'], "**{i}.** {item}")
+
+            # Decisões
+            decisoes = game_flow.get('decisoes_jogador', [])
+            if decisoes:
+                md.add("**Pontos de Decisão:**")
+                md.items(decisoes, "**{i}.** {item} 🤔")
+
+render_game_flow_panel()
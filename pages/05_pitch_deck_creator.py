@@ -5,8 +5,11 @@ Gera apresentações profissionais para investidores, publishers e parceiros
 
 import streamlit as st
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from utils import GeminiClient, PitchDeck, Slide, AnaliseMercado, ModeloNegocio, RoadmapDesenvolvimento, render_sidebar, generate_pitch_deck_pdf
+from utils.jobs import render_job_status, submit_job
+from utils.rendering import MarkdownSection
+from utils.tracing import traced
 
 # Configuração da página
 st.set_page_config(
@@ -18,177 +21,6 @@ st.set_page_config(
 # Renderizar sidebar
 render_sidebar()
 
-def generate_pitch_deck_system_prompt() -> str:
-    """Gera o prompt do sistema para criação de pitch deck."""
-    return """
-    Você é um especialista em criação de pitch decks para jogos, com vasta experiência em apresentações para investidores, publishers e parceiros da indústria de games.
-
-    Sua tarefa é criar um pitch deck profissional de 10 slides para um conceito de jogo, seguindo as melhores práticas da indústria.
-
-    ESTRUTURA DO PITCH DECK (10 SLIDES):
-
-    1. **SLIDE TÍTULO** - Nome do jogo, tagline, equipe
-    2. **PROBLEMA/OPORTUNIDADE** - Gap no mercado, necessidade não atendida
-    3. **SOLUÇÃO/CONCEITO** - Como o jogo resolve o problema
-    4. **ANÁLISE DE MERCADO** - Tamanho, crescimento, segmentos
-    5. **MODELO DE NEGÓCIO** - Monetização, receitas, custos
-    6. **DIFERENCIAÇÃO** - Vantagens competitivas, USPs
-    7. **ROADMAP** - Fases de desenvolvimento, cronograma
-    8. **EQUIPE/RECURSOS** - Experiência, capacidades
-    9. **PROJEÇÕES FINANCEIRAS** - Receitas, ROI, break-even
-    10. **CALL TO ACTION** - Próximos passos, investimento necessário
-
-    DIRETRIZES:
-    - Cada slide deve ser conciso e impactante
-    - Use dados e métricas quando possível
-    - Foque em benefícios e oportunidades
-    - Seja específico sobre números e prazos
-    - Mantenha tom profissional mas acessível
-    - Inclua elementos visuais sugeridos para cada slide
-
-    FORMATO DE RESPOSTA:
-    Retorne apenas um JSON válido seguindo a estrutura PitchDeck definida, sem texto adicional.
-    """
-
-def generate_pitch_deck(gemini_client, concept_data: Dict[str, Any]) -> PitchDeck:
-    """Gera um pitch deck completo usando o Gemini."""
-
-    system_prompt = generate_pitch_deck_system_prompt()
-
-    user_prompt = f"""
-    Crie um pitch deck profissional de 10 slides para o seguinte conceito de jogo:
-
-    TÍTULO: {concept_data.get('titulo_provisorio', 'Jogo sem título')}
-    GÊNERO: {concept_data.get('genero', 'Não especificado')}
-    PLATAFORMAS: {', '.join(concept_data.get('plataformas_alvo', []))}
-    PÚBLICO-ALVO: {', '.join(concept_data.get('publico_alvo', []))}
-    PREMISSA: {concept_data.get('premissa_conceito_central', 'Não especificada')}
-    CORE LOOP: {concept_data.get('core_loop', {})}
-    MECÂNICAS: {concept_data.get('mecanicas_principais', [])}
-    MONETIZAÇÃO: {concept_data.get('monetizacao_opcional', [])}
-    USPs: {concept_data.get('pontos_de_venda_unicos_usps', [])}
-
-    Crie um pitch deck que seja convincente para investidores, publishers e parceiros, destacando:
-    - Oportunidade de mercado clara
-    - Diferenciação competitiva
-    - Modelo de negócio viável
-    - Roadmap realista
-    - Potencial de retorno
-
-    Retorne apenas o JSON do pitch deck, sem texto adicional.
-    """
-
-    try:
-        response = gemini_client.generate_content(
-            prompt=user_prompt,
-            system_instruction=system_prompt,
-            response_schema={
-                "type": "object",
-                "properties": {
-                    "slide_titulo": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "slide_problema": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "slide_solucao": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "slide_mercado": {
-                        "type": "object",
-                        "properties": {
-                            "tamanho_mercado": {"type": "string"},
-                            "crescimento_mercado": {"type": "string"},
-                            "segmentos_alvo": {"type": "array", "items": {"type": "string"}},
-                            "tendencias": {"type": "array", "items": {"type": "string"}},
-                            "oportunidades": {"type": "array", "items": {"type": "string"}}
-                        }
-                    },
-                    "slide_modelo_negocio": {
-                        "type": "object",
-                        "properties": {
-                            "estrategia_monetizacao": {"type": "array", "items": {"type": "string"}},
-                            "fontes_receita": {"type": "array", "items": {"type": "string"}},
-                            "custos_estimados": {"type": "array", "items": {"type": "string"}},
-                            "projecao_receita": {"type": "string"},
-                            "break_even": {"type": "string"}
-                        }
-                    },
-                    "slide_diferencacao": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "slide_roadmap": {
-                        "type": "object",
-                        "properties": {
-                            "fases": {"type": "array", "items": {"type": "string"}},
-                            "cronograma": {"type": "string"},
-                            "marcos_principais": {"type": "array", "items": {"type": "string"}},
-                            "recursos_necessarios": {"type": "array", "items": {"type": "string"}},
-                            "riscos": {"type": "array", "items": {"type": "string"}}
-                        }
-                    },
-                    "slide_equipe": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "slide_financeiro": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "slide_call_action": {
-                        "type": "object",
-                        "properties": {
-                            "titulo": {"type": "string"},
-                            "conteudo": {"type": "string"},
-                            "pontos_chave": {"type": "array", "items": {"type": "string"}},
-                            "visual_sugerido": {"type": "string"}
-                        }
-                    },
-                    "publico_alvo_pitch": {"type": "string"},
-                    "duracao_apresentacao": {"type": "string"},
-                    "dicas_apresentacao": {"type": "array", "items": {"type": "string"}}
-                }
-            }
-        )
-        return response
-    except Exception as e:
-        st.error(f"Erro ao gerar pitch deck: {str(e)}")
-        return None
-
 def display_slide(slide: Slide, slide_number: int, slide_title: str):
     """Exibe um slide individual do pitch deck."""
 
@@ -196,13 +28,13 @@ def display_slide(slide: Slide, slide_number: int, slide_title: str):
         col1, col2 = st.columns([2, 1])
 
         with col1:
-            st.markdown(f"### {slide['titulo']}")
-            st.markdown(slide['conteudo'])
+            with MarkdownSection() as md:
+                md.add(f"### {slide['titulo']}")
+                md.add(slide['conteudo'])
 
-            if slide['pontos_chave']:
-                st.markdown("**Pontos-chave:**")
-                for ponto in slide['pontos_chave']:
-                    st.markdown(f"• {ponto}")
+                if slide['pontos_chave']:
+                    md.add("**Pontos-chave:**")
+                    md.items(slide['pontos_chave'], "• {item}")
 
         with col2:
             st.markdown("**🎨 Visual Sugerido:**")
@@ -219,18 +51,17 @@ def display_market_analysis(analise: AnaliseMercado):
             st.metric("Tamanho do Mercado", analise['tamanho_mercado'])
             st.metric("Crescimento", analise['crescimento_mercado'])
 
-            st.markdown("**Segmentos Alvo:**")
-            for segmento in analise['segmentos_alvo']:
-                st.markdown(f"• {segmento}")
+            with MarkdownSection() as md:
+                md.add("**Segmentos Alvo:**")
+                md.items(analise['segmentos_alvo'], "• {item}")
 
         with col2:
-            st.markdown("**📊 Tendências:**")
-            for tendencia in analise['tendencias']:
-                st.markdown(f"• {tendencia}")
+            with MarkdownSection() as md:
+                md.add("**📊 Tendências:**")
+                md.items(analise['tendencias'], "• {item}")
 
-            st.markdown("**🎯 Oportunidades:**")
-            for oportunidade in analise['oportunidades']:
-                st.markdown(f"• {oportunidade}")
+                md.add("**🎯 Oportunidades:**")
+                md.items(analise['oportunidades'], "• {item}")
 
 def display_business_model(modelo: ModeloNegocio):
     """Exibe o modelo de negócio (Slide 5)."""
@@ -239,20 +70,19 @@ def display_business_model(modelo: ModeloNegocio):
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown("### 💰 Estratégia de Monetização")
-            for estrategia in modelo['estrategia_monetizacao']:
-                st.markdown(f"• {estrategia}")
+            with MarkdownSection() as md:
+                md.add("### 💰 Estratégia de Monetização")
+                md.items(modelo['estrategia_monetizacao'], "• {item}")
 
-            st.markdown("**📈 Fontes de Receita:**")
-            for fonte in modelo['fontes_receita']:
-                st.markdown(f"• {fonte}")
+                md.add("**📈 Fontes de Receita:**")
+                md.items(modelo['fontes_receita'], "• {item}")
 
         with col2:
-            st.markdown("**💵 Custos Estimados:**")
-            for custo in modelo['custos_estimados']:
-                st.markdown(f"• {custo}")
+            with MarkdownSection() as md:
+                md.add("**💵 Custos Estimados:**")
+                md.items(modelo['custos_estimados'], "• {item}")
 
-            st.markdown("**📊 Projeções:**")
+                md.add("**📊 Projeções:**")
             st.info(f"Projeção de Receita: {modelo['projecao_receita']}")
             st.success(f"Break-even: {modelo['break_even']}")
 
@@ -263,21 +93,21 @@ def display_roadmap(roadmap: RoadmapDesenvolvimento):
         col1, col2 = st.columns(2)
 
         with col1:
-            st.markdown("### 🗓️ Fases de Desenvolvimento")
-            for i, fase in enumerate(roadmap['fases'], 1):
-                st.markdown(f"**Fase {i}:** {fase}")
+            with MarkdownSection() as md:
+                md.add("### 🗓️ Fases de Desenvolvimento")
+                md.items(roadmap['fases'], "**Fase {i}:** {item}")
 
-            st.markdown(f"**⏱️ Cronograma:** {roadmap['cronograma']}")
+                md.add(f"**⏱️ Cronograma:** {roadmap['cronograma']}")
 
         with col2:
-            st.markdown("**🎯 Marcos Principais:**")
-            for marco in roadmap['marcos_principais']:
-                st.markdown(f"• {marco}")
+            with MarkdownSection() as md:
+                md.add("**🎯 Marcos Principais:**")
+                md.items(roadmap['marcos_principais'], "• {item}")
 
-            st.markdown("**⚠️ Riscos Identificados:**")
-            for risco in roadmap['riscos']:
-                st.markdown(f"• {risco}")
+                md.add("**⚠️ Riscos Identificados:**")
+                md.items(roadmap['riscos'], "• {item}")
 
+@traced("display.pitch_deck")
 def display_pitch_deck(pitch_deck: PitchDeck):
     """Exibe o pitch deck completo."""
 
@@ -327,9 +157,9 @@ def display_pitch_deck(pitch_deck: PitchDeck):
         st.info(pitch_deck['duracao_apresentacao'])
 
     with col3:
-        st.markdown("**💡 Dicas de Apresentação:**")
-        for dica in pitch_deck['dicas_apresentacao']:
-            st.markdown(f"• {dica}")
+        with MarkdownSection() as md:
+            md.add("**💡 Dicas de Apresentação:**")
+            md.items(pitch_deck['dicas_apresentacao'], "• {item}")
 
 def main():
     """Função principal da página."""
@@ -400,71 +230,43 @@ def main():
 
     # Botão para gerar pitch deck
     if st.button("🚀 Gerar Pitch Deck", type="primary", use_container_width=True):
-        with st.spinner("Gerando pitch deck profissional..."):
-
-            # Obter cliente Gemini
-            try:
-                gemini_client = GeminiClient()
-            except ValueError as e:
-                st.error(f"❌ Erro ao conectar com a API do Gemini: {str(e)}")
-                return
-
-            # Adicionar configurações ao conceito
-            concept_data['publico_alvo_pitch'] = publico_alvo
-            concept_data['duracao_apresentacao'] = duracao
-            concept_data['foco_principal'] = foco_principal
-            concept_data['nivel_detalhe'] = nivel_detalhe
-
-            # Gerar pitch deck
-            pitch_deck = generate_pitch_deck(gemini_client, concept_data)
-
-            if pitch_deck:
-                # Salvar no histórico
-                if 'pitch_deck_history' not in st.session_state:
-                    st.session_state.pitch_deck_history = []
-
-                pitch_deck_entry = {
-                    'concept_title': concept_data.get('titulo_provisorio', 'Sem título'),
-                    'publico_alvo': publico_alvo,
-                    'duracao': duracao,
-                    'foco': foco_principal,
-                    'pitch_deck': pitch_deck
-                }
-
-                st.session_state.pitch_deck_history.append(pitch_deck_entry)
-                st.session_state.current_pitch_deck = pitch_deck
-
-                st.success("✅ Pitch deck gerado com sucesso!")
-
-                # Exibir o pitch deck
-                display_pitch_deck(pitch_deck)
-
-                # Botões de ação
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    if st.button("📋 Copiar JSON", use_container_width=True):
-                        st.write("```json")
-                        st.json(pitch_deck)
-                        st.write("```")
-
-                with col2:
-                    # Gerar PDF
-                    pdf_buffer = generate_pitch_deck_pdf(pitch_deck)
-                    st.download_button(
-                        label="📄 Download PDF",
-                        data=pdf_buffer.getvalue(),
-                        file_name=f"pitch_deck_{concept_data.get('titulo_provisorio', 'jogo').replace(' ', '_').lower()}.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
-                    )
-
-                with col3:
-                    if st.button("🔄 Gerar Novo", use_container_width=True):
-                        st.rerun()
-
-    # Exibir pitch deck atual se existir
-    elif 'current_pitch_deck' in st.session_state:
+        # Obter cliente Gemini
+        try:
+            gemini_client = GeminiClient()
+        except ValueError as e:
+            st.error(f"❌ Erro ao conectar com a API do Gemini: {str(e)}")
+            return
+
+        # Adicionar configurações ao conceito
+        concept_data['publico_alvo_pitch'] = publico_alvo
+        concept_data['duracao_apresentacao'] = duracao
+        concept_data['foco_principal'] = foco_principal
+        concept_data['nivel_detalhe'] = nivel_detalhe
+
+        # O pitch deck é gerado em segundo plano e sobrevive à troca de página;
+        # o job recebe uma cópia para não compartilhar o dicionário da sessão
+        submit_job("pitch_deck", "Pitch deck", client=gemini_client, concept_data=dict(concept_data))
+        st.rerun()
+
+    render_job_status("pitch_deck", "Erro ao gerar pitch deck")
+
+    render_pitch_deck_panel(concept_data.get('titulo_provisorio', 'jogo'))
+
+# --- Pitch deck atual e histórico (fragmento) ---
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_pitch_deck_pdf(pitch_deck: PitchDeck, cover_image_id: Optional[str] = None) -> bytes:
+    """Gera o PDF uma única vez por pitch deck e capa; reexecuções reaproveitam os bytes."""
+    return generate_pitch_deck_pdf(pitch_deck, cover_image_id=cover_image_id).getvalue()
+
+def load_pitch_deck(entry: Dict[str, Any]):
+    """Define um pitch deck do histórico como o pitch deck atual da sessão."""
+    st.session_state.current_pitch_deck = entry['pitch_deck']
+    st.session_state.current_pitch_cover = entry.get('cover_image_id')
+
+@st.fragment
+def render_pitch_deck_panel(concept_title: str):
+    """Exibe o pitch deck atual e o histórico; interações aqui reexecutam apenas este fragmento."""
+    if 'current_pitch_deck' in st.session_state:
         st.markdown("### 📊 Pitch Deck Atual")
         display_pitch_deck(st.session_state.current_pitch_deck)
 
@@ -472,12 +274,11 @@ def main():
         col1, col2 = st.columns(2)
 
         with col1:
-            # Gerar PDF do pitch deck atual
-            pdf_buffer = generate_pitch_deck_pdf(st.session_state.current_pitch_deck)
             st.download_button(
                 label="📄 Download PDF",
-                data=pdf_buffer.getvalue(),
-                file_name=f"pitch_deck_{concept_data.get('titulo_provisorio', 'jogo').replace(' ', '_').lower()}.pdf",
+                data=build_pitch_deck_pdf(st.session_state.current_pitch_deck,
+                                          st.session_state.get('current_pitch_cover')),
+                file_name=f"pitch_deck_{concept_title.replace(' ', '_').lower()}.pdf",
                 mime="application/pdf",
                 use_container_width=True
             )
@@ -501,16 +302,14 @@ def main():
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    if st.button(f"Carregar Pitch Deck {i}", key=f"load_pitch_{i}"):
-                        st.session_state.current_pitch_deck = entry['pitch_deck']
-                        st.rerun()
+                    st.button(f"Carregar Pitch Deck {i}", key=f"load_pitch_{i}",
+                              on_click=load_pitch_deck, args=(entry,))
 
                 with col2:
                     # Download PDF do histórico
-                    pdf_buffer = generate_pitch_deck_pdf(entry['pitch_deck'])
                     st.download_button(
                         label=f"📄 Download PDF {i}",
-                        data=pdf_buffer.getvalue(),
+                        data=build_pitch_deck_pdf(entry['pitch_deck'], entry.get('cover_image_id')),
                         file_name=f"pitch_deck_{entry['concept_title'].replace(' ', '_').lower()}_{entry['publico_alvo'].lower()}.pdf",
                         mime="application/pdf",
                         key=f"download_pdf_{i}"
@@ -1,12 +1,54 @@
 """
 Pacote utilitário para o Game Concept Forge.
 Contém módulos para cliente Gemini, estruturas de dados, sidebar e funções auxiliares.
+
+Os submódulos pesados (google-genai, PIL, reportlab) são carregados sob demanda
+no primeiro acesso ao nome exportado, via `__getattr__` do módulo.
 """
 
-from .gemini_client import GeminiClient
+import importlib
+import time
+from typing import Any, Dict
+
 from .data_models import *
-from .sidebar import render_sidebar, clear_session_data, add_to_concept_history, get_session_summary
-from .pdf_generator import generate_pitch_deck_pdf
+
+# Nome exportado -> submódulo que o define
+_LAZY_ATTRS = {
+    'GeminiClient': 'gemini_client',
+    'render_sidebar': 'sidebar',
+    'clear_session_data': 'sidebar',
+    'add_to_concept_history': 'sidebar',
+    'get_session_summary': 'sidebar',
+    'generate_pitch_deck_pdf': 'pdf_generator',
+}
+
+# Tempo gasto no primeiro carregamento de cada submódulo (segundos)
+_import_timings: Dict[str, float] = {}
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    start = time.perf_counter()
+    module = importlib.import_module(f".{module_name}", __name__)
+    _import_timings.setdefault(module_name, time.perf_counter() - start)
+
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
+def get_import_timings() -> Dict[str, float]:
+    """
+    Retorna o tempo do primeiro carregamento de cada submódulo neste processo.
+
+    Returns:
+        dict: Submódulo -> segundos gastos no import sob demanda
+    """
+    return dict(_import_timings)
 
 __all__ = [
     'GeminiClient',
@@ -27,5 +69,6 @@ __all__ = [
     'clear_session_data',
     'add_to_concept_history',
     'get_session_summary',
-    'generate_pitch_deck_pdf'
-]
\ No newline at end of file
+    'generate_pitch_deck_pdf',
+    'get_import_timings'
+]
@@ -0,0 +1,237 @@
+"""
+API HTTP do Game Concept Forge (apenas biblioteca padrão).
+Expõe os geradores do GeminiClient para ferramentas internas, sem passar pelo modelo
+de script por sessão do Streamlit: cada requisição roda em sua própria thread e todas
+compartilham o mesmo cliente (e o pool de conexões dele).
+
+Rotas (POST com corpo JSON):
+    /v1/generate              {"prompt", "system_instruction"?, "response_schema"?, "model"?}
+    /v1/concept               {"idea", "model"?}
+    /v1/competitor-analysis   {"game_concept"}
+    /v1/core-loop             {"game_concept"}
+    /v1/game-flow             {"game_concept"}
+    /v1/pitch-deck            {"concept_data"}   (Accept: application/pdf devolve o PDF)
+    /v1/pitch-deck/pdf        {"pitch_deck"}     (sempre devolve PDF)
+
+GET /v1/limits mostra o escalonador (chamadas em andamento, fila e o limite adaptativo
+de concorrência de cada modelo, com os ajustes recentes) e o consumo de cada chave da API.
+GET /ready responde 503 até o aquecimento do processo (utils.warmup) terminar e 200 depois.
+GET /health e GET /ready não exigem o FORGE_API_TOKEN (são sondas do orquestrador).
+
+`response_schema` aceita um schema ou o nome de um de utils.schemas.RESPONSE_SCHEMAS.
+Com `?async=1` (ou o header `Prefer: respond-async`) a chamada vira um job:
+a resposta é 202 com o ID, e o resultado é consultado em GET /v1/jobs/<id>.
+
+Uso:
+    python -m utils.api --port 8502
+    FORGE_API_TOKEN=segredo python -m utils.api --host 0.0.0.0
+"""
+
+import argparse
+import hmac
+import json
+import os
+import sys
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils.jobs import JOB_DONE, JOB_STATUS_LABELS, get_job_manager, run_task  # noqa: E402
+from utils.scheduler import call_context, get_scheduler  # noqa: E402
+from utils.schemas import RESPONSE_SCHEMAS  # noqa: E402
+
+MAX_BODY_BYTES = 1024 * 1024
+
+PDF_MIME = 'application/pdf'
+
+def _required(body: Dict[str, Any], key: str) -> Any:
+    if not body.get(key):
+        raise ValueError(f"campo obrigatório ausente: {key}")
+    return body[key]
+
+def _generate_params(body: Dict[str, Any]) -> Dict[str, Any]:
+    schema = body.get('response_schema')
+    if isinstance(schema, str):
+        if schema not in RESPONSE_SCHEMAS:
+            raise ValueError(f"schema desconhecido: {schema}")
+        schema = RESPONSE_SCHEMAS[schema]
+    return {
+        'prompt': _required(body, 'prompt'),
+        'system_instruction': body.get('system_instruction', ''),
+        'response_schema': schema,
+        'model': body.get('model', 'gemini-2.5-flash'),
+    }
+
+# Rota -> (tarefa registrada, função que extrai os parâmetros do corpo)
+ROUTES: Dict[str, Tuple[str, Callable[[Dict[str, Any]], Dict[str, Any]]]] = {
+    '/v1/generate': ('generate_content', _generate_params),
+    '/v1/concept': ('concept', lambda body: {'idea': _required(body, 'idea'),
+                                             'model': body.get('model', 'gemini-2.5-flash'),
+                                             'with_image': False}),
+    '/v1/competitor-analysis': ('competitor_analysis', lambda body: {'game_concept': _required(body, 'game_concept')}),
+    '/v1/core-loop': ('core_loop', lambda body: {'game_concept': _required(body, 'game_concept')}),
+    '/v1/game-flow': ('game_flow', lambda body: {'game_concept': _required(body, 'game_concept')}),
+    '/v1/pitch-deck': ('pitch_deck', lambda body: {'concept_data': _required(body, 'concept_data')}),
+    '/v1/pitch-deck/pdf': ('pitch_deck_pdf', lambda body: {'pitch_deck': _required(body, 'pitch_deck')}),
+}
+
+def _serializable(task_name: str, result: Any) -> Any:
+    # O conceito das páginas traz os IDs das artes, que não vão para o JSON
+    if task_name == 'concept' and isinstance(result, dict):
+        return result['gdd']
+    return result
+
+class ForgeAPIHandler(BaseHTTPRequestHandler):
+    server_version = "ForgeAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # --- Respostas ---
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                   "application/json; charset=utf-8", headers)
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {'error': message})
+
+    def _send_result(self, task_name: str, result: Any, want_pdf: bool):
+        if isinstance(result, (bytes, bytearray)):
+            self._send(HTTPStatus.OK, bytes(result), PDF_MIME)
+        elif want_pdf and task_name == 'pitch_deck':
+            from utils.pdf_generator import generate_pitch_deck_pdf
+            self._send(HTTPStatus.OK, generate_pitch_deck_pdf(result).getvalue(), PDF_MIME)
+        else:
+            self._send_json(HTTPStatus.OK, _serializable(task_name, result))
+
+    # --- Requisição ---
+    def _authorized(self) -> bool:
+        token = os.getenv('FORGE_API_TOKEN')
+        if not token:
+            return True
+        header = self.headers.get('Authorization', '')
+        return hmac.compare_digest(header, f"Bearer {token}")
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("corpo da requisição muito grande")
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("o corpo deve ser um objeto JSON")
+        return body
+
+    def _wants_pdf(self, query: Dict[str, List[str]]) -> bool:
+        return PDF_MIME in self.headers.get('Accept', '') or query.get('format') == ['pdf']
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        # Sondas do orquestrador: respondem sem token, como o endpoint de prontidão do warmup
+        if url.path == '/health':
+            return self._send_json(HTTPStatus.OK, {'status': 'ok'})
+        if url.path == '/ready':
+            from utils.warmup import is_ready, readiness
+            return self._send_json(HTTPStatus.OK if is_ready() else HTTPStatus.SERVICE_UNAVAILABLE, readiness())
+        if not self._authorized():
+            return self._send_error(HTTPStatus.UNAUTHORIZED, "token inválido")
+        if url.path == '/v1/limits':
+            from utils.cassette import cassette_mode
+            from utils.key_pool import get_key_pool, load_api_keys
+            # Reproduzindo um cassete (ou sem chave configurada) não há pool de chaves
+            keys = get_key_pool().stats() if load_api_keys() and cassette_mode() != 'replay' else []
+            return self._send_json(HTTPStatus.OK, {**get_scheduler().stats(), 'keys': keys})
+        if url.path.startswith('/v1/jobs/'):
+            return self._get_job(url.path[len('/v1/jobs/'):], parse_qs(url.query))
+        self._send_error(HTTPStatus.NOT_FOUND, "rota não encontrada")
+
+    def do_POST(self):
+        if not self._authorized():
+            return self._send_error(HTTPStatus.UNAUTHORIZED, "token inválido")
+        url = urlparse(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, "rota não encontrada")
+        task_name, build_params = route
+        query = parse_qs(url.query)
+        try:
+            params = build_params(self._read_json())
+        except (ValueError, TypeError) as e:
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+
+        if query.get('async') == ['1'] or 'respond-async' in self.headers.get('Prefer', ''):
+            job_id = get_job_manager().submit(self._session_id(), task_name, params, label=task_name)
+            return self._send_json(HTTPStatus.ACCEPTED, {'job_id': job_id, 'status_url': f"/v1/jobs/{job_id}"},
+                                   headers={'Location': f"/v1/jobs/{job_id}"})
+
+        try:
+            with call_context(self._session_id()):
+                result = run_task(task_name, params)
+        except Exception as e:
+            return self._send_error(HTTPStatus.BAD_GATEWAY, f"falha na geração: {e}")
+        self._send_result(task_name, result, self._wants_pdf(query))
+
+    def _session_id(self) -> str:
+        # Cada cliente da API é uma sessão no rodízio do escalonador
+        return f"api-{self.client_address[0]}"
+
+    def _get_job(self, job_id: str, query: Dict[str, List[str]]):
+        manager = get_job_manager()
+        job = manager.get(job_id, with_result=True)
+        if job is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, "job não encontrado (ou expirado)")
+        if job.finished:
+            # O resultado é entregue uma única vez; os não consultados expiram após JOB_TTL
+            manager.discard(job.id)
+        if job.status == JOB_DONE:
+            return self._send_result(job.task, job.result, self._wants_pdf(query))
+        payload = {'job_id': job.id, 'task': job.task, 'status': job.status,
+                   'status_label': JOB_STATUS_LABELS[job.status], 'elapsed_seconds': round(job.elapsed, 2)}
+        if job.error:
+            payload['error'] = job.error
+        # 202 enquanto o job não terminou; 500 se ele falhou
+        status = HTTPStatus.INTERNAL_SERVER_ERROR if job.error else HTTPStatus.ACCEPTED
+        self._send_json(status, payload, headers={'Retry-After': '1'} if not job.error else None)
+
+    def log_message(self, format: str, *args):
+        if os.getenv('FORGE_API_QUIET') != '1':
+            super().log_message(format, *args)
+
+def create_server(host: str = "127.0.0.1", port: int = 8502) -> ThreadingHTTPServer:
+    """Cria o servidor da API (uma thread por requisição)."""
+    server = ThreadingHTTPServer((host, port), ForgeAPIHandler)
+    server.daemon_threads = True
+    return server
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.api", description="API HTTP do Game Concept Forge")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    from utils.warmup import start_warm_up
+
+    server = create_server(args.host, args.port)
+    start_warm_up()
+    print(f"Forge API em http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,294 @@
+"""
+Gravação e reprodução ("cassetes") das chamadas ao Gemini.
+No modo `record`, cada chamada feita pelo GeminiClient é gravada com a requisição
+(modelo, prompt, config com system instruction e response schema), a resposta
+completa (incluindo usage_metadata), a latência e o momento em que chegou. No modo
+`replay`, as respostas gravadas são servidas pelo hash da requisição, com a latência
+original ou escalada, sem acessar a rede nem exigir chave da API. Assim dá para
+reproduzir um problema de produção ou repetir um padrão de tráfego real contra
+mudanças de cache, escalonamento ou renderização.
+
+Os cassetes são JSONL comprimido com gzip (um membro por gravação, então um processo
+interrompido perde no máximo a última linha).
+
+Configuração:
+    FORGE_CASSETTE_MODE=record|replay      liga a gravação ou a reprodução
+    FORGE_CASSETTE=/caminho/arquivo.jsonl.gz (padrão: data/cassettes/gemini.jsonl.gz)
+    FORGE_CASSETTE_LATENCY_SCALE=1.0       fator da latência reproduzida (0 = instantânea)
+
+Uso:
+    python -m utils.cassette info data/cassettes/gemini.jsonl.gz
+    python -m utils.cassette replay data/cassettes/gemini.jsonl.gz --speed 2
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATH = ROOT_DIR / 'data' / 'cassettes' / 'gemini.jsonl.gz'
+
+MODES = ('record', 'replay')
+
+class CassetteMiss(LookupError):
+    """A requisição não foi gravada no cassete em reprodução."""
+
+def _to_json(value: Any) -> Any:
+    """Converte prompts e configs (str, dict, list ou tipos do google-genai) para JSON."""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json', exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    return value
+
+def request_payload(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Requisição de generate_content (model, contents, config) em formato JSON."""
+    return {
+        'model': kwargs.get('model'),
+        'contents': _to_json(kwargs.get('contents')),
+        'config': _to_json(kwargs.get('config')),
+    }
+
+def request_hash(payload: Dict[str, Any]) -> str:
+    """Hash estável da requisição, usado para encontrar a resposta na reprodução."""
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def read_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    """Gravações do cassete, na ordem; ignora a última linha se o arquivo foi cortado."""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+        return
+
+class Cassette:
+    """Um arquivo de cassete aberto para gravação ou reprodução."""
+
+    def __init__(self, path: Path, mode: str, latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Modo de cassete inválido: {mode!r} (use {' ou '.join(MODES)})")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        # hash -> gravações; requisições repetidas recebem as respostas na ordem em que foram gravadas
+        self._index: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Counter = Counter()
+        if mode == 'replay':
+            if not self.path.exists():
+                raise FileNotFoundError(f"Cassete não encontrado: {self.path}")
+            for entry in read_entries(self.path):
+                self._index[entry['hash']].append(entry)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def record(self, kwargs: Dict[str, Any], response: Any, latency: float):
+        """Grava uma chamada concluída."""
+        from utils.scheduler import current_call_context
+
+        context = current_call_context()
+        payload = request_payload(kwargs)
+        entry = {
+            'hash': request_hash(payload),
+            'time': time.time(),
+            'offset': round(time.monotonic() - self._started - latency, 4),
+            'latency': round(latency, 4),
+            'session_id': context.session_id,
+            'priority': context.priority,
+            'request': payload,
+            'response': _to_json(response),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with gzip.open(self.path, 'at', encoding='utf-8') as file:
+                file.write(line)
+            self.recorded += 1
+
+    def replay(self, kwargs: Dict[str, Any]):
+        """
+        Resposta gravada para a requisição, após a latência original × latency_scale.
+
+        Raises:
+            CassetteMiss: Se a requisição não está no cassete
+        """
+        from google.genai import types
+
+        digest = request_hash(request_payload(kwargs))
+        with self._lock:
+            entries = self._index.get(digest)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"Requisição ao modelo {kwargs.get('model')} não gravada no cassete "
+                                   f"{self.path.name} (hash {digest[:12]})")
+            entry = entries[self._cursor[digest] % len(entries)]
+            self._cursor[digest] += 1
+            self.replayed += 1
+        delay = entry['latency'] * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        return types.GenerateContentResponse.model_validate(entry['response'])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'mode': self.mode, 'path': str(self.path), 'recorded': self.recorded,
+                    'replayed': self.replayed, 'misses': self.misses,
+                    'requests_available': sum(len(entries) for entries in self._index.values())}
+
+# --- Cassete do processo ---
+_cassette: Optional[Cassette] = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+def cassette_mode() -> Optional[str]:
+    """Modo configurado em FORGE_CASSETTE_MODE ('record', 'replay' ou None)."""
+    return os.getenv('FORGE_CASSETTE_MODE') or None
+
+def get_cassette() -> Optional[Cassette]:
+    """Cassete do processo conforme o ambiente, ou None se a gravação/reprodução está desligada."""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        if not _cassette_loaded:
+            mode = cassette_mode()
+            if mode:
+                _cassette = Cassette(Path(os.getenv('FORGE_CASSETTE') or DEFAULT_PATH), mode,
+                                     float(os.getenv('FORGE_CASSETTE_LATENCY_SCALE', '1.0')))
+            _cassette_loaded = True
+        return _cassette
+
+def set_cassette(cassette: Optional[Cassette]):
+    """Troca o cassete do processo (None desliga); usado pelo CLI e pelos benchmarks."""
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        _cassette = cassette
+        _cassette_loaded = True
+
+# --- CLI ---
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def summarize(path: Path) -> Dict[str, Any]:
+    """Resumo de um cassete: chamadas por modelo, tokens, latência e duração do tráfego."""
+    entries = list(read_entries(path))
+    models: Counter = Counter(entry['request']['model'] for entry in entries)
+    tokens = sum((entry['response'].get('usage_metadata') or {}).get('total_token_count') or 0
+                 for entry in entries)
+    latencies = [entry['latency'] for entry in entries]
+    return {
+        'requests': len(entries),
+        'unique_requests': len({entry['hash'] for entry in entries}),
+        'sessions': len({entry.get('session_id') for entry in entries}),
+        'models': dict(models),
+        'tokens': tokens,
+        'latency_p50': _percentile(latencies, 0.5) if latencies else None,
+        'latency_p95': _percentile(latencies, 0.95) if latencies else None,
+        'duration_seconds': (max(e['offset'] + e['latency'] for e in entries) - min(e['offset'] for e in entries))
+                            if entries else 0.0,
+    }
+
+def replay_traffic(path: Path, speed: float = 1.0, latency_scale: float = 1.0) -> Dict[str, Any]:
+    """
+    Repete o tráfego gravado: cada requisição é refeita pelo GeminiClient (escalonador
+    incluído) no mesmo instante relativo em que chegou, com a sessão e a prioridade originais.
+
+    Args:
+        path: Cassete gravado
+        speed: Aceleração das chegadas (2 = duas vezes mais rápido; 0 = todas de uma vez)
+        latency_scale: Fator da latência das respostas reproduzidas
+    """
+    from google.genai import types
+
+    from utils.gemini_client import GeminiClient
+    from utils.scheduler import call_context
+
+    cassette = Cassette(path, 'replay', latency_scale)
+    set_cassette(cassette)
+    client = GeminiClient()
+    entries = sorted(read_entries(path), key=lambda entry: entry['offset'])
+    start_offset = entries[0]['offset'] if entries else 0.0
+    results: List[Tuple[float, float, Optional[str]]] = []
+    results_lock = threading.Lock()
+
+    def issue(entry: Dict[str, Any]):
+        request = entry['request']
+        contents = request['contents']
+        if isinstance(contents, list):
+            contents = [types.Content.model_validate(content) for content in contents]
+        config = types.GenerateContentConfig.model_validate(request['config']) if request['config'] else None
+        began = time.monotonic()
+        error = None
+        try:
+            with call_context(entry.get('session_id') or 'replay', entry.get('priority') or 0):
+                client._generate(model=request['model'], contents=contents, config=config)
+        except Exception as e:
+            error = type(e).__name__
+        with results_lock:
+            results.append((began - started, time.monotonic() - began, error))
+
+    started = time.monotonic()
+    threads = []
+    for entry in entries:
+        if speed > 0:
+            wait = (entry['offset'] - start_offset) / speed - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+        thread = threading.Thread(target=issue, args=(entry,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    latencies = [latency for _, latency, error in results if error is None]
+    return {
+        'requests': len(results),
+        'errors': dict(Counter(error for _, _, error in results if error)),
+        'wall_seconds': time.monotonic() - started,
+        'latency_p50': _percentile(latencies, 0.5) if latencies else None,
+        'latency_p95': _percentile(latencies, 0.95) if latencies else None,
+        'latency_max': max(latencies) if latencies else None,
+    }
+
+def _main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m utils.cassette", description="Cassetes de chamadas ao Gemini")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info = subparsers.add_parser("info", help="Resumo de um cassete")
+    info.add_argument("path", type=Path)
+    replay = subparsers.add_parser("replay", help="Repete o tráfego gravado offline")
+    replay.add_argument("path", type=Path)
+    replay.add_argument("--speed", type=float, default=1.0, help="Aceleração das chegadas (0 = todas de uma vez)")
+    replay.add_argument("--latency-scale", type=float, default=1.0, help="Fator da latência das respostas")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        report = summarize(args.path)
+    else:
+        report = replay_traffic(args.path, args.speed, args.latency_scale)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    # Roda pelo módulo importado (e não por __main__) para o GeminiClient ver o mesmo cassete
+    from utils.cassette import _main as main
+    sys.exit(main(sys.argv[1:]))
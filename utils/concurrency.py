@@ -0,0 +1,161 @@
+"""
+Limite de concorrência adaptativo (AIMD) por modelo do Gemini.
+Um limite fixo ou deixa cota parada (baixo demais) ou provoca rajadas de 429 (alto
+demais). Aqui cada modelo tem seu próprio limite, que cresce devagar enquanto as
+chamadas terminam bem e com latência normal (aumento aditivo) e cai pela metade em
+429/RESOURCE_EXHAUSTED ou indisponibilidade (redução multiplicativa); picos de
+latência reduzem o limite de leve. Um conceito curto e um pitch deck longo usam o mesmo
+modelo, então o pico é medido contra a média das chamadas de tamanho parecido (faixas de
+tokens de saída), não contra uma média única. O escalonador (utils/scheduler.py) consulta esses
+limites antes de liberar cada chamada.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Limites iniciais, mínimo e máximo por modelo (o máximo global é FORGE_MAX_INFLIGHT)
+INITIAL_LIMIT = float(os.getenv('FORGE_MODEL_CONCURRENCY', '4'))
+MIN_LIMIT = 1.0
+
+# Fatores de redução: sobrecarga (429/503) e pico de latência
+BACKOFF_FACTOR = 0.5
+LATENCY_BACKOFF_FACTOR = 0.9
+
+# Latência acima de SPIKE_FACTOR × média móvel conta como pico (após MIN_SAMPLES chamadas)
+SPIKE_FACTOR = float(os.getenv('FORGE_LATENCY_SPIKE_FACTOR', '2.5'))
+MIN_SAMPLES = 5
+EWMA_ALPHA = 0.1
+
+# Faixas de tokens de saída com médias de latência próprias (respostas curtas, médias, longas...)
+SIZE_BUCKETS = (256, 1024, 4096)
+
+def size_bucket(output_tokens: Optional[int]) -> int:
+    """Faixa de tamanho da resposta; -1 quando o número de tokens não é conhecido."""
+    return -1 if output_tokens is None else bisect.bisect_right(SIZE_BUCKETS, output_tokens)
+
+# Códigos/estados do Gemini que indicam sobrecarga ou falta de cota
+_OVERLOAD_CODES = {429, 503}
+_OVERLOAD_STATUSES = ('RESOURCE_EXHAUSTED', 'UNAVAILABLE')
+
+def is_overload_error(error: BaseException) -> bool:
+    """True para 429/RESOURCE_EXHAUSTED e 503/UNAVAILABLE do Gemini."""
+    if getattr(error, 'code', None) in _OVERLOAD_CODES:
+        return True
+    status = getattr(error, 'status', None) or ""
+    return any(marker in status or marker in str(error) for marker in _OVERLOAD_STATUSES)
+
+class AIMDLimit:
+    """Limite de chamadas simultâneas de um modelo, ajustado pelo resultado das chamadas."""
+
+    def __init__(self, model: str, initial: float = INITIAL_LIMIT, maximum: float = 8.0,
+                 history: Optional[Deque[Dict[str, Any]]] = None):
+        self.model = model
+        self.maximum = maximum
+        self.limit = max(MIN_LIMIT, min(initial, maximum))
+        self.latency_ewma: Optional[float] = None
+        self.samples = 0
+        # Faixa de tamanho -> [média móvel da latência, amostras]
+        self._by_size: Dict[int, List[float]] = {}
+        self.successes = 0
+        self.overloads = 0
+        self.spikes = 0
+        self._last_decrease = 0.0
+        self._history = history if history is not None else deque(maxlen=50)
+
+    @property
+    def slots(self) -> int:
+        """Número inteiro de chamadas que podem estar em andamento."""
+        return max(1, int(self.limit))
+
+    def on_success(self, latency: float, inflight: int, started_at: float,
+                   output_tokens: Optional[int] = None):
+        """
+        Registra uma chamada bem-sucedida.
+
+        Args:
+            latency: Duração da chamada (s)
+            inflight: Chamadas do modelo em andamento quando esta terminou (incluindo ela)
+            started_at: time.monotonic() do início da chamada
+            output_tokens: Tokens gerados na resposta (escolhe a média de comparação)
+        """
+        self.successes += 1
+        bucket = self._by_size.setdefault(size_bucket(output_tokens), [latency, 0])
+        ewma, samples = bucket
+        spike = samples >= MIN_SAMPLES and latency > SPIKE_FACTOR * ewma
+        bucket[0] = latency if not samples else (1 - EWMA_ALPHA) * ewma + EWMA_ALPHA * latency
+        bucket[1] = samples + 1
+        # Média geral, só para exibição
+        self.samples += 1
+        self.latency_ewma = latency if self.latency_ewma is None else \
+            (1 - EWMA_ALPHA) * self.latency_ewma + EWMA_ALPHA * latency
+        if spike and started_at >= self._last_decrease:
+            self.spikes += 1
+            self._decrease(LATENCY_BACKOFF_FACTOR, f"pico de latência ({latency:.1f}s)")
+        elif inflight >= self.slots:
+            # Só cresce quando o limite atual está de fato sendo usado
+            self._set(min(self.maximum, self.limit + 1.0 / self.limit), None)
+
+    def on_overload(self, error: BaseException, started_at: float):
+        """
+        Registra um 429/503: reduz o limite pela metade.
+
+        Args:
+            error: Erro retornado pelo Gemini
+            started_at: time.monotonic() do início da chamada
+        """
+        self.overloads += 1
+        # Chamadas liberadas antes da última redução refletem o limite antigo:
+        # uma rajada de 429 reduz o limite uma vez só
+        if started_at < self._last_decrease:
+            return
+        self._decrease(BACKOFF_FACTOR, f"sobrecarga ({getattr(error, 'code', None) or type(error).__name__})")
+
+    def _decrease(self, factor: float, reason: str):
+        self._last_decrease = time.monotonic()
+        self._set(max(MIN_LIMIT, self.limit * factor), reason)
+
+    def _set(self, limit: float, reason: Optional[str]):
+        previous_slots = self.slots
+        self.limit = limit
+        # O histórico registra reduções e cada vez que o limite inteiro muda
+        if reason or self.slots != previous_slots:
+            self._history.append({'time': time.time(), 'model': self.model, 'from': previous_slots,
+                                  'to': self.slots, 'reason': reason or "aumento aditivo"})
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'limit': round(self.limit, 2),
+            'slots': self.slots,
+            'latency_ewma': self.latency_ewma,
+            'successes': self.successes,
+            'overloads': self.overloads,
+            'latency_spikes': self.spikes,
+        }
+
+class ModelLimits:
+    """Um AIMDLimit por modelo, criado no primeiro uso; os ajustes de todos ficam em `history`."""
+
+    def __init__(self, maximum: float):
+        self.maximum = maximum
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._limits: Dict[str, AIMDLimit] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> AIMDLimit:
+        with self._lock:
+            if model not in self._limits:
+                self._limits[model] = AIMDLimit(model, maximum=self.maximum, history=self.history)
+            return self._limits[model]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {model: limit.snapshot() for model, limit in self._limits.items()}
+
+    def adjustments(self) -> List[Dict[str, Any]]:
+        """Ajustes recentes dos limites, do mais antigo ao mais recente."""
+        with self._lock:
+            return list(self.history)
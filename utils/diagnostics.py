@@ -0,0 +1,193 @@
+"""
+Módulo de diagnósticos de desempenho do Game Concept Forge.
+Mede o custo de import a frio (no estilo `python -X importtime`) e expõe
+um painel opcional na sidebar, habilitado por FORGE_DIAGNOSTICS=1.
+
+Uso via linha de comando:
+    python -m utils.diagnostics importtime
+    python -m utils.diagnostics importtime utils.gemini_client --top 20
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Módulos que compõem o cold start do servidor e o primeiro acesso às páginas
+DEFAULT_IMPORT_TARGETS = (
+    "streamlit",
+    "utils",
+    "utils.sidebar",
+    "utils.gemini_client",
+    "utils.pdf_generator",
+)
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+def diagnostics_enabled() -> bool:
+    """Indica se o painel de diagnósticos deve ser exibido."""
+    return os.getenv('FORGE_DIAGNOSTICS', '').lower() in ('1', 'true', 'yes')
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """
+    Converte a saída de `-X importtime` em uma lista de registros.
+
+    Args:
+        output: Texto emitido em stderr pelo interpretador
+
+    Returns:
+        list: Registros com module, self_us, cumulative_us e depth
+    """
+    records = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': len(indent) // 2,
+            })
+    return records
+
+def measure_cold_import(module: str, top: int = 10) -> Dict[str, Any]:
+    """
+    Importa um módulo em um interpretador novo e mede o custo de import a frio.
+
+    Args:
+        module: Nome do módulo a importar
+        top: Quantidade de dependências mais caras (por tempo próprio) a retornar
+
+    Returns:
+        dict: total_ms, número de módulos carregados e as dependências mais caras
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=str(ROOT_DIR), check=False
+    )
+    records = parse_importtime(result.stderr)
+    target = next((r for r in reversed(records) if r['module'] == module), None)
+    hotspots = sorted(records, key=lambda r: r['self_us'], reverse=True)[:top]
+    return {
+        'module': module,
+        'ok': result.returncode == 0,
+        'total_ms': (target['cumulative_us'] / 1000) if target else 0.0,
+        'modules_loaded': len(records),
+        'hotspots': [
+            {'module': r['module'], 'self_ms': r['self_us'] / 1000, 'cumulative_ms': r['cumulative_us'] / 1000}
+            for r in hotspots
+        ],
+    }
+
+def import_time_report(modules: Sequence[str] = DEFAULT_IMPORT_TARGETS, top: int = 10) -> List[Dict[str, Any]]:
+    """Mede o import a frio de cada módulo em um processo isolado."""
+    return [measure_cold_import(module, top) for module in modules]
+
+def render_diagnostics_panel():
+    """Exibe o painel de diagnósticos (use dentro de `with st.sidebar`)."""
+    import streamlit as st
+    from utils import get_import_timings
+
+    with st.expander("🩺 Diagnósticos", expanded=False):
+        st.markdown("**Imports sob demanda neste processo:**")
+        timings = get_import_timings()
+        if timings:
+            st.markdown("\n".join(f"- `utils.{name}`: {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+        else:
+            st.markdown("Nenhum submódulo carregado sob demanda ainda.")
+
+        from utils.json_repair import get_repair_stats
+        stats = get_repair_stats()
+        st.markdown(f"**Respostas JSON:** {stats['parsed']} diretas, {stats['repaired']} reparadas, "
+                    f"{stats['continued']} completadas por continuação, {stats['failed']} perdidas")
+
+        from utils.scheduler import get_scheduler
+        scheduler = get_scheduler().stats()
+        waiting = ", ".join(f"{count} {label}" for label, count in scheduler['waiting'].items()) or "nenhuma"
+        average = scheduler['avg_call_seconds']
+        st.markdown(f"**Chamadas ao Gemini:** {scheduler['inflight']}/{scheduler['max_inflight']} em andamento, "
+                    f"na fila: {waiting}" + (f", média {average:.1f}s por chamada" if average else ""))
+        if scheduler['models']:
+            st.markdown("\n".join(
+                f"- `{model}`: limite {info['limit']:.1f} ({info['inflight']} em andamento, "
+                f"{info['overloads']} sobrecargas, {info['latency_spikes']} picos de latência)"
+                for model, info in scheduler['models'].items()
+            ))
+        for adjustment in reversed(scheduler['adjustments'][-3:]):
+            st.caption(f"{time.strftime('%H:%M:%S', time.localtime(adjustment['time']))} "
+                       f"`{adjustment['model']}` {adjustment['from']} → {adjustment['to']}: {adjustment['reason']}")
+
+        from utils.key_pool import get_key_pool, load_api_keys
+        if len(load_api_keys()) > 1:
+            st.markdown("**Chaves da API (último minuto):**")
+            st.markdown("\n".join(
+                f"- `{key['key']}`: {key['requests_last_minute']} req, {key['tokens_last_minute']} tokens, "
+                f"folga {key['headroom']:.0%}" + (f", em pausa por {key['cooldown_seconds']:.0f}s"
+                                                  if key['cooldown_seconds'] else "")
+                for key in get_key_pool().stats()
+            ))
+
+        from utils.cassette import get_cassette
+        cassette = get_cassette()
+        if cassette is not None:
+            info = cassette.stats()
+            if cassette.replaying:
+                st.markdown(f"**Cassete (reprodução):** {info['replayed']} respostas servidas, "
+                            f"{info['misses']} não encontradas, {info['requests_available']} gravadas")
+            else:
+                st.markdown(f"**Cassete (gravação):** {info['recorded']} chamadas gravadas")
+            st.caption(f"`{info['path']}`")
+
+
+        from utils.prefetch import get_prefetch_totals, hit_rate
+        totals = get_prefetch_totals()
+        rate = hit_rate(totals)
+        st.markdown(f"**Pré-carregamento (todas as sessões):** {totals['issued']} emitidos, "
+                    f"{totals['hits']} aproveitados, {totals['wasted']} desperdiçados "
+                    f"({totals['wasted_tokens']} tokens)" + (f", taxa de acerto {rate:.0%}" if rate is not None else ""))
+
+        from utils.memory import render_memory_section
+        render_memory_section()
+
+        # A contagem percorre o diretório inteiro: só sob demanda
+        if st.button("Contar imagens em disco", key="diag_image_store"):
+            from utils.image_store import get_image_store
+            images = get_image_store().stats()
+            st.markdown(f"**Imagens em disco:** {images['images']} imagens, {images['bytes'] / 1024 ** 2:.1f} MB "
+                        f"de {images['max_bytes'] / 1024 ** 2:.0f} MB")
+
+        if st.button("Medir import a frio", key="diag_importtime"):
+            with st.spinner("Medindo imports..."):
+                for entry in import_time_report(top=3):
+                    st.markdown(f"**{entry['module']}**: {entry['total_ms']:.0f} ms "
+                                f"({entry['modules_loaded']} módulos)")
+                    st.markdown("\n".join(
+                        f"- `{h['module']}` {h['self_ms']:.1f} ms" for h in entry['hotspots']
+                    ))
+
+def _main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Diagnósticos do Game Concept Forge")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    importtime = subparsers.add_parser("importtime", help="Relatório de import a frio")
+    importtime.add_argument("modules", nargs="*", default=list(DEFAULT_IMPORT_TARGETS))
+    importtime.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "importtime":
+        for entry in import_time_report(args.modules, args.top):
+            status = "" if entry['ok'] else "  (falhou)"
+            print(f"\n{entry['module']}: {entry['total_ms']:.1f} ms, {entry['modules_loaded']} módulos{status}")
+            for h in entry['hotspots']:
+                print(f"  {h['self_ms']:>8.1f} ms próprio {h['cumulative_ms']:>9.1f} ms acumulado  {h['module']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,205 @@
+"""
+CLI headless do pipeline do Game Concept Forge.
+Lê ideias de um arquivo JSONL e executa, para cada uma, as mesmas etapas das páginas:
+conceito → análise de concorrentes → core loop → fluxo de jogo → pitch deck, usando os
+métodos do GeminiClient (via as tarefas de utils/tasks.py).
+
+Cada etapa concluída é gravada em um checkpoint por item, então uma execução
+interrompida retoma de onde parou; itens que falharam são tentados de novo a partir
+da etapa que falhou. Os resultados são gravados em JSONL à medida que
+cada item termina, com PDFs opcionais do pitch deck; as falhas vão para um JSONL
+à parte, então a saída tem um único registro por item concluído.
+
+Formato da entrada (uma ideia por linha):
+    {"id": "cartas-rio", "idea": "Um jogo de cartas com personagens históricos do Rio..."}
+    {"idea": "Roguelike de pesca em alto-mar"}
+
+Uso:
+    python -m utils.forge ideias.jsonl -o resultados.jsonl
+    python -m utils.forge ideias.jsonl -o resultados.jsonl --concurrency 8 --pdf-dir pdfs/
+    python -m utils.forge ideias.jsonl -o resultados.jsonl --stages concept,pitch_deck
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils.jobs import run_task  # noqa: E402
+from utils.scheduler import PRIORITY_BATCH, call_context  # noqa: E402
+
+# Etapa -> (tarefa registrada, função que monta os parâmetros a partir do item e das etapas anteriores)
+StageParams = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]
+STAGES: List[Tuple[str, str, StageParams]] = [
+    ("concept", "concept", lambda item, done: {'idea': item['idea'], 'model': item.get('model', 'gemini-2.5-flash'),
+                                               'with_image': False}),
+    ("competitor_analysis", "competitor_analysis", lambda item, done: {'game_concept': item['idea']}),
+    ("core_loop", "core_loop", lambda item, done: {'game_concept': item['idea']}),
+    ("game_flow", "game_flow", lambda item, done: {'game_concept': item['idea']}),
+    ("pitch_deck", "pitch_deck", lambda item, done: {'concept_data': dict(done['concept'])}),
+]
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+def item_id(item: Dict[str, Any]) -> str:
+    """ID do item: o informado na entrada ou um hash estável da ideia (para retomar)."""
+    if item.get('id'):
+        return str(item['id'])
+    return hashlib.sha1(item['idea'].encode('utf-8')).hexdigest()[:12]
+
+def read_items(path: Path) -> List[Dict[str, Any]]:
+    """Lê o JSONL de entrada; aceita as chaves "idea" ou "ideia"."""
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            idea = record.get('idea') or record.get('ideia')
+            if not idea:
+                raise ValueError(f"{path}:{line_number}: item sem 'idea'")
+            items.append({**record, 'idea': idea})
+    return items
+
+class Checkpoints:
+    """Um arquivo JSON por item com as etapas já concluídas, gravado de forma atômica."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> Dict[str, Any]:
+        path = self._path(key)
+        if path.exists():
+            return json.loads(path.read_text(encoding='utf-8'))
+        return {'stages': {}, 'emitted': False}
+
+    def save(self, key: str, state: Dict[str, Any]):
+        tmp = self._path(key).with_suffix('.tmp')
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, self._path(key))
+
+class BatchRunner:
+    """Executa o pipeline para vários itens com concorrência limitada."""
+
+    def __init__(self, output: Path, checkpoints: Checkpoints, stages: List[str],
+                 pdf_dir: Optional[Path] = None, retries: int = 2, client: Any = None,
+                 errors: Optional[Path] = None):
+        self.output = output
+        self.errors = errors or output.with_name(output.name + ".errors.jsonl")
+        self.checkpoints = checkpoints
+        self.stages = [stage for stage in STAGES if stage[0] in stages]
+        self.pdf_dir = pdf_dir
+        self.retries = retries
+        self.client = client
+        self._output_lock = threading.Lock()
+        self.summary = {'done': 0, 'failed': 0, 'skipped': 0}
+
+    def run(self, items: List[Dict[str, Any]], concurrency: int = 4) -> Dict[str, int]:
+        if self.pdf_dir:
+            self.pdf_dir.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="forge-batch") as pool:
+            list(pool.map(self.process_item, items))
+        return self.summary
+
+    def process_item(self, item: Dict[str, Any]):
+        key = item_id(item)
+        state = self.checkpoints.load(key)
+        if state.get('emitted'):
+            self._count('skipped')
+            return
+
+        completed = state['stages']
+        for stage, task_name, build_params in self.stages:
+            if stage in completed:
+                continue
+            try:
+                completed[stage] = self._run_stage(task_name, build_params(item, completed))
+            except Exception as e:
+                self._emit(self.errors, {'id': key, 'idea': item['idea'], 'stage': stage, 'error': str(e),
+                                         'completed_stages': list(completed)})
+                self.checkpoints.save(key, state)
+                self._count('failed')
+                print(f"[{key}] {stage}: falhou ({e})", file=sys.stderr)
+                return
+            self.checkpoints.save(key, state)
+            print(f"[{key}] {stage}: ok", file=sys.stderr)
+
+        if self.pdf_dir and 'pitch_deck' in completed:
+            from utils.pdf_generator import generate_pitch_deck_pdf
+            (self.pdf_dir / f"{key}.pdf").write_bytes(generate_pitch_deck_pdf(completed['pitch_deck']).getvalue())
+
+        self._emit(self.output, {'id': key, 'idea': item['idea'], **completed})
+        state['emitted'] = True
+        self.checkpoints.save(key, state)
+        self._count('done')
+
+    def _run_stage(self, task_name: str, params: Dict[str, Any]) -> Any:
+        for attempt in range(self.retries + 1):
+            try:
+                # Lotes ficam atrás das gerações interativas no escalonador do processo
+                with call_context('forge', PRIORITY_BATCH):
+                    result = run_task(task_name, params, self.client)
+                # O conceito das páginas também traz os IDs das artes, que não vão para o JSONL
+                return result['gdd'] if task_name == 'concept' else result
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _emit(self, path: Path, record: Dict[str, Any]):
+        with self._output_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _count(self, key: str):
+        with self._output_lock:
+            self.summary[key] += 1
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.forge", description="Pipeline headless do Game Concept Forge")
+    parser.add_argument("input", type=Path, help="JSONL com uma ideia por linha")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL de saída (acrescenta ao final)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Itens processados ao mesmo tempo")
+    parser.add_argument("--stages", default=",".join(STAGE_NAMES),
+                        help=f"Etapas a executar, separadas por vírgula ({', '.join(STAGE_NAMES)})")
+    parser.add_argument("--checkpoint-dir", type=Path,
+                        help="Diretório dos checkpoints (padrão: <output>.checkpoints)")
+    parser.add_argument("--errors", type=Path,
+                        help="JSONL das falhas, uma linha por tentativa (padrão: <output>.errors.jsonl)")
+    parser.add_argument("--pdf-dir", type=Path, help="Grava o PDF do pitch deck de cada item neste diretório")
+    parser.add_argument("--retries", type=int, default=2, help="Novas tentativas por etapa, com backoff exponencial")
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGE_NAMES)
+    if unknown:
+        parser.error(f"etapas desconhecidas: {', '.join(sorted(unknown))}")
+    if 'pitch_deck' in stages and 'concept' not in stages:
+        parser.error("a etapa pitch_deck depende da etapa concept")
+
+    items = read_items(args.input)
+    checkpoints = Checkpoints(args.checkpoint_dir or args.output.with_name(args.output.name + ".checkpoints"))
+    runner = BatchRunner(args.output, checkpoints, stages, pdf_dir=args.pdf_dir, retries=args.retries,
+                         errors=args.errors)
+
+    start = time.perf_counter()
+    summary = runner.run(items, concurrency=args.concurrency)
+    print(f"{len(items)} itens em {time.perf_counter() - start:.1f}s: {summary['done']} concluídos, "
+          f"{summary['failed']} com falha, {summary['skipped']} já concluídos antes", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -4,22 +4,44 @@ Centraliza a configuração e operações comuns da API.
 """
 
 import os
-from google import genai
 from google.genai import types
-from PIL import Image
-from io import BytesIO
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import json
+import threading
+import time
+
+from utils.cassette import get_cassette
+from utils.image_store import IMAGE_MODEL
+from utils.json_repair import is_truncated, parse_json_response, record as record_repair, strip_code_fences
+from utils.key_pool import get_key_pool, is_quota_error
+from utils.schemas import (
+    ANALISE_CONCORRENTES_SCHEMA, CORE_LOOP_DETALHADO_SCHEMA, FLUXO_JOGO_SCHEMA, ONE_PAGE_GDD_SCHEMA,
+    PITCH_DECK_SCHEMA
+)
+from utils.scheduler import get_scheduler
+from utils.tracing import record_span, span, traced
+from utils.usage import add_tokens
+
+CONTINUATION_PROMPT = (
+    "Sua resposta anterior foi cortada pelo limite de tokens. Continue exatamente a partir do "
+    "último caractere enviado, sem repetir nada e sem texto adicional, até completar o JSON."
+)
+
+def _finish_reason(response) -> Optional[types.FinishReason]:
+    candidates = getattr(response, 'candidates', None) or []
+    return candidates[0].finish_reason if candidates else None
 
 class GeminiClient:
     """Cliente centralizado para operações com a API Gemini."""
 
     def __init__(self):
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY não encontrada nas variáveis de ambiente")
-
-        self.client = genai.Client()
+        # Gravação/reprodução das chamadas (FORGE_CASSETTE_MODE); reproduzindo, não há rede nem chave
+        self.cassette = get_cassette()
+        # Uma ou mais chaves (GEMINI_API_KEY, GEMINI_API_KEYS ou GEMINI_API_KEYS_FILE),
+        # compartilhadas pelo processo; levanta ValueError se nenhuma estiver configurada
+        self.key_pool = None if self.cassette and self.cassette.replaying else get_key_pool()
+        # Pedidos de continuação quando a resposta JSON é cortada por MAX_TOKENS
+        self.max_continuations = int(os.getenv('FORGE_MAX_CONTINUATIONS', '2'))
         self.safety_settings = [
             {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
             {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
@@ -31,8 +53,10 @@ class GeminiClient:
                         prompt: str,
                         system_instruction: str = "",
                         response_schema: Optional[Dict] = None,
-                        model: str = "gemini-2.5-flash") -> Dict[str, Any]:
-        """Gera conteúdo usando o modelo Gemini."""
+                        model: str = "gemini-2.5-flash",
+                        temperature: Optional[float] = None,
+                        seed: Optional[int] = None) -> Dict[str, Any]:
+        """Gera conteúdo usando o modelo Gemini (temperatura e seed opcionais, para variações)."""
         config_params = {
             "model": model,
             "contents": prompt,
@@ -44,18 +68,124 @@ class GeminiClient:
         if system_instruction:
             config_params["config"].system_instruction = system_instruction
 
+        if temperature is not None:
+            config_params["config"].temperature = temperature
+        if seed is not None:
+            config_params["config"].seed = seed
+
         if response_schema:
             config_params["config"].response_mime_type = 'application/json'
             config_params["config"].response_schema = response_schema
 
-        response = self.client.models.generate_content(**config_params)
-        return json.loads(response.text) if response_schema else response.text
+        response = self._generate(**config_params)
+        if not response_schema:
+            return response.text
+
+        # Resposta cortada por limite de tokens: pede só o trecho que falta
+        text = response.text or ""
+        continuations = 0
+        while True:
+            while _finish_reason(response) == types.FinishReason.MAX_TOKENS and continuations < self.max_continuations:
+                response = self._continue_json(model, prompt, system_instruction, text)
+                text += strip_code_fences(response.text or "")
+                continuations += 1
 
-    def generate_image(self, prompt: str) -> Optional[Image.Image]:
-        """Gera uma imagem baseada no prompt fornecido."""
+            try:
+                with span("json.parse", chars=len(text)):
+                    data, repaired = parse_json_response(text, response_schema)
+            except ValueError:
+                record_repair('failed')
+                raise
+            # Só continua se o reparo precisou fechar strings ou objetos abertos (texto cortado);
+            # um JSON completo com cercas ou vírgulas sobrando não justifica outra chamada
+            if not repaired or continuations >= self.max_continuations or not is_truncated(text):
+                break
+            response = self._continue_json(model, prompt, system_instruction, text)
+            text += strip_code_fences(response.text or "")
+            continuations += 1
+        record_repair('continued' if continuations else 'repaired' if repaired else 'parsed')
+        return data
+
+    def _generate(self, **kwargs):
+        """Faz a chamada ao Gemini quando o escalonador do processo liberar uma vaga e houver chave com cota."""
+        with span("gemini.chamada", model=kwargs['model']) as call:
+            if self.cassette and self.cassette.replaying:
+                response = self._call_in_slot(kwargs, lambda ticket: self.cassette.replay(kwargs))
+            else:
+                response = self._generate_with_pool(kwargs)
+            usage = getattr(response, 'usage_metadata', None)
+            if usage is not None:
+                call.set(prompt_tokens=usage.prompt_token_count or 0, output_tokens=usage.candidates_token_count or 0)
+        add_tokens(response)
+        return response
+
+    def _call_in_slot(self, kwargs: Dict[str, Any], request):
+        """Executa `request(ticket)` com uma vaga do escalonador; 429/503 ajustam o limite do modelo."""
+        queued_ns = time.time_ns()
+        with get_scheduler().slot(kwargs['model']) as ticket:
+            record_span("escalonador.fila", queued_ns, time.time_ns())
+            # Inclui HTTP, espera pelo modelo e decodificação da resposta pelo SDK
+            with span("gemini.upstream"):
+                return request(ticket)
+
+    def _generate_with_pool(self, kwargs: Dict[str, Any]):
+        # Usa a chave com mais folga; em 429 pausa a chave e tenta a próxima.
+        # A chave só é escolhida com a vaga já liberada: a janela de RPM registra o envio
+        # real e as pausas de chaves que levaram 429 durante a fila já valem.
+        def request(ticket):
+            key = self.key_pool.acquire()
+            # A espera por cota não é latência do modelo
+            ticket.started_at = time.monotonic()
+            try:
+                response = key.client.models.generate_content(**kwargs)
+            except Exception as e:
+                if is_quota_error(e):
+                    self.key_pool.penalize(key, e)
+                else:
+                    self.key_pool.release(key)
+                raise
+            if self.cassette:
+                self.cassette.record(kwargs, response, time.monotonic() - ticket.started_at)
+            usage = getattr(response, 'usage_metadata', None)
+            if usage is not None:
+                ticket.output_tokens = usage.candidates_token_count or 0
+            self.key_pool.release(key, (usage.total_token_count or 0) if usage else 0)
+            return response
+
+        for attempt in range(len(self.key_pool)):
+            try:
+                return self._call_in_slot(kwargs, request)
+            except Exception as e:
+                # O 429 já contou para o limite do modelo ao sair da vaga; tenta a próxima chave
+                if not is_quota_error(e) or attempt == len(self.key_pool) - 1:
+                    raise
+
+    def _continue_json(self, model: str, prompt: str, system_instruction: str, partial: str):
+        """Pede ao modelo que complete um JSON truncado a partir do último caractere."""
+        config = types.GenerateContentConfig(safety_settings=self.safety_settings)
+        if system_instruction:
+            config.system_instruction = system_instruction
+        return self._generate(
+            model=model,
+            contents=[
+                types.Content(role="user", parts=[types.Part(text=prompt)]),
+                types.Content(role="model", parts=[types.Part(text=partial)]),
+                types.Content(role="user", parts=[types.Part(text=CONTINUATION_PROMPT)]),
+            ],
+            config=config
+        )
+
+    @traced("gemini.generate_image")
+    def generate_image(self, prompt: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Gera uma imagem baseada no prompt fornecido.
+
+        Returns:
+            Bytes codificados como vieram da API e o tipo MIME (sem decodificar), ou None
+        """
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-preview-image-generation",
+            response = self._generate(
+                model=IMAGE_MODEL,
                 contents=prompt,
                 config=types.GenerateContentConfig(
                     response_modalities=['TEXT', 'IMAGE']
@@ -64,14 +194,43 @@ class GeminiClient:
 
             for part in response.candidates[0].content.parts:
                 if part.inline_data is not None:
-                    image = Image.open(BytesIO(part.inline_data.data))
-                    return image
+                    return part.inline_data.data, part.inline_data.mime_type or 'image/png'
 
             return None
         except Exception as e:
             print(f"Erro ao gerar imagem: {e}")
             return None
 
+    @traced("gemini.generate_concept")
+    def generate_concept(self, idea: str, model: str = "gemini-2.5-flash",
+                         temperature: Optional[float] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """Gera a minuta de One-Page GDD a partir da ideia inicial do usuário."""
+        system_instruction = """
+Você é um "Arquiteto de Conceitos de Jogo", uma inteligência artificial especializada em transformar ideias iniciais de usuários em conceitos de jogo estruturados. Sua função principal é:
+
+1. **Analisar a Ideia Central:** Compreender a essência da ideia do usuário para o jogo.
+2. **Desenvolver o Core Loop:** Descrever o ciclo fundamental de atividades que o jogador repetirá no jogo, incluindo Ação, Recompensa e Progressão.
+3. **Propor Mecânicas de Jogo:** Detalhar as regras e sistemas que governam a interação do jogador com o mundo do jogo e seus elementos.
+4. **Elaborar uma Minuta de One-Page GDD:** Gerar um documento conciso que resuma os elementos chave do conceito.
+
+**Restrições e Diretrizes:**
+* Mantenha a concisão e a clareza. O objetivo é uma "minuta" de GDD de uma página.
+* Concentre-se em conceitos jogáveis e viáveis.
+* Evite jargões excessivos sem explicação.
+* Se a ideia do usuário for vaga, faça suposições razoáveis e criativas para preencher as lacunas.
+* Sempre retorne o conceito de jogo estruturado e a minuta do GDD.
+"""
+
+        return self.generate_content(
+            prompt=idea,
+            system_instruction=system_instruction,
+            response_schema=ONE_PAGE_GDD_SCHEMA,
+            model=model,
+            temperature=temperature,
+            seed=seed
+        )
+
+    @traced("gemini.analyze_competitors")
     def analyze_competitors(self, game_concept: str) -> Dict[str, Any]:
         """Analisa concorrentes para um conceito de jogo."""
         system_instruction = """
@@ -88,20 +247,10 @@ class GeminiClient:
         return self.generate_content(
             prompt=f"Analise os concorrentes para este conceito de jogo: {game_concept}",
             system_instruction=system_instruction,
-            response_schema={
-                "type": "object",
-                "properties": {
-                    "concorrentes_diretos": {"type": "array", "items": {"type": "string"}},
-                    "jogos_similares": {"type": "array", "items": {"type": "string"}},
-                    "pontos_fortes_concorrentes": {"type": "array", "items": {"type": "string"}},
-                    "pontos_fracos_concorrentes": {"type": "array", "items": {"type": "string"}},
-                    "oportunidades_diferencacao": {"type": "array", "items": {"type": "string"}},
-                    "tendencias_mercado": {"type": "array", "items": {"type": "string"}},
-                    "recomendacoes": {"type": "array", "items": {"type": "string"}}
-                }
-            }
+            response_schema=ANALISE_CONCORRENTES_SCHEMA
         )
 
+    @traced("gemini.develop_core_loop")
     def develop_core_loop(self, game_concept: str) -> Dict[str, Any]:
         """Desenvolve um core loop detalhado para o conceito de jogo."""
         system_instruction = """
@@ -119,26 +268,10 @@ class GeminiClient:
         return self.generate_content(
             prompt=f"Desenvolva um core loop detalhado para: {game_concept}",
             system_instruction=system_instruction,
-            response_schema={
-                "type": "object",
-                "properties": {
-                    "acoes_principais": {"type": "array", "items": {"type": "string"}},
-                    "sistema_recompensas": {"type": "object", "properties": {
-                        "recompensas_imediatas": {"type": "array", "items": {"type": "string"}},
-                        "recompensas_longo_prazo": {"type": "array", "items": {"type": "string"}},
-                        "sistema_progressao": {"type": "string"}
-                    }},
-                    "feedback_loops": {"type": "array", "items": {"type": "string"}},
-                    "mecanicas_retencao": {"type": "array", "items": {"type": "string"}},
-                    "balanceamento": {"type": "object", "properties": {
-                        "dificuldade_inicial": {"type": "string"},
-                        "curva_dificuldade": {"type": "string"},
-                        "pontos_ajuste": {"type": "array", "items": {"type": "string"}}
-                    }}
-                }
-            }
+            response_schema=CORE_LOOP_DETALHADO_SCHEMA
         )
 
+    @traced("gemini.create_game_flow")
     def create_game_flow(self, game_concept: str) -> Dict[str, Any]:
         """Cria um fluxo de jogo detalhado."""
         system_instruction = """
@@ -156,27 +289,90 @@ class GeminiClient:
         return self.generate_content(
             prompt=f"Crie um fluxo de jogo detalhado para: {game_concept}",
             system_instruction=system_instruction,
-            response_schema={
-                "type": "object",
-                "properties": {
-                    "onboarding": {"type": "object", "properties": {
-                        "tutorial": {"type": "string"},
-                        "primeiros_passos": {"type": "array", "items": {"type": "string"}},
-                        "objetivos_iniciais": {"type": "array", "items": {"type": "string"}}
-                    }},
-                    "progressao": {"type": "object", "properties": {
-                        "estrutura_niveis": {"type": "string"},
-                        "desbloqueios": {"type": "array", "items": {"type": "string"}},
-                        "momentos_chave": {"type": "array", "items": {"type": "string"}}
-                    }},
-                    "decisoes_jogador": {"type": "array", "items": {"type": "string"}},
-                    "checkpoints": {"type": "array", "items": {"type": "string"}},
-                    "fluxo_monetizacao": {"type": "array", "items": {"type": "string"}},
-                    "experiencia_usuario": {"type": "object", "properties": {
-                        "pontos_alto": {"type": "array", "items": {"type": "string"}},
-                        "pontos_baixo": {"type": "array", "items": {"type": "string"}},
-                        "otimizacoes": {"type": "array", "items": {"type": "string"}}
-                    }}
-                }
-            }
-        )
\ No newline at end of file
+            response_schema=FLUXO_JOGO_SCHEMA
+        )
+
+    @staticmethod
+    def build_pitch_deck_prompt(concept_data: Dict[str, Any]) -> str:
+        """Monta o prompt do usuário para o pitch deck a partir do GDD."""
+        return f"""
+    Crie um pitch deck profissional de 10 slides para o seguinte conceito de jogo:
+
+    TÍTULO: {concept_data.get('titulo_provisorio', 'Jogo sem título')}
+    GÊNERO: {concept_data.get('genero', 'Não especificado')}
+    PLATAFORMAS: {', '.join(concept_data.get('plataformas_alvo', []))}
+    PÚBLICO-ALVO: {', '.join(concept_data.get('publico_alvo', []))}
+    PREMISSA: {concept_data.get('premissa_conceito_central', 'Não especificada')}
+    CORE LOOP: {concept_data.get('core_loop', {})}
+    MECÂNICAS: {concept_data.get('mecanicas_principais', [])}
+    MONETIZAÇÃO: {concept_data.get('monetizacao_opcional', [])}
+    USPs: {concept_data.get('pontos_de_venda_unicos_usps', [])}
+
+    Crie um pitch deck que seja convincente para investidores, publishers e parceiros, destacando:
+    - Oportunidade de mercado clara
+    - Diferenciação competitiva
+    - Modelo de negócio viável
+    - Roadmap realista
+    - Potencial de retorno
+
+    Retorne apenas o JSON do pitch deck, sem texto adicional.
+    """
+
+    @traced("gemini.generate_pitch_deck")
+    def generate_pitch_deck(self, concept_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Gera um pitch deck de 10 slides para o conceito de jogo."""
+        system_instruction = """
+    Você é um especialista em criação de pitch decks para jogos, com vasta experiência em apresentações para investidores, publishers e parceiros da indústria de games.
+
+    Sua tarefa é criar um pitch deck profissional de 10 slides para um conceito de jogo, seguindo as melhores práticas da indústria.
+
+    ESTRUTURA DO PITCH DECK (10 SLIDES):
+
+    1. **SLIDE TÍTULO** - Nome do jogo, tagline, equipe
+    2. **PROBLEMA/OPORTUNIDADE** - Gap no mercado, necessidade não atendida
+    3. **SOLUÇÃO/CONCEITO** - Como o jogo resolve o problema
+    4. **ANÁLISE DE MERCADO** - Tamanho, crescimento, segmentos
+    5. **MODELO DE NEGÓCIO** - Monetização, receitas, custos
+    6. **DIFERENCIAÇÃO** - Vantagens competitivas, USPs
+    7. **ROADMAP** - Fases de desenvolvimento, cronograma
+    8. **EQUIPE/RECURSOS** - Experiência, capacidades
+    9. **PROJEÇÕES FINANCEIRAS** - Receitas, ROI, break-even
+    10. **CALL TO ACTION** - Próximos passos, investimento necessário
+
+    DIRETRIZES:
+    - Cada slide deve ser conciso e impactante
+    - Use dados e métricas quando possível
+    - Foque em benefícios e oportunidades
+    - Seja específico sobre números e prazos
+    - Mantenha tom profissional mas acessível
+    - Inclua elementos visuais sugeridos para cada slide
+
+    FORMATO DE RESPOSTA:
+    Retorne apenas um JSON válido seguindo a estrutura PitchDeck definida, sem texto adicional.
+    """
+
+        return self.generate_content(
+            prompt=self.build_pitch_deck_prompt(concept_data),
+            system_instruction=system_instruction,
+            response_schema=PITCH_DECK_SCHEMA
+        )
+
+# --- Cliente compartilhado ---
+_default_client: Optional[GeminiClient] = None
+_default_client_lock = threading.Lock()
+
+def get_default_client() -> GeminiClient:
+    """
+    Retorna um GeminiClient compartilhado pelo processo.
+
+    Usado pelos jobs em segundo plano, que rodam fora do contexto de uma página
+    e não têm acesso ao st.cache_resource das páginas.
+
+    Raises:
+        ValueError: Se nenhuma chave da API estiver configurada
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = GeminiClient()
+        return _default_client
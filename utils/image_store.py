@@ -0,0 +1,271 @@
+"""
+Armazenamento em disco das imagens geradas, endereçado pelo conteúdo do pedido.
+Cada imagem é identificada pelo hash do modelo e do prompt: pedir de novo a mesma arte
+devolve a imagem já gravada, sem outra chamada ao modelo de imagem. Guarda os bytes
+originais (como vieram do Gemini) e miniaturas WebP nas larguras exibidas pelas páginas;
+o navegador recebe as miniaturas e o PDF usa o original.
+
+As imagens trafegam como bytes codificados com o tipo MIME e só são decodificadas para
+gerar miniaturas. As páginas as exibem por data URL (`data_url`), que o st.image repassa
+ao navegador sem abrir no PIL nem recodificar; o placeholder também é gerado aqui, uma
+vez por processo, sem buscar nada na rede.
+
+As páginas e o gerador de PDF referenciam as imagens pelo ID, então o session_state
+guarda só strings. Passando de FORGE_IMAGE_STORE_MB, as imagens usadas há mais tempo
+são removidas.
+
+Configuração:
+    FORGE_IMAGE_DIR=data/images     diretório local (no mesmo host do app e dos workers)
+    FORGE_IMAGE_STORE_MB=500        tamanho máximo em disco
+"""
+
+import base64
+import functools
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.tracing import span
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+IMAGE_DIR = Path(os.getenv('FORGE_IMAGE_DIR') or ROOT_DIR / 'data' / 'images')
+MAX_STORE_BYTES = int(float(os.getenv('FORGE_IMAGE_STORE_MB', '500')) * 1024 * 1024)
+
+# Modelo que gera as imagens (entra no hash: o mesmo prompt em outro modelo é outra imagem)
+IMAGE_MODEL = "gemini-2.0-flash-preview-image-generation"
+
+# Larguras exibidas pelas páginas: coluna de uma grade de candidatas e imagem única
+THUMBNAIL_WIDTHS = (320, 800)
+THUMBNAIL_QUALITY = 80
+
+def image_id(prompt: str, model: str = IMAGE_MODEL) -> str:
+    """ID da imagem gerada para o prompt (hash do modelo e do prompt)."""
+    return hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()[:32]
+
+def to_data_url(data: bytes, mime_type: str) -> str:
+    """Data URL da imagem: o st.image a envia como está, sem decodificar."""
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+@functools.lru_cache(maxsize=8)
+def placeholder_data_url(width: int = 600, height: int = 300, text: str = "Arte Conceitual Gerada") -> str:
+    """Placeholder da arte conceitual, desenhado localmente uma vez por processo."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new('RGB', (width, height), '#007bff')
+    try:
+        font = ImageFont.load_default(size=max(12, height // 10))
+    except TypeError:
+        # Pillow < 10.1: só a fonte bitmap padrão
+        font = ImageFont.load_default()
+    ImageDraw.Draw(image).text((width / 2, height / 2), text, fill='#ffffff', font=font, anchor='mm')
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return to_data_url(buffer.getvalue(), 'image/png')
+
+class ImageStore:
+    """Imagens originais e miniaturas em disco, com remoção das menos usadas."""
+
+    def __init__(self, root: Path = IMAGE_DIR, max_bytes: int = MAX_STORE_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    # --- Caminhos ---
+    def _dir(self, image_id: str) -> Path:
+        return self.root / image_id[:2]
+
+    def _meta_path(self, image_id: str) -> Path:
+        return self._dir(image_id) / f"{image_id}.json"
+
+    def _thumbnail_path(self, image_id: str, width: int) -> Path:
+        return self._dir(image_id) / f"{image_id}_w{width}.webp"
+
+    def _original_path(self, image_id: str, mime_type: str) -> Path:
+        extension = mimetypes.guess_extension(mime_type) or '.bin'
+        return self._dir(image_id) / f"{image_id}{extension}"
+
+    # --- Leitura ---
+    def meta(self, image_id: str) -> Optional[Dict[str, Any]]:
+        """prompt, mime_type, bytes e created_at da imagem, ou None se ela não está no disco."""
+        try:
+            return json.loads(self._meta_path(image_id).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+
+    def has(self, image_id: str) -> bool:
+        return self._meta_path(image_id).exists()
+
+    def _touch(self, image_id: str):
+        # A data de modificação dos metadados marca o último uso (ordem da remoção)
+        try:
+            os.utime(self._meta_path(image_id))
+        except OSError:
+            pass
+
+    def get(self, image_id: str) -> Optional[Tuple[bytes, str]]:
+        """Bytes originais e tipo MIME da imagem, ou None se ela foi removida."""
+        meta = self.meta(image_id)
+        if meta is None:
+            return None
+        try:
+            data = self._original_path(image_id, meta['mime_type']).read_bytes()
+        except OSError:
+            return None
+        self._touch(image_id)
+        return data, meta['mime_type']
+
+    def thumbnail(self, image_id: str, width: int = THUMBNAIL_WIDTHS[-1]) -> Optional[bytes]:
+        """
+        Miniatura WebP da imagem com no máximo `width` pixels de largura.
+
+        Larguras fora de THUMBNAIL_WIDTHS são geradas na primeira vez e ficam gravadas.
+        """
+        path = self._thumbnail_path(image_id, width)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            original = self.get(image_id)
+            if original is None:
+                return None
+            data = self._write_thumbnail(image_id, original[0], width)
+        else:
+            self._touch(image_id)
+        return data
+
+    def data_url(self, image_id: str, width: int = THUMBNAIL_WIDTHS[-1]) -> Optional[str]:
+        """Miniatura como data URL para o st.image, ou None se a imagem foi removida."""
+        thumbnail = self.thumbnail(image_id, width)
+        return to_data_url(thumbnail, 'image/webp') if thumbnail is not None else None
+
+    def find(self, prompt: str, model: str = IMAGE_MODEL) -> Optional[str]:
+        """ID da imagem já gerada para o prompt, se ela estiver no disco."""
+        candidate = image_id(prompt, model)
+        return candidate if self.has(candidate) else None
+
+    # --- Escrita ---
+    def _write_atomic(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
+
+    def _write_thumbnail(self, image_id: str, data: bytes, width: int) -> bytes:
+        from PIL import Image
+
+        with span("imagens.miniatura", width=width):
+            # Image.open lê só o cabeçalho; os pixels são decodificados apenas se houver redução
+            with Image.open(BytesIO(data)) as image:
+                if image.format == 'WEBP' and image.width <= width:
+                    thumbnail = data
+                else:
+                    image.thumbnail((width, width * 4))
+                    buffer = BytesIO()
+                    image.save(buffer, format='WEBP', quality=THUMBNAIL_QUALITY)
+                    thumbnail = buffer.getvalue()
+        self._write_atomic(self._thumbnail_path(image_id, width), thumbnail)
+        return thumbnail
+
+    def put(self, prompt: str, data: bytes, mime_type: str, model: str = IMAGE_MODEL) -> str:
+        """Grava a imagem gerada para o prompt com as miniaturas e retorna o ID."""
+        new_id = image_id(prompt, model)
+        self._write_atomic(self._original_path(new_id, mime_type), data)
+        for width in THUMBNAIL_WIDTHS:
+            self._write_thumbnail(new_id, data, width)
+        # Os metadados são gravados por último: uma imagem sem eles ainda não existe para os leitores
+        meta = {'prompt': prompt, 'model': model, 'mime_type': mime_type, 'bytes': len(data),
+                'created_at': time.time()}
+        self._write_atomic(self._meta_path(new_id), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        self.evict()
+        return new_id
+
+    def get_or_create(self, prompt: str, generate: Callable[[], Optional[Tuple[bytes, str]]],
+                      model: str = IMAGE_MODEL) -> Optional[str]:
+        """
+        ID da imagem do prompt, gerando-a com `generate()` só se ainda não estiver no disco.
+
+        Args:
+            prompt: Prompt da imagem
+            generate: Retorna (bytes, tipo MIME) da imagem gerada, ou None se falhou
+
+        Returns:
+            ID da imagem, ou None se ela não existia e a geração falhou
+        """
+        existing = self.find(prompt, model)
+        if existing is not None:
+            self._touch(existing)
+            return existing
+        generated = generate()
+        if generated is None:
+            return None
+        return self.put(prompt, *generated, model=model)
+
+    # --- Remoção ---
+    def _usage(self) -> Dict[str, Dict[str, Any]]:
+        """Bytes em disco e último uso de cada imagem."""
+        images: Dict[str, Dict[str, Any]] = {}
+        if not self.root.exists():
+            return images
+        for directory in self.root.iterdir():
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory):
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Removido por outro processo durante a varredura
+                    continue
+                current = images.setdefault(entry.name.split('.', 1)[0].split('_', 1)[0],
+                                            {'bytes': 0, 'last_used': None, 'written': 0.0, 'files': []})
+                current['bytes'] += stat.st_size
+                current['written'] = max(current['written'], stat.st_mtime)
+                current['files'].append(entry.path)
+                if entry.name.endswith('.json'):
+                    current['last_used'] = stat.st_mtime
+        for image in images.values():
+            # Sem metadados (gravação em andamento ou interrompida), vale o arquivo mais recente
+            if image['last_used'] is None:
+                image['last_used'] = image['written']
+        return images
+
+    def evict(self) -> int:
+        """Remove as imagens usadas há mais tempo até o total caber no limite; retorna quantas saíram."""
+        with self._lock:
+            images = self._usage()
+            total = sum(image['bytes'] for image in images.values())
+            removed = 0
+            for _, image in sorted(images.items(), key=lambda item: item[1]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                # Metadados primeiro: a imagem some para os leitores antes dos arquivos
+                for path in sorted(image['files'], key=lambda p: not p.endswith('.json')):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= image['bytes']
+                removed += 1
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        images = self._usage()
+        return {'images': len(images), 'bytes': sum(image['bytes'] for image in images.values()),
+                'max_bytes': self.max_bytes, 'path': str(self.root)}
+
+_store: Optional[ImageStore] = None
+_store_lock = threading.Lock()
+
+def get_image_store() -> ImageStore:
+    """Armazenamento de imagens compartilhado pelo processo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore()
+        return _store
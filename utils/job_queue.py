@@ -0,0 +1,363 @@
+"""
+Fila de jobs durável em SQLite para o Game Concept Forge.
+Permite tirar as gerações do processo do Streamlit: as páginas enfileiram jobs no
+arquivo da fila e processos `forge-worker` (ver utils/worker.py) na mesma máquina os
+executam. A fila usa o modo WAL do SQLite, que depende de memória compartilhada entre
+os processos de um único host: não coloque o arquivo em NFS ou em outro disco de rede
+para dividi-lo entre máquinas (o travamento de arquivos nesses sistemas não é confiável).
+
+Cada job reivindicado recebe um lease com visibility timeout: o worker renova o lease
+enquanto trabalha e, se morrer, o job volta a ficar visível para outro worker quando
+o lease expira (até `max_attempts` tentativas). Os jobs sobrevivem a reinícios do app
+e dos workers.
+
+Parâmetros e resultados são serializados com pickle; use apenas arquivos de fila
+locais e confiáveis.
+"""
+
+import math
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.jobs import (
+    JOB_DONE, JOB_ERROR, JOB_QUEUED, JOB_RUNNING, JOB_TTL, PRIORITY_NORMAL, Job, validate_task
+)
+from utils.tracing import current_traceparent
+
+DEFAULT_QUEUE_PATH = Path(__file__).resolve().parent.parent / "data" / "jobs.sqlite3"
+
+# Tempo que um job reivindicado fica invisível para outros workers sem renovação (segundos)
+DEFAULT_VISIBILITY_TIMEOUT = 300.0
+
+# Tentativas antes de desistir de um job cujo worker sumiu
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    params BLOB NOT NULL,
+    meta BLOB NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    trace TEXT,
+    status TEXT NOT NULL,
+    result BLOB,
+    error TEXT,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id);
+"""
+
+# Colunas acrescentadas depois da primeira versão do schema (filas antigas são migradas)
+_ADDED_COLUMNS = {
+    'priority': "INTEGER NOT NULL DEFAULT 0",
+    'tokens': "INTEGER NOT NULL DEFAULT 0",
+    'trace': "TEXT",
+}
+
+_SUMMARY_COLUMNS = ("id, task, session_id, label, params, meta, priority, trace, status, error, tokens, "
+                    "created_at, started_at, finished_at")
+
+def get_queue_path() -> Path:
+    """Caminho do arquivo da fila (FORGE_QUEUE_PATH ou data/jobs.sqlite3)."""
+    return Path(os.getenv('FORGE_QUEUE_PATH') or DEFAULT_QUEUE_PATH)
+
+class SQLiteJobQueue:
+    """Fila de jobs persistente com leases, compartilhável entre processos do mesmo host."""
+
+    def __init__(self, path: Optional[Path] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path or get_queue_path())
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            # WAL: leitores não bloqueiam o escritor, mas só entre processos da mesma máquina
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Uma conexão por operação: seguro entre threads e processos
+        conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # --- Lado do produtor (páginas) ---
+    def enqueue(self, task_name: str, session_id: str, params: Dict[str, Any],
+                label: str = "", meta: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_NORMAL,
+                trace: Optional[str] = None) -> str:
+        """Grava um job novo na fila e retorna seu ID."""
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, task, session_id, label, params, meta, priority, trace, status, "
+                "max_attempts, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, task_name, session_id, label or task_name, pickle.dumps(params),
+                 pickle.dumps(meta or {}), priority, trace, JOB_QUEUED, self.max_attempts, time.time())
+            )
+        return job_id
+
+    def adopt(self, job_id: str, from_session: str, session_id: str,
+              label: str = "", meta: Optional[Dict[str, Any]] = None) -> bool:
+        """Transfere um job ainda válido de `from_session` para `session_id`, com prioridade normal."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET session_id = ?, label = COALESCE(NULLIF(?, ''), label), meta = ?, priority = ? "
+                "WHERE id = ? AND session_id = ? AND status != ?",
+                (session_id, label, pickle.dumps(meta or {}), PRIORITY_NORMAL, job_id, from_session, JOB_ERROR)
+            )
+        return cursor.rowcount == 1
+
+    def discard(self, job_id: str):
+        """Apaga o job; se um worker ainda o estiver executando, o resultado é descartado."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Job]:
+        columns = _SUMMARY_COLUMNS + (", result" if with_result else "")
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def session_jobs(self, session_id: str) -> List[Job]:
+        """Jobs da sessão ainda na fila, do mais antigo ao mais recente (sem o resultado)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM jobs WHERE session_id = ? ORDER BY created_at",
+                (session_id,)
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def queue_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Posição de um job ainda na fila e previsão pela duração média dos jobs recentes.
+
+        Returns:
+            dict com position (1 = próximo) e eta_seconds (None sem histórico), ou None
+        """
+        with self._connect() as conn:
+            job = conn.execute("SELECT priority, created_at FROM jobs WHERE id = ? AND status = ?",
+                               (job_id, JOB_QUEUED)).fetchone()
+            if job is None:
+                return None
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND "
+                "(priority > ? OR (priority = ? AND created_at < ?))",
+                (JOB_QUEUED, job['priority'], job['priority'], job['created_at'])
+            ).fetchone()[0]
+            workers = conn.execute("SELECT COUNT(DISTINCT lease_owner) FROM jobs WHERE status = ?",
+                                   (JOB_RUNNING,)).fetchone()[0]
+            average = conn.execute(
+                "SELECT AVG(finished_at - started_at) FROM (SELECT finished_at, started_at FROM jobs "
+                "WHERE status = ? AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT 50)",
+                (JOB_DONE,)
+            ).fetchone()[0]
+        position = ahead + 1
+        eta = None
+        if average is not None:
+            eta = (math.ceil(position / max(1, workers)) + 1) * average
+        return {'position': position, 'eta_seconds': eta}
+
+    def pop_finished(self, session_id: str) -> List[Job]:
+        """Remove da fila e retorna os jobs concluídos da sessão, com o resultado."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS}, result FROM jobs "
+                "WHERE session_id = ? AND status IN (?, ?) ORDER BY created_at",
+                (session_id, JOB_DONE, JOB_ERROR)
+            ).fetchall()
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(row['id'],) for row in rows])
+            conn.execute("COMMIT")
+        return [_row_to_job(row) for row in rows]
+
+    def wait(self, job_ids: List[str], timeout: Optional[float] = None, poll: float = 0.2) -> bool:
+        """Aguarda (por polling) a conclusão dos jobs; retorna False em caso de timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = set(job_ids)
+        while pending:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT id, status FROM jobs WHERE id IN ({','.join('?' * len(pending))})",
+                    tuple(pending)
+                ).fetchall()
+            status = {row['id']: row['status'] for row in rows}
+            pending = {job_id for job_id in pending if status.get(job_id) in (JOB_QUEUED, JOB_RUNNING)}
+            if not pending:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def wait_session(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        return self.wait([job.id for job in self.session_jobs(session_id)], timeout)
+
+    # --- Lado do consumidor (workers) ---
+    def claim(self, worker_id: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Job]:
+        """
+        Reivindica o job visível de maior prioridade e mais antigo: na fila, ou em
+        execução com lease expirado.
+
+        Returns:
+            Job com os parâmetros, ou None se não houver trabalho
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Leases expirados que já esgotaram as tentativas viram erro
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_owner = NULL "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (JOB_ERROR, "O worker parou de responder em todas as tentativas", now, JOB_RUNNING, now)
+            )
+            row = conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (JOB_QUEUED, JOB_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (JOB_RUNNING, worker_id, now + visibility_timeout, now, row['id'])
+            )
+            conn.execute("COMMIT")
+        job = _row_to_job(row)
+        job.status = JOB_RUNNING
+        job.started_at = now
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str,
+                  visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        """Renova o lease; retorna False se o job não pertence mais a este worker."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                (time.time() + visibility_timeout, job_id, worker_id, JOB_RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any, tokens: int = 0) -> bool:
+        return self._finish(job_id, worker_id, JOB_DONE, result=pickle.dumps(result), tokens=tokens)
+
+    def fail(self, job_id: str, worker_id: str, error: str, tokens: int = 0) -> bool:
+        return self._finish(job_id, worker_id, JOB_ERROR, error=error, tokens=tokens)
+
+    def _finish(self, job_id: str, worker_id: str, status: str,
+                result: Optional[bytes] = None, error: Optional[str] = None, tokens: int = 0) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, tokens = ?, finished_at = ?, lease_owner = NULL "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (status, result, error, tokens, time.time(), job_id, worker_id, JOB_RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    # --- Manutenção ---
+    def prune(self, max_age: float = JOB_TTL) -> int:
+        """Apaga jobs concluídos há mais de `max_age` segundos que ninguém coletou."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JOB_DONE, JOB_ERROR, time.time() - max_age)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Quantidade de jobs por estado."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+def _row_to_job(row: sqlite3.Row) -> Job:
+    keys = row.keys()
+    job = Job(
+        id=row['id'], task=row['task'], session_id=row['session_id'], label=row['label'],
+        params=pickle.loads(row['params']), meta=pickle.loads(row['meta']), priority=row['priority'],
+        trace=row['trace'], status=row['status'], error=row['error'], tokens=row['tokens'], created_at=row['created_at'],
+        started_at=row['started_at'], finished_at=row['finished_at'],
+    )
+    if 'result' in keys and row['result'] is not None:
+        job.result = pickle.loads(row['result'])
+    if job.finished:
+        job.done_event.set()
+    return job
+
+class QueueJobManager:
+    """
+    Gerenciador de jobs com a mesma interface do JobManager, mas que apenas
+    enfileira na fila SQLite: a execução fica a cargo dos processos `forge-worker`.
+    """
+
+    def __init__(self, queue: Optional[SQLiteJobQueue] = None):
+        self.queue = queue or SQLiteJobQueue()
+        self._prune_lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def submit(self, session_id: str, task_name: str, params: Dict[str, Any],
+               label: str = "", meta: Optional[Dict[str, Any]] = None, client: Any = None,
+               priority: int = PRIORITY_NORMAL) -> str:
+        # O client não atravessa processos: o worker usa o próprio cliente compartilhado
+        validate_task(task_name)
+        self._maybe_prune()
+        trace = current_traceparent() if priority >= PRIORITY_NORMAL else None
+        return self.queue.enqueue(task_name, session_id, params, label=label, meta=meta, priority=priority,
+                                  trace=trace)
+
+    def adopt(self, job_id: str, from_session: str, session_id: str,
+              label: str = "", meta: Optional[Dict[str, Any]] = None) -> bool:
+        return self.queue.adopt(job_id, from_session, session_id, label=label, meta=meta)
+
+    def discard(self, job_id: str):
+        self.queue.discard(job_id)
+
+    def queue_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.queue.queue_status(job_id)
+
+    def get(self, job_id: str, with_result: bool = True) -> Optional[Job]:
+        return self.queue.get(job_id, with_result=with_result)
+
+    def session_jobs(self, session_id: str) -> List[Job]:
+        return self.queue.session_jobs(session_id)
+
+    def pop_finished(self, session_id: str) -> List[Job]:
+        return self.queue.pop_finished(session_id)
+
+    def wait(self, job_ids: List[str], timeout: Optional[float] = None) -> bool:
+        return self.queue.wait(job_ids, timeout)
+
+    def wait_session(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        return self.queue.wait_session(session_id, timeout)
+
+    def _maybe_prune(self):
+        with self._prune_lock:
+            if time.time() - self._last_prune > 60:
+                self._last_prune = time.time()
+                self.queue.prune()
@@ -0,0 +1,437 @@
+"""
+Módulo de jobs em segundo plano do Game Concept Forge.
+Cada geração é enviada como um job com ID e roda em um pool de threads do servidor,
+fora do script da página: se o usuário navegar para outra página no meio da geração,
+a resposta do Gemini não é perdida. O resultado fica guardado no gerenciador até a
+sessão que enviou o job coletá-lo (a sidebar faz isso a cada execução).
+
+As tarefas são registradas por nome (ver utils/tasks.py), então um job é descrito
+apenas por dados serializáveis: nome da tarefa, parâmetros e metadados. Com
+FORGE_JOB_BACKEND=sqlite os jobs vão para a fila durável de utils/job_queue.py e são
+executados por processos `forge-worker` separados (python -m utils.worker).
+"""
+
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import streamlit as st
+
+# As prioridades dos jobs são as do escalonador (reexportadas aqui)
+from utils.scheduler import PRIORITY_BATCH, PRIORITY_LOW, PRIORITY_NORMAL, call_context, get_scheduler  # noqa: F401
+from utils.tracing import action, attach, current_traceparent, record_span, render_in_trace, span
+from utils.usage import token_meter
+
+# Estados possíveis de um job
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_ERROR = 'error'
+
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: "na fila",
+    JOB_RUNNING: "gerando",
+    JOB_DONE: "concluído",
+    JOB_ERROR: "falhou",
+}
+
+# Chave do identificador da sessão no st.session_state
+SESSION_ID_KEY = '_forge_session_id'
+
+# Intervalo de atualização do monitor de jobs na sidebar (segundos)
+JOB_POLL_INTERVAL = float(os.getenv('FORGE_JOB_POLL_INTERVAL', '1.5'))
+
+# Jobs concluídos e não coletados são descartados após este tempo (segundos)
+JOB_TTL = 3600
+
+# Jobs com o mesmo meta['batch'] (ex.: as variações de um conceito) são admitidos juntos pelo escalonador
+BATCH_META_KEY = 'batch'
+
+# --- Registro de tarefas ---
+# run(client, **params) -> resultado; apply(job) aplica o resultado ao session_state
+_TASKS: Dict[str, Callable[..., Any]] = {}
+_HANDLERS: Dict[str, Callable[["Job"], None]] = {}
+
+def task(name: str):
+    """Registra a função que executa a tarefa `name` em segundo plano."""
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        _TASKS[name] = fn
+        return fn
+    return decorator
+
+def on_complete(name: str):
+    """Registra a função que aplica o resultado da tarefa `name` na sessão."""
+    def decorator(fn: Callable[["Job"], None]) -> Callable[["Job"], None]:
+        _HANDLERS[name] = fn
+        return fn
+    return decorator
+
+def _load_tasks():
+    import utils.tasks  # noqa: F401 (registra as tarefas do app)
+
+def validate_task(task_name: str):
+    """Garante que a tarefa existe antes de enfileirá-la."""
+    _load_tasks()
+    if task_name not in _TASKS:
+        raise ValueError(f"Tarefa desconhecida: {task_name}")
+
+def run_task(task_name: str, params: Dict[str, Any], client: Any = None) -> Any:
+    """Executa uma tarefa registrada; sem client, usa o cliente compartilhado do processo."""
+    validate_task(task_name)
+    if client is None:
+        from utils.gemini_client import get_default_client
+        client = get_default_client()
+    return _TASKS[task_name](client, **params)
+
+# --- Jobs derivados ---
+# Quem executa o job atual (JobManager ou forge-worker) define como enviar jobs derivados dele:
+# submit(task_name, params, label, meta) -> ID do job
+_followup: contextvars.ContextVar[Optional[Callable[..., str]]] = contextvars.ContextVar('forge_followup', default=None)
+
+@contextmanager
+def followup_target(submit: Callable[..., str]) -> Iterator[None]:
+    """Define para onde vão os jobs derivados enviados dentro do bloco."""
+    reset = _followup.set(submit)
+    try:
+        yield
+    finally:
+        _followup.reset(reset)
+
+def submit_followup(task_name: str, label: str, meta: Optional[Dict[str, Any]] = None, **params) -> Optional[str]:
+    """
+    Envia, de dentro de um job em execução, outro job para a mesma sessão.
+
+    Permite começar uma etapa assim que os dados dela existem, sem esperar a página
+    coletar o job atual. O job derivado herda a sessão, a prioridade e o trace.
+
+    Returns:
+        ID do job, ou None fora de um job (API, CLI em lote); aí cabe ao chamador executar a etapa
+    """
+    submit = _followup.get()
+    if submit is None:
+        return None
+    return submit(task_name, params, label, meta)
+
+@dataclass
+class Job:
+    """Estado de uma geração enviada para segundo plano."""
+    id: str
+    task: str
+    session_id: str
+    label: str
+    params: Dict[str, Any]
+    meta: Dict[str, Any] = field(default_factory=dict)
+    priority: int = PRIORITY_NORMAL
+    status: str = JOB_QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    tokens: int = 0
+    # traceparent W3C da ação que enviou o job (os spans do job entram nesse trace)
+    trace: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_ERROR)
+
+    @property
+    def elapsed(self) -> float:
+        """Segundos desde o envio (ou até a conclusão)."""
+        return (self.finished_at or time.time()) - self.created_at
+
+class JobManager:
+    """
+    Executa jobs em um pool de threads e guarda os resultados por sessão.
+
+    As threads apenas aguardam o Gemini; quantas chamadas andam ao mesmo tempo, e em
+    que ordem, é decidido pelo escalonador (utils/scheduler.py). Jobs de baixa
+    prioridade rodam em um pool separado para nunca ocupar as threads interativas.
+    """
+
+    def __init__(self, max_workers: int = 32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forge-job")
+        self._background = ThreadPoolExecutor(max_workers=max(1, max_workers // 2),
+                                              thread_name_prefix="forge-job-low")
+        self._jobs: Dict[str, Job] = {}
+        # Cliente de cada job ainda na fila (para reenviá-lo ao pool interativo, ver `adopt`)
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id: str, task_name: str, params: Dict[str, Any],
+               label: str = "", meta: Optional[Dict[str, Any]] = None, client: Any = None,
+               priority: int = PRIORITY_NORMAL) -> str:
+        """
+        Enfileira um job e retorna seu ID.
+
+        Args:
+            session_id: Sessão que receberá o resultado
+            task_name: Nome da tarefa registrada
+            params: Argumentos nomeados da tarefa
+            label: Descrição exibida ao usuário
+            meta: Dados extras usados ao aplicar o resultado (ex.: opções do formulário)
+            client: GeminiClient a usar; por padrão o cliente compartilhado do processo
+            priority: PRIORITY_LOW envia o job para o pool de segundo plano
+        """
+        validate_task(task_name)
+        job = Job(id=uuid.uuid4().hex[:12], task=task_name, session_id=session_id,
+                  label=label or task_name, params=params, meta=meta or {}, priority=priority,
+                  trace=current_traceparent() if priority >= PRIORITY_NORMAL else None)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._clients[job.id] = client
+        executor = self._background if priority < PRIORITY_NORMAL else self._executor
+        executor.submit(self._run, job, client)
+        return job.id
+
+    def _run(self, job: Job, client: Any):
+        with self._lock:
+            # Um job adotado é reenviado ao pool interativo: roda no que chegar primeiro
+            if job.status != JOB_QUEUED:
+                return
+            job.status = JOB_RUNNING
+            self._clients.pop(job.id, None)
+        job.started_at = time.time()
+
+        # Jobs derivados (ex.: artes do conceito) vão para este gerenciador, em nome da mesma sessão
+        def followup(task_name, params, label, meta):
+            return self.submit(job.session_id, task_name, params, label=label, meta=meta,
+                               client=client, priority=job.priority)
+
+        group = job.meta.get(BATCH_META_KEY)
+        try:
+            with attach(job.trace), call_context(job.session_id, job.priority, job.id, group), \
+                    followup_target(followup), token_meter() as meter:
+                record_span("jobs.fila", int(job.created_at * 1e9), int(job.started_at * 1e9))
+                with span(f"job.{job.task}", job_id=job.id) as job_span:
+                    try:
+                        job.result = run_task(job.task, job.params, client)
+                    finally:
+                        job.tokens = meter.total
+                        job_span.set(tokens=meter.total)
+            job.status = JOB_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_ERROR
+        finally:
+            get_scheduler().forget_job(job.id)
+            job.finished_at = time.time()
+            job.done_event.set()
+
+    def get(self, job_id: str, with_result: bool = True) -> Optional[Job]:
+        """
+        Job pelo ID, ou None se ele não existe (ou já foi coletado).
+
+        `with_result` existe pela interface do QueueJobManager, que só lê o resultado do
+        SQLite quando pedido; aqui o job já está em memória e sempre vem com o resultado.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def session_jobs(self, session_id: str) -> List[Job]:
+        """Jobs ainda não coletados da sessão, do mais antigo ao mais recente."""
+        with self._lock:
+            return [job for job in self._jobs.values() if job.session_id == session_id]
+
+    def pop_finished(self, session_id: str) -> List[Job]:
+        """Remove e retorna os jobs concluídos da sessão."""
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.session_id == session_id and job.finished]
+            for job in finished:
+                del self._jobs[job.id]
+        return finished
+
+    def adopt(self, job_id: str, from_session: str, session_id: str,
+              label: str = "", meta: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Transfere um job de outra sessão (ex.: pré-carregamento) para `session_id`, com prioridade normal.
+
+        Um job que ainda não começou é reenviado ao pool interativo; um que já roda tem as
+        chamadas ao Gemini (as que aguardam vaga e as próximas) promovidas no escalonador.
+
+        Returns:
+            bool: False se o job não existe mais, não pertence a `from_session` ou falhou
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.session_id != from_session or job.status == JOB_ERROR:
+                return False
+            job.session_id = session_id
+            job.label = label or job.label
+            job.meta = meta or {}
+            promoted = job.priority < PRIORITY_NORMAL and not job.finished
+            job.priority = max(job.priority, PRIORITY_NORMAL)
+            queued = job.status == JOB_QUEUED
+            client = self._clients.get(job.id)
+        if promoted:
+            if queued:
+                self._executor.submit(self._run, job, client)
+            else:
+                get_scheduler().promote(job.id, PRIORITY_NORMAL)
+        return True
+
+    def discard(self, job_id: str):
+        """Esquece um job (o resultado, se vier, é descartado)."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def queue_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Posição e previsão do job na fila do escalonador, se ele estiver aguardando uma vaga."""
+        return get_scheduler().queue_status(job_id)
+
+    def wait(self, job_ids: List[str], timeout: Optional[float] = None) -> bool:
+        """Aguarda a conclusão dos jobs informados; retorna False em caso de timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job_id in job_ids:
+            job = self.get(job_id)
+            if job is None:
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.done_event.wait(remaining):
+                return False
+        return True
+
+    def wait_session(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """Aguarda todos os jobs pendentes de uma sessão."""
+        return self.wait([job.id for job in self.session_jobs(session_id)], timeout)
+
+    def _prune(self):
+        # Descarta resultados de sessões que nunca voltaram para coletá-los
+        cutoff = time.time() - JOB_TTL
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """
+    Retorna o gerenciador de jobs do processo.
+
+    FORGE_JOB_BACKEND escolhe onde os jobs rodam: "thread" (padrão) usa um pool de
+    threads neste processo, com FORGE_JOB_WORKERS threads (padrão 32; o limite de chamadas
+    simultâneas ao Gemini é FORGE_MAX_INFLIGHT, do escalonador); "sqlite" enfileira na fila
+    durável de FORGE_QUEUE_PATH para os processos `forge-worker`.
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _load_tasks()
+            backend = os.getenv('FORGE_JOB_BACKEND', 'thread').lower()
+            if backend == 'sqlite':
+                from utils.job_queue import QueueJobManager
+                _manager = QueueJobManager()
+            elif backend == 'thread':
+                _manager = JobManager(max_workers=int(os.getenv('FORGE_JOB_WORKERS', '32')))
+            else:
+                raise ValueError(f"FORGE_JOB_BACKEND inválido: {backend}")
+        return _manager
+
+# --- Integração com o Streamlit ---
+def get_session_id() -> str:
+    """Identificador estável da sessão atual, guardado no session_state."""
+    if SESSION_ID_KEY not in st.session_state:
+        st.session_state[SESSION_ID_KEY] = uuid.uuid4().hex
+    return st.session_state[SESSION_ID_KEY]
+
+def submit_job(task_name: str, label: str, meta: Optional[Dict[str, Any]] = None,
+               client: Any = None, **params) -> str:
+    """
+    Envia uma tarefa para segundo plano em nome da sessão atual.
+
+    Se a mesma tarefa já foi pré-carregada com os mesmos parâmetros (ver
+    utils/prefetch.py), o job especulativo é adotado em vez de uma nova chamada.
+    """
+    from utils.prefetch import claim_prefetch
+    # Cada envio é uma ação do usuário: abre o trace que o job e a renderização do resultado continuam
+    with action(f"acao.{task_name}", label=label) as root:
+        job_id = claim_prefetch(task_name, params, label, meta)
+        if job_id:
+            root.set(prefetch=True)
+            return job_id
+        return get_job_manager().submit(get_session_id(), task_name, params, label=label, meta=meta, client=client)
+
+def pending_jobs(task_name: Optional[str] = None) -> List[Job]:
+    """Jobs da sessão atual ainda não coletados, opcionalmente filtrados por tarefa."""
+    jobs = get_job_manager().session_jobs(get_session_id())
+    return [job for job in jobs if task_name is None or job.task == task_name]
+
+def collect_finished_jobs() -> List[Job]:
+    """
+    Aplica na sessão atual os resultados dos jobs concluídos.
+
+    Deve ser chamada no início de cada execução do script (a sidebar faz isso).
+    O último resultado de cada tarefa fica em st.session_state['job_results'] e
+    o último erro em st.session_state['job_errors'].
+    """
+    jobs = get_job_manager().pop_finished(get_session_id())
+    for job in jobs:
+        # A renderização do resultado nesta execução entra no trace da ação que enviou o job
+        render_in_trace(job.trace)
+        if job.status == JOB_DONE:
+            st.toast(f"✅ {job.label} concluído")
+            st.session_state.setdefault('job_results', {})[job.task] = job.result
+            st.session_state.setdefault('job_errors', {}).pop(job.task, None)
+            handler = _HANDLERS.get(job.task)
+            if handler:
+                handler(job)
+        else:
+            st.session_state.setdefault('job_errors', {})[job.task] = job.error
+    return jobs
+
+def latest_result(task_name: str) -> Any:
+    """Último resultado coletado da tarefa nesta sessão, ou None."""
+    return st.session_state.get('job_results', {}).get(task_name)
+
+def describe_job(job: Job) -> str:
+    """Estado do job para exibição, com posição na fila e previsão quando ele aguarda vez."""
+    queued = get_job_manager().queue_status(job.id) if not job.finished else None
+    if queued is None:
+        return f"{JOB_STATUS_LABELS[job.status]} há {job.elapsed:.0f}s"
+    text = f"na fila, posição {queued['position']}"
+    if queued['eta_seconds'] is not None:
+        text += f", previsão ~{queued['eta_seconds']:.0f}s"
+    return text
+
+def render_job_status(task_name: str, error_prefix: str):
+    """Exibe os jobs em andamento da tarefa (atualizados periodicamente) e o último erro, se houver."""
+    if pending_jobs(task_name):
+        _job_status_fragment(task_name)
+    error = st.session_state.get('job_errors', {}).pop(task_name, None)
+    if error:
+        st.error(f"{error_prefix}: {error}")
+        st.info("Verifique se sua chave de API está configurada corretamente.")
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def _job_status_fragment(task_name: str):
+    # O monitor da sidebar reexecuta a página quando o job termina; aqui só se atualiza o estado
+    for job in pending_jobs(task_name):
+        st.info(f"⏳ {job.label}: {describe_job(job)}. "
+                "Você pode navegar pelas outras páginas; o resultado ficará salvo na sessão.")
+
+def render_job_monitor():
+    """Lista os jobs pendentes (use dentro de `with st.sidebar`) enquanto houver algum."""
+    if pending_jobs():
+        _job_monitor_fragment()
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def _job_monitor_fragment():
+    jobs = pending_jobs()
+    if not jobs or any(job.finished for job in jobs):
+        # Reexecuta a página inteira para coletar e exibir o resultado
+        st.rerun()
+    st.markdown("**⏳ Tarefas em andamento:**")
+    st.markdown("\n".join(
+        f"- {job.label}: {describe_job(job)}" for job in jobs
+    ))
+    st.markdown("---")
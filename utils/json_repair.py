@@ -0,0 +1,197 @@
+"""
+Reparo local de respostas JSON do Gemini.
+Quando a resposta vem truncada ou levemente malformada, tenta recuperar o JSON sem
+uma nova geração: remove cercas de markdown e vírgulas sobrando, fecha strings,
+objetos e arrays pendentes e descarta a chave incompleta do final. O resultado é
+aceito se os tipos baterem com o response schema (os schemas não declaram campos
+obrigatórios, então campos ausentes não o invalidam). Se o texto estava de fato
+cortado (`is_truncated`), o GeminiClient ainda pede a continuação da resposta
+enquanto puder; reparos cosméticos (cercas, vírgulas) nunca geram chamadas extras.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.schemas import validate_against_schema
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_PARTIAL_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{0,3})?$")
+_LITERAL = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?|true|false|null")
+_LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+
+# Contadores do processo (expostos no painel de diagnósticos)
+_stats: Dict[str, int] = {'parsed': 0, 'repaired': 0, 'continued': 0, 'failed': 0}
+_stats_lock = threading.Lock()
+
+def record(event: str):
+    """Incrementa um contador de get_repair_stats()."""
+    with _stats_lock:
+        _stats[event] = _stats.get(event, 0) + 1
+
+def get_repair_stats() -> Dict[str, int]:
+    """Respostas decodificadas direto, reparadas localmente, completadas por continuação e perdidas."""
+    with _stats_lock:
+        return dict(_stats)
+
+def strip_code_fences(text: str) -> str:
+    """Remove cercas de markdown (```json ... ```) no início e no fim do texto."""
+    return _FENCE.sub("", text)
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove vírgulas antes de } ou ] (fora de strings)."""
+    out: List[str] = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '}]':
+            # Apaga a vírgula pendente (e o espaço depois dela)
+            i = len(out) - 1
+            while i >= 0 and out[i].isspace():
+                i -= 1
+            if i >= 0 and out[i] == ',':
+                del out[i:]
+        out.append(ch)
+    return "".join(out)
+
+def _close(stack: List[str]) -> str:
+    return "".join('}' if opener == '{' else ']' for opener in reversed(stack))
+
+def repair_json(text: str) -> str:
+    """
+    Tenta transformar um JSON truncado ou malformado em um JSON válido.
+
+    Args:
+        text: Texto retornado pelo modelo
+
+    Returns:
+        str: Texto reparado (pode continuar inválido se não houver o que salvar)
+    """
+    text = strip_code_fences(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        return text
+    text = text[min(starts):]
+
+    stack: List[str] = []
+    expecting_key: List[bool] = []
+    in_string = escape = string_is_key = False
+    # Último ponto em que o prefixo termina em um valor completo, com a pilha naquele ponto
+    safe_end, safe_stack = 0, []
+    literal_start = None
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_end, safe_stack = i + 1, list(stack)
+            continue
+
+        if literal_start is not None and ch not in _LITERAL_CHARS:
+            if _LITERAL.fullmatch(text[literal_start:i]):
+                safe_end, safe_stack = i, list(stack)
+            literal_start = None
+
+        if ch == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == '{' and expecting_key[-1]
+        elif ch in '{[':
+            stack.append(ch)
+            expecting_key.append(ch == '{')
+            safe_end, safe_stack = i + 1, list(stack)
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+                expecting_key.pop()
+            safe_end, safe_stack = i + 1, list(stack)
+            if not stack:
+                # Ignora qualquer texto depois do valor de nível superior
+                return _strip_trailing_commas(text[:i + 1])
+        elif ch == ':' and stack and stack[-1] == '{':
+            expecting_key[-1] = False
+        elif ch == ',' and stack and stack[-1] == '{':
+            expecting_key[-1] = True
+        elif ch in _LITERAL_CHARS and literal_start is None:
+            literal_start = i
+
+    if literal_start is not None and _LITERAL.fullmatch(text[literal_start:].rstrip()):
+        safe_end, safe_stack = len(text.rstrip()), list(stack)
+
+    if in_string and not string_is_key:
+        # String de valor cortada no meio: mantém o conteúdo parcial e fecha as aspas
+        head = _PARTIAL_ESCAPE.sub("", text)
+        return _strip_trailing_commas(head + '"' + _close(stack))
+
+    head = text[:safe_end].rstrip().rstrip(',')
+    return _strip_trailing_commas(head + _close(safe_stack))
+
+def is_truncated(text: str) -> bool:
+    """True se o JSON termina com string, objeto ou array ainda abertos (resposta cortada)."""
+    text = strip_code_fences(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        return False
+    depth = 0
+    in_string = escape = False
+    for ch in text[min(starts):]:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth <= 0:
+                # O valor de nível superior fechou; o que vem depois é ignorado pelo reparo
+                return False
+    return True
+
+def parse_json_response(text: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[Any, bool]:
+    """
+    Decodifica a resposta, reparando-a localmente se necessário.
+
+    Args:
+        text: Texto retornado pelo modelo
+        schema: Response schema usado para validar os tipos do JSON reparado
+
+    Returns:
+        tuple: (dados, reparado); campos ausentes não impedem o reparo
+
+    Raises:
+        ValueError: Se o JSON não puder ser recuperado ou tiver tipos diferentes dos do schema
+    """
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError as original_error:
+        try:
+            data = json.loads(repair_json(text))
+        except json.JSONDecodeError:
+            raise ValueError(f"JSON inválido na resposta do modelo: {original_error}") from original_error
+
+    if schema is not None:
+        errors = validate_against_schema(data, schema)
+        if errors:
+            raise ValueError(f"JSON reparado não atende ao schema: {errors[0]}")
+    return data, True
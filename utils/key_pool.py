@@ -0,0 +1,221 @@
+"""
+Pool de chaves da API Gemini com rotação ciente de cota.
+A vazão fica limitada pela cota de cada chave; com várias chaves, cada uma ganha o
+próprio cliente, o consumo de requisições e tokens por minuto de cada uma é
+acompanhado em uma janela deslizante e cada chamada vai para a chave com mais folga.
+Uma chave que recebe 429 fica em pausa (pelo RetryInfo/Retry-After do erro ou
+FORGE_KEY_COOLDOWN) e a chamada é refeita em outra chave.
+
+Configuração:
+    GEMINI_API_KEYS="chave1,chave2"        lista de chaves separadas por vírgula
+    GEMINI_API_KEYS_FILE=/caminho/chaves   uma chave por linha (# comenta)
+    GEMINI_API_KEY                         chave única (continua funcionando)
+    FORGE_KEY_RPM / FORGE_KEY_TPM          orçamento por minuto de cada chave (0 = desconhecido)
+    GEMINI_BASE_URL                        endpoint alternativo (ex.: benchmarks/stub_server.py)
+    FORGE_HTTP_KEEPALIVE=300               tempo (s) que uma conexão ociosa fica aberta no pool
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+WINDOW_SECONDS = 60.0
+
+# Pausa de uma chave após 429 quando o erro não informa quanto esperar (s)
+DEFAULT_COOLDOWN = float(os.getenv('FORGE_KEY_COOLDOWN', '30'))
+
+# Tempo máximo esperando alguma chave voltar a ter cota antes de desistir (s)
+MAX_WAIT = float(os.getenv('FORGE_KEY_MAX_WAIT', '60'))
+
+# O httpx fecha conexões ociosas após 5 s por padrão: a conexão aberta no aquecimento
+# (utils/warmup.py) morreria antes de o pod receber tráfego
+KEEPALIVE_SECONDS = float(os.getenv('FORGE_HTTP_KEEPALIVE', '300'))
+
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+def load_api_keys() -> List[str]:
+    """Chaves configuradas, na ordem: GEMINI_API_KEYS, GEMINI_API_KEYS_FILE, GEMINI_API_KEY."""
+    keys: List[str] = []
+    if os.getenv('GEMINI_API_KEYS'):
+        keys += [key.strip() for key in os.environ['GEMINI_API_KEYS'].split(',')]
+    if os.getenv('GEMINI_API_KEYS_FILE'):
+        for line in Path(os.environ['GEMINI_API_KEYS_FILE']).read_text(encoding='utf-8').splitlines():
+            keys.append(line.split('#', 1)[0].strip())
+    if not keys and os.getenv('GEMINI_API_KEY'):
+        keys.append(os.environ['GEMINI_API_KEY'])
+    # Remove vazias e repetidas mantendo a ordem
+    return list(dict.fromkeys(key for key in keys if key))
+
+def is_quota_error(error: BaseException) -> bool:
+    """True para 429/RESOURCE_EXHAUSTED (cota da chave), que justifica trocar de chave."""
+    return getattr(error, 'code', None) == 429 or 'RESOURCE_EXHAUSTED' in str(error)
+
+def retry_delay(error: BaseException) -> Optional[float]:
+    """Espera sugerida pelo erro: RetryInfo do corpo ou header Retry-After."""
+    match = _RETRY_DELAY.search(str(getattr(error, 'details', None) or error))
+    if match:
+        return float(match.group(1))
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after') or headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+class ApiKey:
+    """Uma chave do pool: cliente próprio, consumo na janela de um minuto e pausa após 429."""
+
+    def __init__(self, key: str, rpm: int = 0, tpm: int = 0):
+        self.key = key
+        self.label = f"…{key[-4:]}"
+        self.rpm = rpm
+        self.tpm = tpm
+        self.cooldown_until = 0.0
+        self.inflight = 0
+        self.requests = 0
+        self.tokens = 0
+        self.throttled = 0
+        self._request_times: Deque[float] = deque()
+        self._token_log: Deque[Tuple[float, int]] = deque()
+
+        # Cliente próprio da chave; GEMINI_BASE_URL aponta para outro endpoint (ex.: o stand-in local)
+        import httpx
+        from google import genai
+        from google.genai import types
+        # Mesmos limites de conexões do httpx, com as ociosas mantidas por KEEPALIVE_SECONDS
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=20,
+                              keepalive_expiry=KEEPALIVE_SECONDS)
+        http_options = types.HttpOptions(base_url=os.getenv('GEMINI_BASE_URL') or None,
+                                         client_args={'limits': limits})
+        self.client = genai.Client(api_key=key, http_options=http_options)
+
+    def _trim(self, now: float):
+        while self._request_times and self._request_times[0] <= now - WINDOW_SECONDS:
+            self._request_times.popleft()
+        while self._token_log and self._token_log[0][0] <= now - WINDOW_SECONDS:
+            self._token_log.popleft()
+
+    def window_usage(self, now: float) -> Tuple[int, int]:
+        """Requisições e tokens no último minuto."""
+        self._trim(now)
+        return len(self._request_times), sum(tokens for _, tokens in self._token_log)
+
+    def headroom(self, now: float) -> float:
+        """
+        Folga da chave entre 0 e 1 (a menor entre requisições e tokens).
+        Sem orçamento configurado, prefere a chave menos usada no último minuto.
+        """
+        requests, tokens = self.window_usage(now)
+        fractions = []
+        if self.rpm:
+            fractions.append(1 - requests / self.rpm)
+        if self.tpm:
+            fractions.append(1 - tokens / self.tpm)
+        if not fractions:
+            return 1 / (1 + requests)
+        return max(0.0, min(fractions))
+
+    def available_at(self, now: float) -> float:
+        """Momento em que a chave pode receber a próxima requisição."""
+        ready = self.cooldown_until
+        requests, tokens = self.window_usage(now)
+        if self.rpm and requests >= self.rpm:
+            ready = max(ready, self._request_times[0] + WINDOW_SECONDS)
+        if self.tpm and tokens >= self.tpm and self._token_log:
+            ready = max(ready, self._token_log[0][0] + WINDOW_SECONDS)
+        return ready
+
+class KeyPool:
+    """Distribui as chamadas entre as chaves pela folga de cota de cada uma."""
+
+    def __init__(self, keys: List[str], rpm: int = 0, tpm: int = 0, cooldown: float = DEFAULT_COOLDOWN):
+        if not keys:
+            raise ValueError("Nenhuma chave da API Gemini configurada (GEMINI_API_KEY, GEMINI_API_KEYS "
+                             "ou GEMINI_API_KEYS_FILE)")
+        self.keys = [ApiKey(key, rpm, tpm) for key in keys]
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, max_wait: float = MAX_WAIT) -> ApiKey:
+        """
+        Reserva uma requisição na chave com mais folga, esperando se todas estiverem sem cota.
+
+        Raises:
+            RuntimeError: Se nenhuma chave voltar a ter cota em `max_wait` segundos
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                ready = [key for key in self.keys if key.available_at(now) <= now]
+                if ready:
+                    key = max(ready, key=lambda k: (k.headroom(now), -k.inflight))
+                    key._request_times.append(now)
+                    key.inflight += 1
+                    key.requests += 1
+                    return key
+                wake = min(key.available_at(now) for key in self.keys)
+            if wake > deadline:
+                raise RuntimeError("Todas as chaves da API Gemini estão sem cota no momento; "
+                                   "tente novamente em instantes")
+            time.sleep(max(0.01, min(wake - time.monotonic(), 1.0)))
+
+    def release(self, key: ApiKey, tokens: int = 0):
+        """Conclui a requisição reservada, registrando os tokens consumidos."""
+        with self._lock:
+            key.inflight -= 1
+            key.tokens += tokens
+            if tokens:
+                key._token_log.append((time.monotonic(), tokens))
+
+    def penalize(self, key: ApiKey, error: BaseException):
+        """Conclui a requisição que recebeu 429 e pausa a chave."""
+        with self._lock:
+            key.inflight -= 1
+            key.throttled += 1
+            delay = retry_delay(error)
+            key.cooldown_until = time.monotonic() + (delay if delay is not None else self.cooldown)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Consumo, folga e pausa de cada chave (sem expor a chave)."""
+        with self._lock:
+            now = time.monotonic()
+            result = []
+            for key in self.keys:
+                requests, tokens = key.window_usage(now)
+                result.append({
+                    'key': key.label,
+                    'requests_last_minute': requests,
+                    'tokens_last_minute': tokens,
+                    'headroom': round(key.headroom(now), 3),
+                    'cooldown_seconds': round(max(0.0, key.cooldown_until - now), 1),
+                    'inflight': key.inflight,
+                    'requests': key.requests,
+                    'tokens': key.tokens,
+                    'throttled': key.throttled,
+                })
+            return result
+
+_pool: Optional[KeyPool] = None
+_pool_lock = threading.Lock()
+
+def reset_key_pool():
+    """Descarta o pool do processo; o próximo get_key_pool() relê a configuração."""
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+def get_key_pool() -> KeyPool:
+    """Pool de chaves do processo (compartilhado por todos os GeminiClient)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = KeyPool(load_api_keys(), rpm=int(os.getenv('FORGE_KEY_RPM', '0')),
+                            tpm=int(os.getenv('FORGE_KEY_TPM', '0')))
+        return _pool
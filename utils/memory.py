@@ -0,0 +1,242 @@
+"""
+Inspeção de memória do session_state.
+Uma sessão pode passar de dezenas de MB com históricos e imagens PIL; este módulo mede
+o tamanho profundo de cada chave do `st.session_state` (concept_history,
+pitch_deck_history, current_gdd, ...), a quantidade de itens, o crescimento desde a
+execução anterior e o total de todas as sessões ativas do servidor. A medição de todas
+as sessões percorre o estado de outros usuários enquanto eles o alteram; por isso só
+roda sob demanda, pelo botão do painel de diagnósticos.
+
+Limites de alerta (MB), que geram SessionMemoryWarning e avisos no painel de diagnósticos:
+    FORGE_MEMORY_KEY_WARN_MB=5         por chave
+    FORGE_MEMORY_SESSION_WARN_MB=20    por sessão
+    FORGE_MEMORY_SERVER_WARN_MB=500    soma de todas as sessões
+"""
+
+import io
+import os
+import sys
+import threading
+import types
+import warnings
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+MB = 1024 * 1024
+
+KEY_WARN_BYTES = float(os.getenv('FORGE_MEMORY_KEY_WARN_MB', '5')) * MB
+SESSION_WARN_BYTES = float(os.getenv('FORGE_MEMORY_SESSION_WARN_MB', '20')) * MB
+SERVER_WARN_BYTES = float(os.getenv('FORGE_MEMORY_SERVER_WARN_MB', '500')) * MB
+
+class SessionMemoryWarning(UserWarning):
+    """Uma chave, sessão ou o servidor passou do limite de memória configurado."""
+
+# Objetos que não pertencem à sessão (módulos, classes, funções) não entram na conta
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, threading.Thread)
+
+# Tamanhos por chave da medição anterior de cada sessão, para o crescimento entre execuções
+_previous: Dict[str, Dict[str, int]] = {}
+_previous_lock = threading.Lock()
+
+def _image_bytes(image: Any) -> int:
+    """Buffer de pixels de uma imagem PIL (mesmo que ainda não decodificada)."""
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Tamanho aproximado em bytes de `obj` e de tudo que ele referencia.
+
+    Args:
+        obj: Objeto a medir
+        seen: ids já contados (compartilhe entre chamadas para não contar objetos repetidos)
+
+    Contêineres alterados por outra thread durante a leitura entram sem o conteúdo.
+    """
+    from PIL import Image
+
+    seen = set() if seen is None else seen
+    total = 0
+    pending = [obj]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)) or current is None:
+            continue
+        try:
+            total += _expand(current, pending, Image.Image)
+        except RuntimeError:
+            # "changed size during iteration": outra sessão mexeu no objeto; fica para a próxima medição
+            continue
+    return total
+
+def _expand(current: Any, pending: List[Any], image_type: type) -> int:
+    """Acrescenta a `pending` o que `current` referencia; retorna os bytes de buffers fora do getsizeof."""
+    if isinstance(current, image_type):
+        return _image_bytes(current)
+    if isinstance(current, io.BytesIO):
+        return current.getbuffer().nbytes
+    if isinstance(current, Mapping):
+        # Copia antes de enfileirar: se o dicionário mudar, a cópia falha inteira
+        items = list(current.items())
+        pending.extend(key for key, _ in items)
+        pending.extend(value for _, value in items)
+    elif isinstance(current, (list, tuple, set, frozenset)):
+        pending.extend(list(current))
+    elif hasattr(current, 'nbytes'):
+        # Arrays (numpy, pandas): o buffer não aparece em getsizeof
+        return int(getattr(current, 'nbytes', 0) or 0)
+    else:
+        if hasattr(current, '__dict__'):
+            pending.append(vars(current))
+        for slot in getattr(type(current), '__slots__', ()):
+            if hasattr(current, slot):
+                pending.append(getattr(current, slot))
+    return 0
+
+def _item_count(value: Any) -> Optional[int]:
+    try:
+        return len(value) if isinstance(value, (Mapping, list, tuple, set)) else None
+    except TypeError:
+        return None
+
+def measure_state(state: Mapping[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Tamanho profundo de cada chave de um session_state.
+
+    Args:
+        state: Conteúdo do session_state (chave -> valor)
+        session_id: Se informado, calcula o crescimento desde a medição anterior desta sessão
+
+    Returns:
+        dict: total_bytes (objetos compartilhados contados uma vez), keys (chave, bytes,
+              itens e crescimento, da maior para a menor) e warnings
+    """
+    snapshot = dict(state)
+    shared: Set[int] = set()
+    total = sum(deep_sizeof(value, shared) for value in snapshot.values())
+    sizes = {key: deep_sizeof(value) for key, value in snapshot.items()}
+
+    previous: Dict[str, int] = {}
+    if session_id is not None:
+        with _previous_lock:
+            previous = _previous.get(session_id, {})
+            _previous[session_id] = sizes
+
+    keys = [{
+        'key': str(key),
+        'bytes': size,
+        'items': _item_count(snapshot[key]),
+        'growth_bytes': size - previous.get(key, 0) if previous else None,
+    } for key, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True)]
+
+    alerts = [f"Chave `{entry['key']}` com {entry['bytes'] / MB:.1f} MB" for entry in keys
+              if entry['bytes'] > KEY_WARN_BYTES]
+    if total > SESSION_WARN_BYTES:
+        alerts.append(f"Sessão com {total / MB:.1f} MB (limite {SESSION_WARN_BYTES / MB:.0f} MB)")
+    return {'total_bytes': total, 'keys': keys, 'warnings': alerts}
+
+def _active_session_states() -> Dict[str, Mapping[str, Any]]:
+    """session_state de cada sessão ativa do servidor Streamlit (vazio fora do servidor)."""
+    from streamlit.runtime import Runtime
+
+    session_manager = getattr(Runtime.instance(), '_session_mgr', None) if Runtime.exists() else None
+    if session_manager is None:
+        return {}
+    states = {}
+    active = session_manager.list_active_sessions()
+    for info in active:
+        try:
+            states[info.session.id] = info.session.session_state.filtered_state
+        except (RuntimeError, KeyError):
+            # A sessão mudou durante a leitura; entra na próxima medição
+            continue
+    # Esquece as medições anteriores de sessões encerradas
+    active_ids = {info.session.id for info in active}
+    with _previous_lock:
+        for session_id in [session_id for session_id in _previous if session_id not in active_ids]:
+            del _previous[session_id]
+    return states
+
+def server_memory_report(top: int = 10) -> Dict[str, Any]:
+    """
+    Memória do session_state somada em todas as sessões ativas.
+
+    Returns:
+        dict: sessions, total_bytes, largest (sessões maiores), keys (bytes somados por chave)
+              e warnings
+    """
+    sessions = []
+    per_key: Dict[str, int] = {}
+    for session_id, state in _active_session_states().items():
+        try:
+            report = measure_state(state)
+        except RuntimeError:
+            # O session_state mudou durante a cópia; a sessão entra na próxima medição
+            continue
+        sessions.append({'session_id': session_id, 'total_bytes': report['total_bytes'],
+                         'warnings': report['warnings']})
+        for entry in report['keys']:
+            per_key[entry['key']] = per_key.get(entry['key'], 0) + entry['bytes']
+    total = sum(session['total_bytes'] for session in sessions)
+    alerts = [f"Sessão {s['session_id'][:8]}: {w}" for s in sessions for w in s['warnings']]
+    if total > SERVER_WARN_BYTES:
+        alerts.append(f"Sessões somam {total / MB:.1f} MB (limite {SERVER_WARN_BYTES / MB:.0f} MB)")
+    return {
+        'sessions': len(sessions),
+        'total_bytes': total,
+        'largest': sorted(sessions, key=lambda s: s['total_bytes'], reverse=True)[:top],
+        'keys': dict(sorted(per_key.items(), key=lambda item: item[1], reverse=True)[:top]),
+        'warnings': alerts,
+    }
+
+def current_session_report() -> Dict[str, Any]:
+    """Memória do session_state da sessão atual, com o crescimento desde a execução anterior."""
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    state = {key: st.session_state[key] for key in list(st.session_state.keys())}
+    report = measure_state(state, session_id=ctx.session_id if ctx else None)
+    for alert in report['warnings']:
+        warnings.warn(alert, SessionMemoryWarning, stacklevel=2)
+    return report
+
+def render_memory_section():
+    """Seção de memória do painel de diagnósticos (use dentro do expander)."""
+    import streamlit as st
+
+    report = current_session_report()
+    st.markdown(f"**Memória desta sessão:** {report['total_bytes'] / MB:.2f} MB")
+    lines = []
+    for entry in report['keys'][:8]:
+        line = f"- `{entry['key']}`: {entry['bytes'] / 1024:,.0f} KB"
+        if entry['items'] is not None:
+            line += f", {entry['items']} itens"
+        if entry['growth_bytes']:
+            line += f" ({entry['growth_bytes'] / 1024:+,.0f} KB)"
+        lines.append(line)
+    if lines:
+        st.markdown("\n".join(lines))
+
+    for alert in report['warnings']:
+        st.warning(alert, icon="⚠️")
+
+    # Percorre o estado de todas as sessões: só quando pedido, não a cada execução da sidebar
+    if st.button("Medir todas as sessões", key="diag_server_memory"):
+        with st.spinner("Medindo sessões..."):
+            server = server_memory_report(top=3)
+        if not server['sessions']:
+            st.caption("Nenhuma sessão ativa encontrada neste processo.")
+            return
+        st.markdown(f"**Memória de todas as sessões:** {server['total_bytes'] / MB:.1f} MB "
+                    f"em {server['sessions']} sessões ativas")
+        st.markdown("\n".join(f"- `{key}`: {size / MB:.2f} MB" for key, size in server['keys'].items()))
+        for alert in server['warnings']:
+            st.warning(alert, icon="⚠️")
@@ -6,20 +6,24 @@ Cria apresentações profissionais em PDF 16:9 com layout moderno.
 from io import BytesIO
 from reportlab.lib.pagesizes import landscape
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Flowable
+    SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Flowable, Image as PDFImage
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from typing import List
+from typing import List, Optional
 from utils.data_models import PitchDeck
+from utils.tracing import span, traced
 
 # Dimensões 16:9 em points (1920x1080)
 SLIDE_WIDTH = 1920
 SLIDE_HEIGHT = 1080
 SLIDE_SIZE = (SLIDE_WIDTH, SLIDE_HEIGHT)
 
+# Caixa máxima da arte conceitual no slide de título (points)
+COVER_MAX_SIZE = (1000, 420)
+
 class SlideBackground(Flowable):
     """Flowable para desenhar fundo colorido do slide."""
     def __init__(self, color):
@@ -114,7 +118,20 @@ class PitchDeckPDFGenerator:
         color = self.slide_colors[idx % len(self.slide_colors)]
         return SlideBackground(color)
 
-    def generate_pitch_deck_pdf(self, pitch_deck: PitchDeck, filename: str = "pitch_deck.pdf") -> BytesIO:
+    def _cover_image(self, image_id: str) -> Optional[PDFImage]:
+        """Arte conceitual do armazenamento de imagens (original), ou None se ela foi removida."""
+        from utils.image_store import get_image_store
+
+        stored = get_image_store().get(image_id)
+        if stored is None:
+            return None
+        image = PDFImage(BytesIO(stored[0]))
+        scale = min(COVER_MAX_SIZE[0] / image.imageWidth, COVER_MAX_SIZE[1] / image.imageHeight)
+        image.drawWidth, image.drawHeight = image.imageWidth * scale, image.imageHeight * scale
+        return image
+
+    def generate_pitch_deck_pdf(self, pitch_deck: PitchDeck, filename: str = "pitch_deck.pdf",
+                                cover_image_id: Optional[str] = None) -> BytesIO:
         buffer = BytesIO()
         doc = SimpleDocTemplate(
             buffer,
@@ -128,6 +145,9 @@ class PitchDeckPDFGenerator:
         story.append(self._slide_background(slide_idx)); slide_idx += 1
         story.append(self._create_slide_title("SLIDE 1: TÍTULO E APRESENTAÇÃO"))
         story.append(Paragraph(pitch_deck['slide_titulo']['titulo'], self.title_style))
+        cover = self._cover_image(cover_image_id) if cover_image_id else None
+        if cover is not None:
+            story.append(cover)
         story.append(self._separator())
         story.append(Paragraph(pitch_deck['slide_titulo']['conteudo'], self.normal_style))
         if pitch_deck['slide_titulo']['pontos_chave']:
@@ -306,11 +326,14 @@ class PitchDeckPDFGenerator:
         story.append(Spacer(1, 60))
         story.append(Paragraph("<font color='#bdbdbd'>--- Gerado pelo Game Concept Forge ---</font>", self.highlight_style))
 
-        doc.build(story)
+        with span("pdf.reportlab_build", flowables=len(story)):
+            doc.build(story)
         buffer.seek(0)
         return buffer
 
 
-def generate_pitch_deck_pdf(pitch_deck: PitchDeck, filename: str = "pitch_deck.pdf") -> BytesIO:
+@traced("pdf.generate_pitch_deck")
+def generate_pitch_deck_pdf(pitch_deck: PitchDeck, filename: str = "pitch_deck.pdf",
+                            cover_image_id: Optional[str] = None) -> BytesIO:
     generator = PitchDeckPDFGenerator()
-    return generator.generate_pitch_deck_pdf(pitch_deck, filename)
\ No newline at end of file
+    return generator.generate_pitch_deck_pdf(pitch_deck, filename, cover_image_id)
\ No newline at end of file
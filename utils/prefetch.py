@@ -0,0 +1,163 @@
+"""
+Pré-carregamento especulativo das análises do Game Concept Forge.
+Quase todo conceito gerado na página 01 segue para as páginas 02–04 com o mesmo
+`current_concept`. Com o pré-carregamento ligado, assim que o conceito é salvo na
+sessão a análise de concorrentes, o core loop e o fluxo de jogo começam em segundo
+plano, com prioridade baixa, em uma sessão-sombra do gerenciador de jobs. Quando o
+usuário pede a mesma análise para o mesmo conceito, `submit_job` adota o job
+pré-carregado (pronto ou ainda em andamento) em vez de fazer uma nova chamada.
+
+Resultados pré-carregados que ninguém usou contam como desperdício. Cada sessão tem
+um limite de jobs e de tokens desperdiçados (os aproveitados não contam); ao atingi-lo,
+o pré-carregamento é suspenso para a sessão.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+
+from utils.jobs import PRIORITY_LOW, get_job_manager, get_session_id
+
+# Tarefa pré-carregada -> (rótulo, chave do session_state com o conceito do resultado atual)
+PREFETCH_TASKS = {
+    'competitor_analysis': ("Análise de concorrentes", 'analysis_concept'),
+    'core_loop': ("Core loop detalhado", 'core_loop_concept'),
+    'game_flow': ("Fluxo de jogo", 'flow_concept'),
+}
+
+# Opt-in: desligado por padrão; FORGE_PREFETCH=1 liga para novas sessões
+PREFETCH_DEFAULT = os.getenv('FORGE_PREFETCH') == '1'
+
+# Limites de desperdício por sessão
+MAX_WASTED_JOBS = int(os.getenv('FORGE_PREFETCH_MAX_WASTED_JOBS', '6'))
+MAX_WASTED_TOKENS = int(os.getenv('FORGE_PREFETCH_MAX_WASTED_TOKENS', '60000'))
+
+# Chaves do session_state
+PREFETCH_ENABLED_KEY = 'prefetch_enabled'
+_ACTIVE_KEY = '_prefetch_jobs'
+_STALE_KEY = '_prefetch_stale'
+_STATS_KEY = '_prefetch_stats'
+
+# Contadores do processo (todas as sessões), expostos no painel de diagnósticos
+_totals: Dict[str, int] = {'issued': 0, 'hits': 0, 'wasted': 0, 'wasted_tokens': 0}
+_totals_lock = threading.Lock()
+
+def _count(stats: Dict[str, int], key: str, amount: int = 1):
+    stats[key] += amount
+    with _totals_lock:
+        _totals[key] += amount
+
+def get_prefetch_totals() -> Dict[str, int]:
+    """Jobs pré-carregados, aproveitados e desperdiçados (e seus tokens) em todo o processo."""
+    with _totals_lock:
+        return dict(_totals)
+
+def hit_rate(stats: Dict[str, int]) -> Optional[float]:
+    """Fração dos pré-carregamentos já resolvidos que foram aproveitados."""
+    resolved = stats['hits'] + stats['wasted']
+    return stats['hits'] / resolved if resolved else None
+
+def shadow_session(session_id: str) -> str:
+    """Sessão-sombra onde ficam os jobs especulativos de `session_id`."""
+    return f"{session_id}:prefetch"
+
+# --- Estado da sessão ---
+def prefetch_enabled() -> bool:
+    return bool(st.session_state.get(PREFETCH_ENABLED_KEY, PREFETCH_DEFAULT))
+
+def session_stats() -> Dict[str, int]:
+    return st.session_state.setdefault(_STATS_KEY, {'issued': 0, 'hits': 0, 'wasted': 0, 'wasted_tokens': 0})
+
+def _active() -> Dict[str, Dict[str, Any]]:
+    return st.session_state.setdefault(_ACTIVE_KEY, {})
+
+def _stale() -> List[str]:
+    return st.session_state.setdefault(_STALE_KEY, [])
+
+def budget_exhausted() -> bool:
+    """Se o desperdício da sessão atingiu o limite (abandonados ainda em andamento já contam como jobs)."""
+    stats = session_stats()
+    wasted_jobs = stats['wasted'] + len(st.session_state.get(_STALE_KEY, []))
+    return wasted_jobs >= MAX_WASTED_JOBS or stats['wasted_tokens'] >= MAX_WASTED_TOKENS
+
+def schedule_prefetch(game_concept: str):
+    """
+    Inicia em segundo plano as análises do conceito recém-salvo na sessão.
+
+    Pré-carregamentos de conceitos anteriores ainda não usados viram desperdício.
+    """
+    if not prefetch_enabled() or not game_concept:
+        return
+    active = _active()
+    _stale().extend(entry['job_id'] for entry in active.values())
+    active.clear()
+    reconcile_prefetch()
+
+    session_id = get_session_id()
+    stats = session_stats()
+    for task_name, (label, concept_key) in PREFETCH_TASKS.items():
+        if st.session_state.get(concept_key) == game_concept:
+            continue
+        if budget_exhausted():
+            break
+        params = {'game_concept': game_concept}
+        job_id = get_job_manager().submit(shadow_session(session_id), task_name, params,
+                                          label=f"Pré-carregamento: {label}", priority=PRIORITY_LOW)
+        active[task_name] = {'job_id': job_id, 'params': params}
+        _count(stats, 'issued')
+
+def claim_prefetch(task_name: str, params: Dict[str, Any], label: str,
+                   meta: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Adota para a sessão atual o job pré-carregado da tarefa, se os parâmetros coincidirem.
+
+    Returns:
+        ID do job adotado, ou None se não há pré-carregamento aproveitável
+    """
+    entry = st.session_state.get(_ACTIVE_KEY, {}).pop(task_name, None)
+    if entry is None:
+        return None
+    session_id = get_session_id()
+    if entry['params'] == params and get_job_manager().adopt(
+            entry['job_id'], shadow_session(session_id), session_id, label=label, meta=meta):
+        _count(session_stats(), 'hits')
+        return entry['job_id']
+    _stale().append(entry['job_id'])
+    return None
+
+def reconcile_prefetch():
+    """Contabiliza e descarta os pré-carregamentos abandonados que já terminaram."""
+    stale = st.session_state.get(_STALE_KEY)
+    if not stale:
+        return
+    manager = get_job_manager()
+    stats = session_stats()
+    for job_id in list(stale):
+        job = manager.get(job_id, with_result=False)
+        if job is not None and not job.finished:
+            continue
+        if job is not None:
+            _count(stats, 'wasted')
+            _count(stats, 'wasted_tokens', job.tokens)
+            manager.discard(job_id)
+        stale.remove(job_id)
+
+# --- Interface ---
+def render_prefetch_toggle():
+    """Chave de liga/desliga e resumo do pré-carregamento (use dentro da sidebar)."""
+    st.session_state.setdefault(PREFETCH_ENABLED_KEY, PREFETCH_DEFAULT)
+    st.toggle("⚡ Pré-carregar análises", key=PREFETCH_ENABLED_KEY,
+              help="Ao gerar um conceito, inicia em segundo plano a análise de concorrentes, "
+                   "o core loop e o fluxo de jogo, para que as páginas 02–04 abram mais rápido.")
+    if not prefetch_enabled():
+        return
+    stats = session_stats()
+    rate = hit_rate(stats)
+    summary = f"{stats['hits']}/{stats['issued']} aproveitados"
+    if rate is not None:
+        summary += f" ({rate:.0%})"
+    st.caption(f"{summary} · {stats['wasted_tokens']} tokens desperdiçados")
+    if budget_exhausted():
+        st.caption("Limite de pré-carregamento da sessão atingido.")
@@ -0,0 +1,181 @@
+"""
+Profiler amostral das execuções do script das páginas, ligado sob demanda por um admin.
+Para investigar uma reexecução lenta em produção sem depurador: as próximas N
+execuções do script são amostradas por uma thread que lê a pilha da thread do script
+a cada FORGE_PROFILE_INTERVAL segundos, do início da página até o fim da execução.
+
+Cada execução gera um arquivo no formato "collapsed stacks" (uma pilha por linha com a
+contagem de amostras) em FORGE_PROFILE_DIR, que flamegraph.pl, speedscope e inferno
+abrem diretamente; os principais hotspots aparecem em um expander da sidebar.
+
+Como ligar (apenas administradores):
+    ?profile=5&admin=<FORGE_ADMIN_TOKEN>   na URL: as próximas 5 execuções desta sessão
+    FORGE_PROFILE_RUNS=5                   no ambiente: as próximas 5 execuções do processo
+
+Desligado, o custo é uma consulta ao session_state por execução.
+"""
+
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+import streamlit as st
+
+from utils.jobs import get_session_id
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PROFILE_DIR = Path(os.getenv('FORGE_PROFILE_DIR') or ROOT_DIR / 'data' / 'profiles')
+SAMPLE_INTERVAL = float(os.getenv('FORGE_PROFILE_INTERVAL', '0.005'))
+ADMIN_TOKEN = os.getenv('FORGE_ADMIN_TOKEN')
+
+# Execuções a amostrar em todo o processo (FORGE_PROFILE_RUNS)
+_process_runs_left = int(os.getenv('FORGE_PROFILE_RUNS', '0'))
+_process_lock = threading.Lock()
+
+# Relatórios recentes por sessão, exibidos na sidebar
+MAX_REPORTS = 5
+_reports: Dict[str, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=MAX_REPORTS))
+_reports_lock = threading.Lock()
+_sequence = itertools.count(1)
+
+# Chave do session_state com as execuções restantes desta sessão
+_RUNS_LEFT_KEY = '_profile_runs_left'
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    try:
+        path = path.relative_to(ROOT_DIR)
+    except ValueError:
+        path = Path(*path.parts[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+class ScriptSampler(threading.Thread):
+    """Amostra a pilha da thread do script enquanto o frame da página estiver nela."""
+
+    def __init__(self, script_frame, page: str, session_id: str, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="forge-profiler", daemon=True)
+        self.target = threading.get_ident()
+        self.script_frame = script_frame
+        self.page = page
+        self.session_id = session_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.started = time.perf_counter()
+
+    def _sample(self) -> Optional[str]:
+        frame = sys._current_frames().get(self.target)
+        labels: List[str] = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code))
+            if frame is self.script_frame:
+                # Pilha da página para dentro; os frames do runner do Streamlit ficam de fora
+                return ";".join(reversed(labels))
+            frame = frame.f_back
+        return None
+
+    def run(self):
+        while True:
+            stack = self._sample()
+            if stack is None:
+                break
+            self.stacks[stack] += 1
+            time.sleep(self.interval)
+        self._finish(time.perf_counter() - self.started)
+
+    def _finish(self, wall: float):
+        total = sum(self.stacks.values())
+        self_time: Counter = Counter()
+        cumulative: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_time[frames[-1]] += count
+            for label in set(frames):
+                cumulative[label] += count
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_sequence):04d}_{Path(self.page).stem}_{self.session_id[:8]}.collapsed"
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()), encoding='utf-8')
+        report = {
+            'page': Path(self.page).name,
+            'time': time.time(),
+            'wall_seconds': wall,
+            'samples': total,
+            'path': str(path),
+            'self': [(label, count / total) for label, count in self_time.most_common(10)] if total else [],
+            'cumulative': [(label, count / total) for label, count in cumulative.most_common(10)] if total else [],
+        }
+        with _reports_lock:
+            _reports[self.session_id].append(report)
+
+def _take_process_run() -> bool:
+    global _process_runs_left
+    if not _process_runs_left:
+        return False
+    with _process_lock:
+        if _process_runs_left <= 0:
+            return False
+        _process_runs_left -= 1
+        return True
+
+def _enable_from_query():
+    """Liga o profiler da sessão por ?profile=N&admin=<token> e limpa os parâmetros da URL."""
+    params = st.query_params
+    if 'profile' not in params:
+        return
+    token = params.get('admin') or ""
+    if hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        try:
+            st.session_state[_RUNS_LEFT_KEY] = max(0, int(params['profile']))
+        except ValueError:
+            pass
+    del params['profile']
+    if 'admin' in params:
+        del params['admin']
+
+def maybe_profile_run():
+    """
+    Começa a amostrar a execução atual do script se o profiler estiver ligado.
+
+    Deve ser chamada no início da página (a sidebar faz isso).
+    """
+    if ADMIN_TOKEN:
+        _enable_from_query()
+    runs_left = st.session_state.get(_RUNS_LEFT_KEY, 0)
+    if runs_left > 0:
+        st.session_state[_RUNS_LEFT_KEY] = runs_left - 1
+    elif not _take_process_run():
+        return
+
+    # O frame de módulo mais externo da pilha é o script da página
+    frame, script_frame = sys._getframe(1), None
+    while frame is not None:
+        if frame.f_code.co_name == '<module>':
+            script_frame = frame
+        frame = frame.f_back
+    if script_frame is not None:
+        ScriptSampler(script_frame, script_frame.f_code.co_filename, get_session_id()).start()
+
+def get_reports(session_id: str) -> List[Dict[str, Any]]:
+    """Relatórios das execuções amostradas da sessão, do mais recente ao mais antigo."""
+    with _reports_lock:
+        return list(reversed(_reports.get(session_id, ())))
+
+def render_profile_reports():
+    """Expander com os hotspots das execuções amostradas (use dentro da sidebar)."""
+    reports = get_reports(get_session_id())
+    runs_left = st.session_state.get(_RUNS_LEFT_KEY, 0)
+    if not reports and not runs_left:
+        return
+    with st.expander("🔬 Profiler", expanded=False):
+        if runs_left:
+            st.caption(f"Amostrando as próximas {runs_left} execuções desta sessão.")
+        for report in reports:
+            st.markdown(f"**{report['page']}** · {report['wall_seconds'] * 1000:.0f} ms, "
+                        f"{report['samples']} amostras")
+            st.markdown("\n".join(f"- {share:.0%} `{label}`" for label, share in report['self'][:5]))
+            st.caption(f"`{report['path']}`")
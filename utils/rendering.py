@@ -0,0 +1,71 @@
+"""
+Módulo de renderização de markdown para as funções display_* das páginas.
+No modo "coalesced" (padrão) cada seção é montada em uma única string e enviada
+como um único elemento; no modo "per_item" mantém um st.markdown por item.
+
+O modo é lido de st.session_state['render_mode'] ou da variável FORGE_RENDER_MODE.
+"""
+
+import os
+from typing import Iterable, List, Optional
+
+import streamlit as st
+
+RENDER_MODES = ('coalesced', 'per_item')
+
+def get_render_mode() -> str:
+    """Retorna o modo de renderização ativo para a sessão."""
+    mode = st.session_state.get('render_mode') or os.getenv('FORGE_RENDER_MODE', 'coalesced')
+    return mode if mode in RENDER_MODES else 'coalesced'
+
+class MarkdownSection:
+    """
+    Acumula as linhas de markdown de uma seção e as emite de uma vez ao sair do bloco.
+
+    Exemplo:
+        with MarkdownSection() as md:
+            md.add("**Pontos-chave:**")
+            md.items(pontos, "• {item}")
+    """
+
+    def __init__(self, mode: Optional[str] = None):
+        self.coalesced = (mode or get_render_mode()) == 'coalesced'
+        self._lines: List[str] = []
+
+    def add(self, text: str):
+        """Adiciona um bloco de markdown à seção."""
+        if self.coalesced:
+            self._lines.append(text)
+        else:
+            st.markdown(text)
+
+    def items(self, values: Iterable, template: str, empty_message: Optional[str] = None, start: int = 1):
+        """
+        Adiciona uma linha por item usando um template com {i} e {item}.
+
+        Args:
+            values: Itens a exibir
+            template: Formato de cada linha, ex. "**{i}.** {item}"
+            empty_message: Mensagem exibida com st.info quando não há itens
+            start: Número do primeiro item
+        """
+        values = list(values or [])
+        if not values:
+            if empty_message:
+                self.flush()
+                st.info(empty_message)
+            return
+        for i, item in enumerate(values, start):
+            self.add(template.format(i=i, item=item))
+
+    def flush(self):
+        """Emite o markdown acumulado como um único elemento."""
+        if self._lines:
+            st.markdown("\n\n".join(self._lines))
+            self._lines = []
+
+    def __enter__(self) -> "MarkdownSection":
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
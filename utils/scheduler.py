@@ -0,0 +1,264 @@
+"""
+Escalonador das chamadas ao Gemini, compartilhado por todo o processo.
+Limita o número de chamadas em andamento (FORGE_MAX_INFLIGHT no total e, por modelo,
+o limite adaptativo de utils/concurrency.py) e enfileira as demais por prioridade:
+gerações interativas passam à frente do pré-carregamento e dos lotes.
+Dentro de uma mesma prioridade as sessões são atendidas em rodízio, então um usuário
+que clica várias vezes em "Gerar" não impede que os outros sejam atendidos.
+
+Chamadas de um mesmo grupo (ex.: as variações de um conceito, ver `call_context`) são
+admitidas como uma unidade: quando a primeira passa pelo limite do modelo, as demais
+do grupo entram sem esperar por ele, até FORGE_MAX_INFLIGHT, e o lote roda em uma
+rodada só em vez de esperar vagas em várias.
+
+A sessão e a prioridade da chamada vêm do contexto em que o código roda (ver
+`call_context`): os jobs, o worker, a API e o CLI em lote definem esse contexto antes
+de executar uma tarefa, sem precisar passar parâmetros até o GeminiClient.
+"""
+
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional
+
+from utils.concurrency import ModelLimits, is_overload_error
+
+# Prioridades (maior = atendida antes)
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -1
+PRIORITY_BATCH = -2
+
+PRIORITY_LABELS = {
+    PRIORITY_NORMAL: "interativa",
+    PRIORITY_LOW: "segundo plano",
+    PRIORITY_BATCH: "lote",
+}
+
+# Sessão atribuída às chamadas feitas fora de qualquer contexto
+DEFAULT_SESSION = 'default'
+
+@dataclass
+class CallContext:
+    session_id: str = DEFAULT_SESSION
+    priority: int = PRIORITY_NORMAL
+    job_id: Optional[str] = None
+    group: Optional[str] = None
+
+_context: contextvars.ContextVar[CallContext] = contextvars.ContextVar('forge_call_context', default=CallContext())
+
+@contextmanager
+def call_context(session_id: str, priority: int = PRIORITY_NORMAL, job_id: Optional[str] = None,
+                 group: Optional[str] = None) -> Iterator[None]:
+    """Define a sessão, a prioridade, o job e o grupo de admissão das chamadas feitas dentro do bloco."""
+    # Jobs pré-carregados rodam em sessões-sombra ("<sessão>:prefetch") e dividem a cota da sessão
+    reset = _context.set(CallContext(session_id.split(':', 1)[0], priority, job_id, group))
+    try:
+        yield
+    finally:
+        _context.reset(reset)
+
+def current_call_context() -> CallContext:
+    """Contexto das chamadas feitas neste ponto do código."""
+    return _context.get()
+
+@dataclass
+class _Ticket:
+    session_id: str
+    priority: int
+    job_id: Optional[str]
+    model: str
+    group: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted: bool = False
+    # Início da chamada para a latência medida (por padrão, quando a vaga é liberada)
+    started_at: float = 0.0
+    # Tokens gerados na resposta, se quem chama informar (compara a latência com chamadas do mesmo tamanho)
+    output_tokens: Optional[int] = None
+
+class CallScheduler:
+    """Controle de admissão com filas por prioridade e rodízio justo entre sessões."""
+
+    def __init__(self, max_inflight: int = 8):
+        self.max_inflight = max_inflight
+        self.limits = ModelLimits(maximum=float(max_inflight))
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._model_inflight: Dict[str, int] = {}
+        # Grupos já admitidos -> chamadas do grupo em andamento
+        self._groups: Dict[str, int] = {}
+        # Jobs promovidos depois de começar (ex.: pré-carregamento adotado) -> nova prioridade
+        self._promoted: Dict[str, int] = {}
+        # prioridade -> sessão -> tickets em espera; a ordem das sessões é o rodízio
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Ticket]]"] = {}
+        self._durations: Deque[float] = deque(maxlen=50)
+        self._waits: Deque[float] = deque(maxlen=50)
+
+    @contextmanager
+    def slot(self, model: str = "") -> Iterator[_Ticket]:
+        """
+        Aguarda a vez da chamada atual (conforme o contexto) e a mantém em andamento no bloco.
+
+        O resultado do bloco ajusta o limite do modelo: sucesso (com a latência medida)
+        ou erro de sobrecarga (429/503), que é propagado normalmente. O bloco recebe o
+        ticket: quem espera por outra coisa antes da chamada (ex.: cota da chave da API)
+        atualiza `started_at` para que essa espera não conte como latência do modelo.
+        """
+        context = _context.get()
+        with self._cond:
+            priority = max(context.priority, self._promoted.get(context.job_id, context.priority))
+            ticket = _Ticket(context.session_id, priority, context.job_id, model, context.group)
+            self._queues.setdefault(ticket.priority, OrderedDict()) \
+                .setdefault(ticket.session_id, deque()).append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+            self._waits.append(time.monotonic() - ticket.enqueued_at)
+
+        ticket.started_at = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            yield ticket
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._cond:
+                start = ticket.started_at
+                latency = time.monotonic() - start
+                limit = self.limits.get(model)
+                if error is None:
+                    self._durations.append(latency)
+                    limit.on_success(latency, self._model_inflight[model], start, ticket.output_tokens)
+                elif is_overload_error(error):
+                    limit.on_overload(error, start)
+                self._model_inflight[model] -= 1
+                self._inflight -= 1
+                if ticket.group is not None:
+                    self._groups[ticket.group] -= 1
+                    if not self._groups[ticket.group]:
+                        del self._groups[ticket.group]
+                self._dispatch()
+
+    def promote(self, job_id: str, priority: int):
+        """Eleva a prioridade das chamadas do job: as que aguardam vaga e as próximas que ele fizer."""
+        with self._cond:
+            self._promoted[job_id] = max(priority, self._promoted.get(job_id, priority))
+            for current in [p for p in self._queues if p < priority]:
+                sessions = self._queues[current]
+                for session_id, tickets in list(sessions.items()):
+                    for ticket in [t for t in tickets if t.job_id == job_id]:
+                        tickets.remove(ticket)
+                        ticket.priority = priority
+                        self._queues.setdefault(priority, OrderedDict()) \
+                            .setdefault(session_id, deque()).append(ticket)
+                    if not tickets:
+                        del sessions[session_id]
+            self._dispatch()
+
+    def forget_job(self, job_id: str):
+        """Descarta a promoção de um job que terminou."""
+        with self._cond:
+            self._promoted.pop(job_id, None)
+
+    def _can_run(self, ticket: _Ticket) -> bool:
+        if self._inflight >= self.max_inflight:
+            return False
+        # O resto de um grupo já admitido não espera pelo limite do modelo
+        if ticket.group is not None and ticket.group in self._groups:
+            return True
+        return self._model_inflight.get(ticket.model, 0) < self.limits.get(ticket.model).slots
+
+    def _dispatch(self):
+        # Libera vagas para os próximos tickets: maior prioridade primeiro, sessões em rodízio
+        while self._inflight < self.max_inflight:
+            ticket = self._pop_next()
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._inflight += 1
+            self._model_inflight[ticket.model] = self._model_inflight.get(ticket.model, 0) + 1
+            if ticket.group is not None:
+                self._groups[ticket.group] = self._groups.get(ticket.group, 0) + 1
+        self._cond.notify_all()
+
+    def _pop_next(self) -> Optional[_Ticket]:
+        # Tickets de modelos que atingiram o próprio limite esperam sem bloquear os demais
+        for priority in sorted(self._queues, reverse=True):
+            sessions = self._queues[priority]
+            for session_id, tickets in list(sessions.items()):
+                ticket = next((t for t in tickets if self._can_run(t)), None)
+                if ticket is None:
+                    continue
+                tickets.remove(ticket)
+                if tickets:
+                    sessions.move_to_end(session_id)
+                else:
+                    del sessions[session_id]
+                return ticket
+        return None
+
+    def _dispatch_order(self) -> List[_Ticket]:
+        """Ordem em que os tickets em espera serão atendidos (simula o rodízio)."""
+        order: List[_Ticket] = []
+        for priority in sorted(self._queues, reverse=True):
+            pending = [list(tickets) for tickets in self._queues[priority].values()]
+            while any(pending):
+                for tickets in pending:
+                    if tickets:
+                        order.append(tickets.pop(0))
+        return order
+
+    def average_duration(self) -> Optional[float]:
+        with self._cond:
+            return sum(self._durations) / len(self._durations) if self._durations else None
+
+    def queue_status(self, job_id: str) -> Optional[Dict[str, float]]:
+        """
+        Posição na fila e previsão de conclusão da próxima chamada do job, se ele estiver esperando.
+
+        Returns:
+            dict com position (1 = próximo) e eta_seconds (None sem histórico), ou None
+        """
+        with self._cond:
+            order = self._dispatch_order()
+            position = next((i for i, ticket in enumerate(order, 1) if ticket.job_id == job_id), None)
+            if position is None:
+                return None
+            average = sum(self._durations) / len(self._durations) if self._durations else None
+        eta = None
+        if average is not None:
+            # Cada rodada de vagas leva ~uma chamada média; depois vem a própria chamada
+            eta = (math.ceil(position / self.max_inflight) + 1) * average
+        return {'position': position, 'eta_seconds': eta}
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            waiting = {PRIORITY_LABELS.get(priority, str(priority)): sum(len(t) for t in sessions.values())
+                       for priority, sessions in self._queues.items()}
+            return {
+                'max_inflight': self.max_inflight,
+                'inflight': self._inflight,
+                'waiting': {label: count for label, count in waiting.items() if count},
+                'sessions_waiting': len({sid for sessions in self._queues.values() for sid in sessions}),
+                'avg_call_seconds': sum(self._durations) / len(self._durations) if self._durations else None,
+                'avg_wait_seconds': sum(self._waits) / len(self._waits) if self._waits else None,
+                'models': {model: {**snapshot, 'inflight': self._model_inflight.get(model, 0)}
+                           for model, snapshot in self.limits.snapshot().items()},
+                'adjustments': self.limits.adjustments()[-10:],
+            }
+
+_scheduler: Optional[CallScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> CallScheduler:
+    """Escalonador do processo, com FORGE_MAX_INFLIGHT chamadas simultâneas (padrão 8)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = CallScheduler(max_inflight=int(os.getenv('FORGE_MAX_INFLIGHT', '8')))
+        return _scheduler
@@ -0,0 +1,224 @@
+"""
+Módulo com os response schemas enviados ao Gemini.
+Centraliza os schemas JSON usados pelas páginas e pelo GeminiClient,
+além de uma validação leve das respostas decodificadas.
+"""
+
+from typing import Any, Dict, List
+
+# --- Blocos reutilizáveis ---
+def _string_list() -> Dict[str, Any]:
+    return {"type": "array", "items": {"type": "string"}}
+
+def _slide_schema() -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "titulo": {"type": "string"},
+            "conteudo": {"type": "string"},
+            "pontos_chave": _string_list(),
+            "visual_sugerido": {"type": "string"}
+        }
+    }
+
+# --- One-Page GDD (Concept Generator) ---
+ONE_PAGE_GDD_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "titulo_provisorio": {"type": "string"},
+        "genero": {"type": "string"},
+        "plataformas_alvo": _string_list(),
+        "premissa_conceito_central": {"type": "string"},
+        "publico_alvo": _string_list(),
+        "core_loop": {
+            "type": "object",
+            "properties": {
+                "acao": {"type": "string"},
+                "recompensa": {"type": "string"},
+                "progressao": {"type": "string"}
+            }
+        },
+        "mecanicas_principais": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "nome": {"type": "string"},
+                    "descricao": {"type": "string"}
+                }
+            }
+        },
+        "monetizacao_opcional": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tipo": {"type": "string"},
+                    "descricao": {"type": "string"}
+                }
+            }
+        },
+        "pontos_de_venda_unicos_usps": _string_list()
+    }
+}
+
+# --- Análise de concorrentes ---
+ANALISE_CONCORRENTES_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "concorrentes_diretos": _string_list(),
+        "jogos_similares": _string_list(),
+        "pontos_fortes_concorrentes": _string_list(),
+        "pontos_fracos_concorrentes": _string_list(),
+        "oportunidades_diferencacao": _string_list(),
+        "tendencias_mercado": _string_list(),
+        "recomendacoes": _string_list()
+    }
+}
+
+# --- Core loop detalhado ---
+CORE_LOOP_DETALHADO_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "acoes_principais": _string_list(),
+        "sistema_recompensas": {"type": "object", "properties": {
+            "recompensas_imediatas": _string_list(),
+            "recompensas_longo_prazo": _string_list(),
+            "sistema_progressao": {"type": "string"}
+        }},
+        "feedback_loops": _string_list(),
+        "mecanicas_retencao": _string_list(),
+        "balanceamento": {"type": "object", "properties": {
+            "dificuldade_inicial": {"type": "string"},
+            "curva_dificuldade": {"type": "string"},
+            "pontos_ajuste": _string_list()
+        }}
+    }
+}
+
+# --- Fluxo de jogo ---
+FLUXO_JOGO_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "onboarding": {"type": "object", "properties": {
+            "tutorial": {"type": "string"},
+            "primeiros_passos": _string_list(),
+            "objetivos_iniciais": _string_list()
+        }},
+        "progressao": {"type": "object", "properties": {
+            "estrutura_niveis": {"type": "string"},
+            "desbloqueios": _string_list(),
+            "momentos_chave": _string_list()
+        }},
+        "decisoes_jogador": _string_list(),
+        "checkpoints": _string_list(),
+        "fluxo_monetizacao": _string_list(),
+        "experiencia_usuario": {"type": "object", "properties": {
+            "pontos_alto": _string_list(),
+            "pontos_baixo": _string_list(),
+            "otimizacoes": _string_list()
+        }}
+    }
+}
+
+# --- Pitch deck de 10 slides ---
+PITCH_DECK_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "slide_titulo": _slide_schema(),
+        "slide_problema": _slide_schema(),
+        "slide_solucao": _slide_schema(),
+        "slide_mercado": {
+            "type": "object",
+            "properties": {
+                "tamanho_mercado": {"type": "string"},
+                "crescimento_mercado": {"type": "string"},
+                "segmentos_alvo": _string_list(),
+                "tendencias": _string_list(),
+                "oportunidades": _string_list()
+            }
+        },
+        "slide_modelo_negocio": {
+            "type": "object",
+            "properties": {
+                "estrategia_monetizacao": _string_list(),
+                "fontes_receita": _string_list(),
+                "custos_estimados": _string_list(),
+                "projecao_receita": {"type": "string"},
+                "break_even": {"type": "string"}
+            }
+        },
+        "slide_diferencacao": _slide_schema(),
+        "slide_roadmap": {
+            "type": "object",
+            "properties": {
+                "fases": _string_list(),
+                "cronograma": {"type": "string"},
+                "marcos_principais": _string_list(),
+                "recursos_necessarios": _string_list(),
+                "riscos": _string_list()
+            }
+        },
+        "slide_equipe": _slide_schema(),
+        "slide_financeiro": _slide_schema(),
+        "slide_call_action": _slide_schema(),
+        "publico_alvo_pitch": {"type": "string"},
+        "duracao_apresentacao": {"type": "string"},
+        "dicas_apresentacao": _string_list()
+    }
+}
+
+# Todos os schemas de resposta, indexados pelo nome da estrutura
+RESPONSE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "one_page_gdd": ONE_PAGE_GDD_SCHEMA,
+    "analise_concorrentes": ANALISE_CONCORRENTES_SCHEMA,
+    "core_loop_detalhado": CORE_LOOP_DETALHADO_SCHEMA,
+    "fluxo_jogo": FLUXO_JOGO_SCHEMA,
+    "pitch_deck": PITCH_DECK_SCHEMA,
+}
+
+# --- Validação ---
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+}
+
+def validate_against_schema(data: Any, schema: Dict[str, Any], require_all: bool = False,
+                            path: str = "$") -> List[str]:
+    """
+    Valida uma resposta decodificada contra um response schema.
+
+    Args:
+        data: Valor decodificado do JSON
+        schema: Schema no mesmo formato enviado ao Gemini
+        require_all: Se True, toda propriedade declarada deve estar presente
+        path: Caminho do valor atual (usado nas mensagens de erro)
+
+    Returns:
+        List[str]: Lista de erros encontrados (vazia se válido)
+    """
+    errors: List[str] = []
+    expected = str(schema.get("type", "")).lower()
+    check = _TYPE_CHECKS.get(expected)
+    if check and not check(data):
+        errors.append(f"{path}: esperado {expected}, recebido {type(data).__name__}")
+        return errors
+
+    if expected == "object":
+        properties = schema.get("properties", {})
+        required = properties.keys() if require_all else schema.get("required", [])
+        for key in required:
+            if key not in data:
+                errors.append(f"{path}.{key}: campo ausente")
+        for key, sub_schema in properties.items():
+            if key in data:
+                errors.extend(validate_against_schema(data[key], sub_schema, require_all, f"{path}.{key}"))
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(data):
+            errors.extend(validate_against_schema(item, schema["items"], require_all, f"{path}[{i}]"))
+
+    return errors
@@ -4,10 +4,17 @@ Centraliza a lógica da sidebar para reutilização em todas as páginas.
 """
 
 import streamlit as st
-import os
 from datetime import datetime
 from pathlib import Path
 
+from utils.cassette import cassette_mode
+from utils.diagnostics import diagnostics_enabled, render_diagnostics_panel
+from utils.jobs import collect_finished_jobs, render_job_monitor
+from utils.key_pool import load_api_keys
+from utils.prefetch import reconcile_prefetch, render_prefetch_toggle
+from utils.profiler import maybe_profile_run, render_profile_reports
+from utils.tracing import begin_run, render_last_action_timing
+
 # Lista de páginas e ícones
 PAGES = [
     {"name": "Página Inicial", "icon": "🏠", "file": "app.py"},
@@ -21,59 +28,85 @@ PAGES = [
 def render_sidebar():
     """
     Sidebar multipage robusta: navegação customizada, status, config, histórico e sobre.
+
+    O conteúdo roda como fragmento: cliques na sidebar reexecutam apenas a sidebar,
+    não o script inteiro da página. Antes de desenhar, aplica na sessão os resultados
+    dos jobs em segundo plano que terminaram desde a última execução.
     """
-    GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+    maybe_profile_run()
+    begin_run()
+    collect_finished_jobs()
+    reconcile_prefetch()
     with st.sidebar:
-        # --- Navegação ---
-        st.markdown("<div style='font-size:1.2em; font-weight:bold; margin-bottom:0.5em;'>📄 Navegação</div>", unsafe_allow_html=True)
-        current_page = Path(st.session_state.get('__file__', '')).name.lower()
-        for page in PAGES:
-            is_active = Path(page['file']).name.lower() == current_page
-            btn_label = f"{page['icon']} {page['name']}"
-            if st.button(btn_label, use_container_width=True, disabled=is_active, key=f"nav_{page['file']}"):
-                if not is_active:
-                    st.switch_page(page['file'])
-        st.markdown("---")
-
-        # --- Status do conceito atual ---
-        if 'current_gdd' in st.session_state:
-            st.success("✅ Conceito carregado")
-            gdd = st.session_state['current_gdd']
-            st.markdown(f"**Título:** {gdd.get('titulo_provisorio', 'Sem título')}")
-            st.markdown(f"**Gênero:** {gdd.get('genero', 'N/A')}")
-            if st.button("🔄 Limpar Sessão", use_container_width=True):
-                clear_session_data()
-                st.rerun()
-        else:
-            st.info("ℹ️ Nenhum conceito carregado")
-            st.markdown("Gere um conceito na página Concept Generator para começar!")
-        st.markdown("---")
-
-        # --- Status da configuração ---
-        st.markdown("**🔧 Configuração:**")
-        api_status = "✅ Conectado" if GEMINI_API_KEY else "❌ Não configurado"
-        st.markdown(f"API Status: {api_status}")
-        if not GEMINI_API_KEY:
-            st.error("⚠️ GEMINI_API_KEY não encontrada!")
-            st.markdown("Configure sua chave de API para usar o app.")
-        st.markdown("---")
-
-        # --- Histórico de pitch decks (dropdown elegante) ---
-        st.markdown("**📊 Histórico de Pitch Decks:**")
-        if 'pitch_deck_history' in st.session_state and st.session_state.pitch_deck_history:
-            with st.expander("Ver últimos 5 pitch decks", expanded=False):
-                for i, pitch in enumerate(st.session_state.pitch_deck_history[-5:][::-1], 1):
-                    st.markdown(f"**{i}.** {pitch.get('concept_title', 'Sem título')} - {pitch.get('publico_alvo', 'N/A')}")
-        else:
-            st.markdown("Nenhum pitch deck disponível")
+        render_job_monitor()
+        render_last_action_timing()
+        render_profile_reports()
+        _sidebar_fragment()
+
+@st.fragment
+def _sidebar_fragment():
+    api_keys = load_api_keys()
+    # --- Navegação ---
+    st.markdown("<div style='font-size:1.2em; font-weight:bold; margin-bottom:0.5em;'>📄 Navegação</div>", unsafe_allow_html=True)
+    current_page = Path(st.session_state.get('__file__', '')).name.lower()
+    for page in PAGES:
+        is_active = Path(page['file']).name.lower() == current_page
+        btn_label = f"{page['icon']} {page['name']}"
+        if st.button(btn_label, use_container_width=True, disabled=is_active, key=f"nav_{page['file']}"):
+            if not is_active:
+                st.switch_page(page['file'])
+    st.markdown("---")
+
+    # --- Status do conceito atual ---
+    if 'current_gdd' in st.session_state:
+        st.success("✅ Conceito carregado")
+        gdd = st.session_state['current_gdd']
+        st.markdown(f"**Título:** {gdd.get('titulo_provisorio', 'Sem título')}")
+        st.markdown(f"**Gênero:** {gdd.get('genero', 'N/A')}")
+        if st.button("🔄 Limpar Sessão", use_container_width=True):
+            clear_session_data()
+            st.rerun()
+    else:
+        st.info("ℹ️ Nenhum conceito carregado")
+        st.markdown("Gere um conceito na página Concept Generator para começar!")
+    st.markdown("---")
+
+    # --- Status da configuração ---
+    st.markdown("**🔧 Configuração:**")
+    replaying = cassette_mode() == 'replay'
+    api_status = "📼 Reproduzindo cassete" if replaying else "✅ Conectado" if api_keys else "❌ Não configurado"
+    if len(api_keys) > 1 and not replaying:
+        api_status += f" ({len(api_keys)} chaves)"
+    if cassette_mode() == 'record':
+        api_status += " · 🔴 gravando"
+    st.markdown(f"API Status: {api_status}")
+    if not api_keys and not replaying:
+        st.error("⚠️ GEMINI_API_KEY não encontrada!")
+        st.markdown("Configure sua chave de API para usar o app.")
+    render_prefetch_toggle()
+    st.markdown("---")
+
+    # --- Histórico de pitch decks (dropdown elegante) ---
+    st.markdown("**📊 Histórico de Pitch Decks:**")
+    if 'pitch_deck_history' in st.session_state and st.session_state.pitch_deck_history:
+        with st.expander("Ver últimos 5 pitch decks", expanded=False):
+            for i, pitch in enumerate(st.session_state.pitch_deck_history[-5:][::-1], 1):
+                st.markdown(f"**{i}.** {pitch.get('concept_title', 'Sem título')} - {pitch.get('publico_alvo', 'N/A')}")
+    else:
+        st.markdown("Nenhum pitch deck disponível")
+    st.markdown("---")
+
+    # --- Sobre ---
+    st.markdown("**ℹ️ Sobre:**")
+    st.markdown("🎮 **Game Concept Forge @ Wilson Melo**")
+    st.markdown("Versão: 1.1.0")
+    st.markdown("IA Generativa para Linguagem")
+    st.markdown("[25E2_3]")
+
+    # --- Diagnósticos (opcional) ---
+    if diagnostics_enabled():
         st.markdown("---")
-
-        # --- Sobre ---
-        st.markdown("**ℹ️ Sobre:**")
-        st.markdown("🎮 **Game Concept Forge @ Wilson Melo**")
-        st.markdown("Versão: 1.1.0")
-        st.markdown("IA Generativa para Linguagem")
-        st.markdown("[25E2_3]")
+        render_diagnostics_panel()
 
 def clear_session_data():
     """
@@ -89,7 +122,12 @@ def clear_session_data():
         'game_flow',
         'flow_concept',
         'pitch_deck_history',
-        'current_pitch_deck'
+        'current_pitch_deck',
+        'current_pitch_cover',
+        'concept_art',
+        'concept_variants',
+        'job_results',
+        'job_errors'
     ]
 
     for key in keys_to_clear:
@@ -0,0 +1,199 @@
+"""
+Tarefas de geração do Game Concept Forge executadas como jobs em segundo plano.
+Cada tarefa tem uma função de execução (roda na thread do job, sem acesso ao
+st.session_state) e um handler que aplica o resultado na sessão quando ele é
+coletado pela página.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import streamlit as st
+
+from utils.jobs import BATCH_META_KEY, Job, on_complete, submit_followup, task
+from utils.prefetch import schedule_prefetch
+from utils.sidebar import add_to_concept_history
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
+
+# --- Geração genérica (API) ---
+@task("generate_content")
+def run_generate_content(client, prompt: str, system_instruction: str = "",
+                         response_schema: Optional[Dict] = None, model: str = "gemini-2.5-flash") -> Any:
+    return client.generate_content(prompt=prompt, system_instruction=system_instruction,
+                                   response_schema=response_schema, model=model)
+
+# --- Concept Generator ---
+# Artes candidatas por pedido e premissas cujas artes ficam guardadas na sessão
+MAX_ART_CANDIDATES = 4
+MAX_ART_CONCEPTS = 5
+
+def concept_art_prompt(gdd: Dict[str, Any]) -> str:
+    """Prompt da arte conceitual de um GDD (também identifica as artes dele na sessão)."""
+    return f"arte conceitual do jogo: {gdd['premissa_conceito_central']}"
+
+def _art_variant(prompt: str, candidate: int) -> str:
+    # Candidatas além da primeira pedem uma composição diferente (e não colidem no cassete)
+    return prompt if candidate == 0 else f"{prompt} (variação {candidate + 1}, composição diferente)"
+
+def concept_art(prompt: str) -> Dict[str, Any]:
+    """Artes geradas para o prompt nesta sessão: image_ids (ver utils/image_store.py) e failed."""
+    return st.session_state.get('concept_art', {}).get(prompt, {'image_ids': [], 'failed': 0})
+
+def _store_art(prompt: str, image_id: Optional[str]):
+    arts = st.session_state.setdefault('concept_art', {})
+    entry = arts.pop(prompt, {'image_ids': [], 'failed': 0})
+    if image_id is None:
+        entry['failed'] += 1
+    else:
+        entry['image_ids'].append(image_id)
+    # Reinsere no fim: as premissas mais antigas saem primeiro
+    arts[prompt] = entry
+    while len(arts) > MAX_ART_CONCEPTS:
+        arts.pop(next(iter(arts)))
+
+def art_label(candidate: int) -> str:
+    return f"Arte conceitual {candidate + 1}"
+
+def _generate_art(client, prompt: str, candidate: int) -> Optional[str]:
+    # A mesma variação já gerada (nesta ou em outra sessão) sai do disco, sem nova chamada
+    from utils.image_store import get_image_store
+
+    variant = _art_variant(prompt, candidate)
+    return get_image_store().get_or_create(variant, lambda: client.generate_image(variant))
+
+@task("concept")
+def run_concept(client, idea: str, model: str = "gemini-2.5-flash", with_image: bool = True,
+                art_candidates: int = 1) -> Dict[str, Any]:
+    """
+    Gera o GDD e dispara a arte conceitual assim que a premissa é conhecida.
+
+    Dentro de um job, cada arte candidata vira um job "concept_art" próprio, que roda em
+    paralelo enquanto a página já exibe o GDD; fora de um job (API, CLI em lote) as
+    artes são geradas aqui mesmo.
+    """
+    gdd = client.generate_concept(idea, model=model)
+    image_ids = []
+    if with_image:
+        prompt = concept_art_prompt(gdd)
+        for candidate in range(min(art_candidates, MAX_ART_CANDIDATES)):
+            if submit_followup("concept_art", art_label(candidate), prompt=prompt, candidate=candidate) is None:
+                image_ids.append(_generate_art(client, prompt, candidate))
+    return {'gdd': gdd, 'image_ids': image_ids}
+
+def adopt_concept(gdd: Dict[str, Any], idea: str):
+    """Torna o GDD o conceito atual da sessão (histórico e pré-carregamento incluídos)."""
+    st.session_state['current_gdd'] = gdd
+    st.session_state['current_concept'] = idea
+    add_to_concept_history(gdd.get('titulo_provisorio', 'Sem título'), gdd, idea)
+    schedule_prefetch(idea)
+
+@on_complete("concept")
+def apply_concept(job: Job):
+    gdd = job.result['gdd']
+    for image_id in job.result['image_ids']:
+        _store_art(concept_art_prompt(gdd), image_id)
+    adopt_concept(gdd, job.params['idea'])
+
+# Variações: K gerações paralelas da mesma ideia, ordenadas por utils/variants.py
+@task("concept_variant")
+def run_concept_variant(client, idea: str, model: str = "gemini-2.5-flash",
+                        temperature: Optional[float] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+    return client.generate_concept(idea, model=model, temperature=temperature, seed=seed)
+
+@on_complete("concept_variant")
+def apply_concept_variant(job: Job):
+    batch = st.session_state.get('concept_variants')
+    # Respostas de um lote substituído por outro mais novo são descartadas
+    if batch is not None and batch['id'] == job.meta.get(BATCH_META_KEY):
+        batch['results'][job.meta['index']] = job.result
+
+@task("concept_art")
+def run_concept_art(client, prompt: str, candidate: int = 0) -> Optional[str]:
+    """Gera uma arte candidata e retorna o ID dela; None se o modelo não devolveu imagem."""
+    return _generate_art(client, prompt, candidate)
+
+@on_complete("concept_art")
+def apply_concept_art(job: Job):
+    _store_art(job.params['prompt'], job.result)
+
+# --- Competitor Analysis ---
+@task("competitor_analysis")
+def run_competitor_analysis(client, game_concept: str) -> Dict[str, Any]:
+    return client.analyze_competitors(game_concept)
+
+@on_complete("competitor_analysis")
+def apply_competitor_analysis(job: Job):
+    st.session_state['competitor_analysis'] = job.result
+    st.session_state['analysis_concept'] = job.params['game_concept']
+    st.session_state.setdefault('analysis_history', []).append({
+        'concept': job.params['game_concept'],
+        'analysis': job.result,
+        'date': _now(),
+        'depth': job.meta.get('depth')
+    })
+
+# --- Core Loop Developer ---
+@task("core_loop")
+def run_core_loop(client, game_concept: str) -> Dict[str, Any]:
+    return client.develop_core_loop(game_concept)
+
+@on_complete("core_loop")
+def apply_core_loop(job: Job):
+    st.session_state['core_loop_detailed'] = job.result
+    st.session_state['core_loop_concept'] = job.params['game_concept']
+    st.session_state.setdefault('core_loop_history', []).append({
+        'concept': job.params['game_concept'],
+        'core_loop': job.result,
+        'date': _now(),
+        'complexity': job.meta.get('complexity'),
+        'focus_areas': job.meta.get('focus_areas', [])
+    })
+
+# --- Game Flow Creator ---
+@task("game_flow")
+def run_game_flow(client, game_concept: str) -> Dict[str, Any]:
+    return client.create_game_flow(game_concept)
+
+@on_complete("game_flow")
+def apply_game_flow(job: Job):
+    st.session_state['game_flow'] = job.result
+    st.session_state['flow_concept'] = job.params['game_concept']
+    st.session_state.setdefault('flow_history', []).append({
+        'concept': job.params['game_concept'],
+        'flow': job.result,
+        'date': _now(),
+        'type': job.meta.get('type'),
+        'audience': job.meta.get('audience')
+    })
+
+# --- Pitch Deck Creator ---
+@task("pitch_deck")
+def run_pitch_deck(client, concept_data: Dict[str, Any]) -> Dict[str, Any]:
+    return client.generate_pitch_deck(concept_data)
+
+@on_complete("pitch_deck")
+def apply_pitch_deck(job: Job):
+    concept_data = job.params['concept_data']
+    # A primeira arte do conceito vira a capa do PDF
+    cover = None
+    if concept_data.get('premissa_conceito_central'):
+        cover = next(iter(concept_art(concept_art_prompt(concept_data))['image_ids']), None)
+    st.session_state.setdefault('pitch_deck_history', []).append({
+        'concept_title': concept_data.get('titulo_provisorio', 'Sem título'),
+        'publico_alvo': concept_data.get('publico_alvo_pitch'),
+        'duracao': concept_data.get('duracao_apresentacao'),
+        'foco': concept_data.get('foco_principal'),
+        'pitch_deck': job.result,
+        'cover_image_id': cover
+    })
+    st.session_state.current_pitch_deck = job.result
+    st.session_state.current_pitch_cover = cover
+
+# --- PDF do pitch deck ---
+@task("pitch_deck_pdf")
+def run_pitch_deck_pdf(client, pitch_deck: Dict[str, Any]) -> bytes:
+    """Renderiza o PDF fora do processo web (o client não é usado)."""
+    from utils.pdf_generator import generate_pitch_deck_pdf
+    return generate_pitch_deck_pdf(pitch_deck).getvalue()
@@ -0,0 +1,293 @@
+"""
+Rastreamento (spans) das operações do Game Concept Forge no lado do cliente.
+Cada ação do usuário (um clique em "Gerar") abre um trace; o job em segundo plano,
+a espera no escalonador, a chamada ao Gemini, o parsing do JSON, a renderização das
+funções display_* e a geração do PDF viram spans desse trace. Assim dá para ver onde
+foram os 50 segundos de um pitch deck: fila, Gemini, decodificação ou interface.
+
+Os spans ficam em memória (a sidebar mostra a cascata da última ação) e, com
+FORGE_TRACE_FILE, são gravados em JSONL no formato OTLP-JSON (uma linha por lote de
+spans, compatível com o OpenTelemetry Collector).
+
+O contexto do trace atravessa threads e processos no formato W3C traceparent
+(`current_traceparent` / `attach`): os jobs guardam o traceparent de quem os enviou.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import streamlit as st
+
+SERVICE_NAME = 'game-concept-forge'
+
+# Traces mantidos em memória para a cascata e spans por trace
+MAX_TRACES = 256
+MAX_SPANS_PER_TRACE = 500
+
+# Enquanto a última ação tiver spans recentes, a cascata se atualiza a cada REFRESH_SECONDS
+REFRESH_SECONDS = 2.0
+RECENT_SECONDS = 10.0
+
+# Chaves do session_state
+_LAST_ACTION_KEY = '_trace_last_action'
+_RENDER_PARENT_KEY = '_trace_render_parent'
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    recording: bool = True
+
+    def set(self, **attributes):
+        """Acrescenta atributos ao span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+# Span atual: (trace_id, span_id, remoto); remoto = pai em outra thread ou processo
+_current: contextvars.ContextVar[Optional[Tuple[str, str, bool]]] = \
+    contextvars.ContextVar('forge_trace_span', default=None)
+
+_traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+_unexported: Dict[str, List[Span]] = {}
+_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+def _new_id(nbytes: int) -> str:
+    return secrets.token_hex(nbytes)
+
+def _parse_traceparent(traceparent: Optional[str]) -> Optional[Tuple[str, str]]:
+    parts = (traceparent or "").split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+def current_traceparent() -> Optional[str]:
+    """Contexto do span atual no formato W3C traceparent (para passar a outra thread ou processo)."""
+    current = _current.get()
+    return f"00-{current[0]}-{current[1]}-01" if current else None
+
+@contextmanager
+def attach(traceparent: Optional[str]) -> Iterator[None]:
+    """Faz os spans abertos no bloco serem filhos do span remoto `traceparent` (None não faz nada)."""
+    parsed = _parse_traceparent(traceparent)
+    if parsed is None:
+        yield
+        return
+    reset = _current.set((parsed[0], parsed[1], True))
+    try:
+        yield
+    finally:
+        _current.reset(reset)
+
+def _in_script_thread() -> bool:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+def _parent() -> Optional[Tuple[str, str, bool]]:
+    current = _current.get()
+    if current is not None or not _in_script_thread():
+        return current
+    # Na thread do script, a renderização de um resultado recém-coletado entra no trace da ação
+    parsed = _parse_traceparent(st.session_state.get(_RENDER_PARENT_KEY))
+    return (parsed[0], parsed[1], True) if parsed else None
+
+def _record(span: Span, outermost: bool):
+    with _lock:
+        spans = _traces.get(span.trace_id)
+        if spans is None:
+            spans = _traces[span.trace_id] = []
+            while len(_traces) > MAX_TRACES:
+                old_id, _ = _traces.popitem(last=False)
+                _unexported.pop(old_id, None)
+        if len(spans) < MAX_SPANS_PER_TRACE:
+            spans.append(span)
+            _unexported.setdefault(span.trace_id, []).append(span)
+        batch = _unexported.pop(span.trace_id, []) if outermost else []
+    if batch:
+        _export(batch)
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Mede o bloco como um span filho do span atual (ou raiz de um novo trace).
+
+    Na thread de script do Streamlit, fora de uma ação do usuário, o span não é
+    registrado: reexecuções comuns da página não geram traces.
+    """
+    parent = _parent()
+    if parent is None and _in_script_thread():
+        yield Span(name, "", "", None, time.time_ns(), recording=False)
+        return
+    trace_id = parent[0] if parent else _new_id(16)
+    current = Span(name, trace_id, _new_id(8), parent[1] if parent else None, time.time_ns(),
+                   attributes=dict(attributes))
+    reset = _current.set((trace_id, current.span_id, False))
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(reset)
+        current.end_ns = time.time_ns()
+        # O span mais externo desta thread envia o lote de spans do trace para o arquivo
+        _record(current, outermost=parent is None or parent[2])
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes):
+    """Registra como filho do span atual um intervalo já medido (ex.: espera em fila)."""
+    parent = _current.get()
+    if parent is None:
+        return
+    _record(Span(name, parent[0], _new_id(8), parent[1], start_ns, end_ns, dict(attributes)), outermost=False)
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator: cada chamada da função vira um span `name`."""
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_trace(trace_id: str) -> List[Span]:
+    """Spans já concluídos do trace, em ordem de início."""
+    with _lock:
+        spans = list(_traces.get(trace_id, []))
+    return sorted(spans, key=lambda s: s.start_ns)
+
+# --- Exportação OTLP-JSON ---
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """Lote de spans no formato ExportTraceServiceRequest do OTLP/JSON."""
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}},
+                                    {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'utils.tracing'},
+            'spans': [{
+                'traceId': s.trace_id,
+                'spanId': s.span_id,
+                **({'parentSpanId': s.parent_id} if s.parent_id else {}),
+                'name': s.name,
+                'kind': 1,
+                'startTimeUnixNano': str(s.start_ns),
+                'endTimeUnixNano': str(s.end_ns),
+                'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in s.attributes.items()],
+                'status': {'code': 2, 'message': s.error} if s.error else {'code': 1},
+            } for s in spans],
+        }],
+    }]}
+
+def _export(spans: List[Span]):
+    path = os.getenv('FORGE_TRACE_FILE')
+    if not path:
+        return
+    line = json.dumps(to_otlp(spans), ensure_ascii=False) + "\n"
+    with _export_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(line)
+
+# --- Integração com o Streamlit ---
+@contextmanager
+def action(name: str, **attributes) -> Iterator[Span]:
+    """Abre o trace de uma ação do usuário e o marca como a última ação da sessão."""
+    # A ação é sempre raiz, mesmo durante a renderização de um resultado anterior
+    root = Span(name, _new_id(16), _new_id(8), None, time.time_ns(), attributes=dict(attributes))
+    st.session_state[_LAST_ACTION_KEY] = root.trace_id
+    reset = _current.set((root.trace_id, root.span_id, False))
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(reset)
+        root.end_ns = time.time_ns()
+        _record(root, outermost=True)
+
+def begin_run():
+    """Início de uma execução do script: a renderização deixa de contar para a ação anterior."""
+    st.session_state.pop(_RENDER_PARENT_KEY, None)
+
+def render_in_trace(traceparent: Optional[str]):
+    """A renderização desta execução do script entra no trace `traceparent` (o job coletado)."""
+    if traceparent:
+        st.session_state[_RENDER_PARENT_KEY] = traceparent
+
+def render_last_action_timing():
+    """Cascata de tempos da última ação da sessão (use dentro da sidebar)."""
+    trace_id = st.session_state.get(_LAST_ACTION_KEY)
+    spans = get_trace(trace_id) if trace_id else []
+    if not spans:
+        return
+    if _is_recent(spans):
+        # Job ou renderização ainda acrescentando spans: atualiza sozinha por alguns segundos
+        _live_timing_fragment(trace_id)
+    else:
+        _render_waterfall(spans)
+
+def _is_recent(spans: List[Span]) -> bool:
+    latest = max(s.end_ns or time.time_ns() for s in spans)
+    return time.time_ns() - latest < RECENT_SECONDS * 1e9
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def _live_timing_fragment(trace_id: str):
+    spans = get_trace(trace_id)
+    if spans:
+        _render_waterfall(spans)
+    if not spans or not _is_recent(spans):
+        # O trace parou de crescer: uma execução completa troca o fragmento pela versão
+        # estática, e a aba ociosa para de atualizar a cada REFRESH_SECONDS
+        st.rerun(scope="app")
+
+def _render_waterfall(spans: List[Span]):
+    start = min(s.start_ns for s in spans)
+    end = max(s.end_ns or s.start_ns for s in spans)
+    total = max(end - start, 1)
+    depth: Dict[str, int] = {}
+    rows = []
+    for s in spans:
+        depth[s.span_id] = depth.get(s.parent_id or "", -1) + 1
+        left = (s.start_ns - start) / total * 100
+        width = max(((s.end_ns or end) - s.start_ns) / total * 100, 0.5)
+        color = "#d9534f" if s.error else "#4a90d9"
+        rows.append(
+            f"<div style='font-size:0.75em; padding-left:{depth[s.span_id] * 8}px; white-space:nowrap; "
+            f"overflow:hidden; text-overflow:ellipsis;'>{s.name} · {s.duration_ms:,.0f} ms</div>"
+            f"<div style='background:#eee; height:6px; margin-bottom:4px;'>"
+            f"<div style='margin-left:{left:.2f}%; width:{width:.2f}%; background:{color}; height:6px;'></div></div>"
+        )
+    with st.expander(f"⏱️ Última ação: {total / 1e9:.1f}s", expanded=False):
+        st.markdown("".join(rows), unsafe_allow_html=True)
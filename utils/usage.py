@@ -0,0 +1,42 @@
+"""
+Contagem de tokens consumidos pelas chamadas ao Gemini.
+O GeminiClient informa o uso de cada resposta com `add_tokens`; quem executa uma
+tarefa (jobs, workers) abre um `token_meter()` em volta dela para saber quantos
+tokens aquela execução gastou, sem precisar passar contadores pelas funções.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+class TokenMeter:
+    """Acumula os tokens das chamadas feitas dentro de um `token_meter()`."""
+
+    def __init__(self):
+        self.prompt = 0
+        self.output = 0
+        self.total = 0
+
+_current: contextvars.ContextVar[Optional[TokenMeter]] = contextvars.ContextVar('forge_token_meter', default=None)
+
+@contextmanager
+def token_meter() -> Iterator[TokenMeter]:
+    """Mede os tokens gastos pelo código executado dentro do bloco (na mesma thread)."""
+    meter = TokenMeter()
+    reset = _current.set(meter)
+    try:
+        yield meter
+    finally:
+        _current.reset(reset)
+
+def add_tokens(response):
+    """Soma o usage_metadata de uma resposta do Gemini ao medidor ativo, se houver."""
+    meter = _current.get()
+    usage = getattr(response, 'usage_metadata', None)
+    if meter is None or usage is None:
+        return
+    prompt = usage.prompt_token_count or 0
+    output = usage.candidates_token_count or 0
+    meter.prompt += prompt
+    meter.output += output
+    meter.total += usage.total_token_count or (prompt + output)
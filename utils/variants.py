@@ -0,0 +1,141 @@
+"""
+Modo "variações" do Concept Generator: várias versões do conceito para a mesma ideia.
+As K gerações rodam como jobs paralelos, cada uma com temperatura e seed próprias, e o
+escalonador as admite como um grupo (uma rodada só, até FORGE_MAX_INFLIGHT chamadas), e
+as respostas são ordenadas por um avaliador local, sem chamadas extras ao modelo:
+
+- completude: fração dos campos do One-Page GDD preenchidos;
+- diversidade interna: mecânicas e USPs que não repetem umas às outras;
+- quase-duplicatas: conceitos com impressão digital (simhash) muito próxima de um
+  conceito mais bem avaliado perdem pontos e são sinalizados.
+"""
+
+import hashlib
+import re
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from utils.schemas import ONE_PAGE_GDD_SCHEMA
+
+MIN_VARIANTS = 2
+MAX_VARIANTS = 10
+
+# Faixa de temperatura distribuída entre as variações (a primeira é a mais conservadora)
+TEMPERATURE_RANGE = (0.7, 1.5)
+
+# Distância de Hamming (em 64 bits) abaixo da qual dois conceitos são quase-duplicatas
+DUPLICATE_DISTANCE = 10
+
+# Pesos da nota final
+WEIGHTS = {'completeness': 0.5, 'diversity': 0.5}
+DUPLICATE_PENALTY = 0.5
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# --- Parâmetros das gerações ---
+def variant_settings(count: int, base_seed: int) -> List[Dict[str, Any]]:
+    """Temperatura e seed de cada variação (seeds consecutivas a partir de `base_seed`)."""
+    low, high = TEMPERATURE_RANGE
+    step = (high - low) / (count - 1) if count > 1 else 0.0
+    return [{'temperature': round(low + step * i, 2), 'seed': base_seed + i} for i in range(count)]
+
+# --- Texto e impressões digitais ---
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def _shingles(text: str, size: int = 3) -> Set[str]:
+    words = _words(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def simhash(text: str) -> int:
+    """Impressão digital de 64 bits: textos parecidos diferem em poucos bits."""
+    weights = [0] * 64
+    for shingle in _shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+def concept_text(gdd: Dict[str, Any]) -> str:
+    """Texto que identifica o conceito: título, premissa, core loop, mecânicas e USPs."""
+    core_loop = gdd.get('core_loop') or {}
+    parts = [gdd.get('titulo_provisorio', ''), gdd.get('genero', ''), gdd.get('premissa_conceito_central', ''),
+             *(str(value) for value in core_loop.values())]
+    parts += [f"{m.get('nome', '')} {m.get('descricao', '')}" for m in gdd.get('mecanicas_principais') or []]
+    parts += [str(usp) for usp in gdd.get('pontos_de_venda_unicos_usps') or []]
+    return " ".join(part for part in parts if part)
+
+# --- Critérios ---
+def _leaves(value: Any, schema: Dict[str, Any]) -> Tuple[int, int]:
+    """(campos preenchidos, campos esperados) de um valor segundo o schema."""
+    kind = schema.get('type')
+    if kind == 'object':
+        filled = expected = 0
+        for key, sub in schema.get('properties', {}).items():
+            f, e = _leaves(value.get(key) if isinstance(value, dict) else None, sub)
+            filled, expected = filled + f, expected + e
+        return filled, expected
+    if kind == 'array':
+        # Uma lista conta como um campo, preenchido se tiver ao menos um item não vazio
+        return (1 if isinstance(value, list) and any(_leaves(item, schema.get('items', {}))[0]
+                                                     for item in value) else 0), 1
+    return (1 if value not in (None, "", []) and str(value).strip() else 0), 1
+
+def completeness(gdd: Dict[str, Any]) -> float:
+    """Fração dos campos do One-Page GDD preenchidos."""
+    filled, expected = _leaves(gdd, ONE_PAGE_GDD_SCHEMA)
+    return filled / expected if expected else 0.0
+
+def _distinctness(texts: Sequence[str]) -> Optional[float]:
+    """1 - similaridade média entre os pares de textos (None com menos de dois textos)."""
+    shingles = [_shingles(text, size=2) for text in texts if text.strip()]
+    pairs = list(combinations(shingles, 2))
+    if not pairs:
+        return None
+    return 1.0 - sum(_jaccard(a, b) for a, b in pairs) / len(pairs)
+
+def diversity(gdd: Dict[str, Any]) -> float:
+    """Quanto as mecânicas e os USPs do conceito diferem entre si (0 a 1)."""
+    mechanics = [f"{m.get('nome', '')} {m.get('descricao', '')}" for m in gdd.get('mecanicas_principais') or []]
+    usps = [str(usp) for usp in gdd.get('pontos_de_venda_unicos_usps') or []]
+    scores = [score for score in (_distinctness(mechanics), _distinctness(usps)) if score is not None]
+    return sum(scores) / len(scores) if scores else 0.0
+
+# --- Ranking ---
+def rank_variants(gdds: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Avalia e ordena as variações, da melhor para a pior.
+
+    Args:
+        gdds: GDDs na ordem em que foram pedidos
+
+    Returns:
+        list: index (posição em `gdds`), gdd, score, completeness, diversity e
+              duplicate_of (index da variação mais bem avaliada de que esta é quase-duplicata)
+    """
+    entries = []
+    for index, gdd in enumerate(gdds):
+        entry = {'index': index, 'gdd': gdd, 'completeness': completeness(gdd), 'diversity': diversity(gdd),
+                 'fingerprint': simhash(concept_text(gdd)), 'duplicate_of': None}
+        entry['score'] = sum(WEIGHTS[name] * entry[name] for name in WEIGHTS)
+        entries.append(entry)
+
+    # Percorre das melhores para as piores: cada conceito só é comparado aos que ficaram à frente
+    kept: List[Dict[str, Any]] = []
+    for entry in sorted(entries, key=lambda e: e['score'], reverse=True):
+        original = next((k for k in kept if hamming(k['fingerprint'], entry['fingerprint']) <= DUPLICATE_DISTANCE),
+                        None)
+        if original is None:
+            kept.append(entry)
+        else:
+            entry['duplicate_of'] = original['index']
+            entry['score'] *= DUPLICATE_PENALTY
+    return sorted(entries, key=lambda e: e['score'], reverse=True)
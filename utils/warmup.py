@@ -0,0 +1,242 @@
+"""
+Aquecimento do processo no início do servidor e prontidão para o balanceador de carga.
+Sem aquecimento, o primeiro usuário depois de um deploy paga todos os imports, a montagem
+dos estilos do reportlab, a construção dos clientes genai e os handshakes TLS. Aqui essas
+etapas rodam em segundo plano assim que o servidor sobe, e o estado fica exposto em
+GET /ready (503 até terminar, 200 depois) para o balanceador só mandar tráfego a pods quentes.
+
+Etapas:
+    imports      módulos pesados (google-genai, PIL, reportlab, utils.*)
+    pdf          PitchDeckPDFGenerator e um PDF de exemplo (fontes e estilos do reportlab)
+    schemas      conversão dos response schemas para types.Schema
+    conexoes     clientes do pool de chaves e uma conexão TLS aberta por chave, mantida ociosa por
+                 FORGE_HTTP_KEEPALIVE segundos (padrão 300; FORGE_WARMUP_CONNECT=0 desliga)
+    exemplos     geração dos conceitos de exemplo da página inicial (FORGE_WARMUP_EXAMPLES=1; consome cota)
+
+Uso:
+    python -m utils.warmup serve [argumentos do streamlit]   # aquece, expõe /ready e sobe o app
+    python -m utils.warmup run                               # só aquece e mostra o relatório
+"""
+
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+READY_PORT = int(os.getenv('FORGE_READY_PORT', '8503'))
+
+HEAVY_MODULES = (
+    "google.genai",
+    "PIL.Image",
+    "reportlab.platypus",
+    "utils.gemini_client",
+    "utils.pdf_generator",
+    "utils.tasks",
+    "utils.jobs",
+    "utils.rendering",
+    "utils.sidebar",
+)
+
+# Ideias dos "Exemplos de Conceitos" da página inicial
+EXAMPLE_IDEAS = (
+    "Um jogo de cartas onde os jogadores constroem baralhos baseados em personagens históricos do Rio de Janeiro.",
+    "Um jogo de construção de cidades medievais com foco em diplomacia e comércio.",
+)
+
+# Modelo consultado para abrir a conexão de cada chave (models.get não consome tokens)
+CONNECT_MODEL = "gemini-2.5-flash"
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+# --- Etapas ---
+def _warm_imports():
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+def _placeholder(schema: Dict[str, Any]) -> Any:
+    """Valor mínimo compatível com o schema (um item por lista)."""
+    kind = schema.get("type", "string")
+    if kind == "object":
+        return {key: _placeholder(sub) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_placeholder(schema.get("items", {}))]
+    if kind in ("number", "integer"):
+        return 1
+    if kind == "boolean":
+        return True
+    return "Aquecimento"
+
+def _warm_pdf():
+    from utils.pdf_generator import generate_pitch_deck_pdf
+    from utils.schemas import PITCH_DECK_SCHEMA
+
+    generate_pitch_deck_pdf(_placeholder(PITCH_DECK_SCHEMA)).getvalue()
+
+def _warm_schemas():
+    from google.genai import types
+
+    from utils.schemas import RESPONSE_SCHEMAS, validate_against_schema
+
+    for schema in RESPONSE_SCHEMAS.values():
+        types.Schema.model_validate(schema)
+        types.GenerateContentConfig(response_mime_type='application/json', response_schema=schema)
+        validate_against_schema(_placeholder(schema), schema)
+
+def _warm_connections():
+    from utils.cassette import get_cassette
+    from utils.gemini_client import get_default_client
+    from utils.key_pool import get_key_pool, load_api_keys
+
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        get_default_client()
+        return
+    if not load_api_keys():
+        return
+    get_default_client()
+    if not _flag('FORGE_WARMUP_CONNECT', '1'):
+        return
+    # Abre a conexão TLS de cada chave; ela fica no pool do httpx por FORGE_HTTP_KEEPALIVE segundos
+    for key in get_key_pool().keys:
+        key.client.models.get(model=CONNECT_MODEL)
+
+def _warm_examples():
+    from utils.gemini_client import get_default_client
+
+    client = get_default_client()
+    for idea in EXAMPLE_IDEAS:
+        client.generate_concept(idea)
+
+# Nome, função e se a falha impede o pod de ficar pronto
+STEPS: List[tuple] = [
+    ("imports", _warm_imports, True),
+    ("pdf", _warm_pdf, True),
+    ("schemas", _warm_schemas, True),
+    ("conexoes", _warm_connections, False),
+    ("exemplos", _warm_examples, False),
+]
+
+# --- Estado do aquecimento ---
+_lock = threading.Lock()
+_state: Dict[str, Any] = {'status': 'pending', 'started_at': None, 'finished_at': None, 'steps': []}
+_thread: Optional[threading.Thread] = None
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Executa as etapas de aquecimento em ordem e retorna o relatório.
+
+    Falhas são registradas e não interrompem as etapas seguintes; o processo fica
+    pronto se nenhuma etapa obrigatória falhou.
+    """
+    with _lock:
+        _state.update(status='running', started_at=time.time(), steps=[])
+    failed_required = False
+    for name, step, required in STEPS:
+        if name == "exemplos" and not _flag('FORGE_WARMUP_EXAMPLES', '0'):
+            continue
+        start = time.perf_counter()
+        error = None
+        try:
+            step()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            failed_required = failed_required or required
+        with _lock:
+            _state['steps'].append({'name': name, 'seconds': round(time.perf_counter() - start, 3),
+                                    'error': error, 'required': required})
+    with _lock:
+        _state.update(status='failed' if failed_required else 'ready', finished_at=time.time())
+    return readiness()
+
+def start_warm_up():
+    """Inicia o aquecimento em segundo plano (uma vez por processo)."""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=warm_up, name="forge-warmup", daemon=True)
+    _thread.start()
+
+def is_ready() -> bool:
+    with _lock:
+        return _state['status'] == 'ready'
+
+def readiness() -> Dict[str, Any]:
+    """Estado do aquecimento: status (pending, running, ready, failed) e tempo de cada etapa."""
+    with _lock:
+        return {**_state, 'steps': [dict(step) for step in _state['steps']]}
+
+# --- Endpoint de prontidão ---
+class ReadinessHandler(BaseHTTPRequestHandler):
+    """GET /ready: 200 com o processo aquecido, 503 antes; GET /live: 200 enquanto o processo responde."""
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/live':
+            return self._send_json(HTTPStatus.OK, {'status': 'ok'})
+        if self.path == '/ready':
+            return self._send_json(HTTPStatus.OK if is_ready() else HTTPStatus.SERVICE_UNAVAILABLE, readiness())
+        self._send_json(HTTPStatus.NOT_FOUND, {'error': "rota não encontrada"})
+
+    def log_message(self, format: str, *args):
+        pass
+
+def start_readiness_server(host: str = "0.0.0.0", port: int = READY_PORT) -> ThreadingHTTPServer:
+    """Sobe /ready e /live em uma thread própria."""
+    server = ThreadingHTTPServer((host, port), ReadinessHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="forge-ready", daemon=True).start()
+    return server
+
+# --- CLI ---
+def _serve(streamlit_args: List[str]) -> int:
+    """Sobe o endpoint de prontidão, aquece em segundo plano e roda o Streamlit neste processo."""
+    from streamlit.web import cli as streamlit_cli
+
+    server = start_readiness_server()
+    print(f"Prontidão em http://{server.server_address[0]}:{server.server_address[1]}/ready")
+    start_warm_up()
+    sys.argv = ["streamlit", "run", str(ROOT_DIR / "app.py"), *streamlit_args]
+    return streamlit_cli.main()
+
+def _main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m utils.warmup", description="Aquecimento do Game Concept Forge")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("run", help="Executa o aquecimento e mostra o tempo de cada etapa")
+    subparsers.add_parser("serve", help="Aquece, expõe /ready e sobe o app Streamlit "
+                                        "(os demais argumentos vão para o streamlit run)")
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    if args.command == "serve":
+        return _serve(streamlit_args)
+    if streamlit_args:
+        parser.error(f"argumentos não reconhecidos: {' '.join(streamlit_args)}")
+    report = warm_up()
+    for step in report['steps']:
+        status = f"falhou ({step['error']})" if step['error'] else "ok"
+        print(f"{step['name']:<10} {step['seconds'] * 1000:>8.0f} ms  {status}")
+    print(f"status: {report['status']}")
+    return 0 if report['status'] == 'ready' else 1
+
+if __name__ == "__main__":
+    # Roda pelo módulo importado para o Streamlit ver o mesmo estado de aquecimento
+    from utils.warmup import _main as main
+    sys.exit(main(sys.argv[1:]))
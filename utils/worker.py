@@ -0,0 +1,144 @@
+"""
+forge-worker: pool de processos que executa os jobs da fila SQLite.
+Roda separado do Streamlit, então o número de workers escala independentemente da
+interface. Os workers precisam estar no mesmo host que o arquivo da fila (SQLite em
+modo WAL; ver utils/job_queue.py).
+
+Uso:
+    FORGE_JOB_BACKEND=sqlite streamlit run app.py
+    python -m utils.worker --processes 4
+    python -m utils.worker --queue /srv/forge/jobs.sqlite3 --visibility-timeout 120
+    python -m utils.worker --stats
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from utils.job_queue import DEFAULT_VISIBILITY_TIMEOUT, SQLiteJobQueue, get_queue_path  # noqa: E402
+from utils.jobs import BATCH_META_KEY, followup_target, run_task  # noqa: E402
+from utils.scheduler import call_context  # noqa: E402
+from utils.tracing import attach, current_traceparent, record_span, span  # noqa: E402
+from utils.usage import token_meter  # noqa: E402
+
+class _LeaseKeeper:
+    """Renova o lease do job em segundo plano enquanto ele executa."""
+
+    def __init__(self, queue: SQLiteJobQueue, job_id: str, worker_id: str, visibility_timeout: float):
+        self._queue = queue
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._timeout = visibility_timeout
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self._timeout / 3):
+            if not self._queue.heartbeat(self._job_id, self._worker_id, self._timeout):
+                return
+
+    def __enter__(self) -> "_LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def process_one(queue: SQLiteJobQueue, worker_id: str,
+                visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+    """
+    Reivindica e executa um job.
+
+    Returns:
+        bool: True se havia um job na fila
+    """
+    job = queue.claim(worker_id, visibility_timeout)
+    if job is None:
+        return False
+    # Jobs derivados (ex.: artes do conceito) voltam para a fila, em nome da mesma sessão
+    def followup(task_name, params, label, meta):
+        return queue.enqueue(task_name, job.session_id, params, label=label, meta=meta,
+                             priority=job.priority, trace=current_traceparent())
+
+    # Os spans do job entram no trace da ação que o enviou (gravados em FORGE_TRACE_FILE deste processo)
+    group = (job.meta or {}).get(BATCH_META_KEY)
+    with _LeaseKeeper(queue, job.id, worker_id, visibility_timeout), attach(job.trace), \
+            call_context(job.session_id, job.priority, job.id, group), followup_target(followup), \
+            token_meter() as meter:
+        record_span("jobs.fila", int(job.created_at * 1e9), int(job.started_at * 1e9))
+        try:
+            with span(f"job.{job.task}", job_id=job.id, worker=worker_id):
+                result = run_task(job.task, job.params)
+        except Exception as e:
+            queue.fail(job.id, worker_id, str(e), tokens=meter.total)
+        else:
+            queue.complete(job.id, worker_id, result, tokens=meter.total)
+    return True
+
+def worker_loop(queue_path: str, worker_id: str, visibility_timeout: float, poll_interval: float,
+                max_jobs: Optional[int] = None):
+    """Laço de um processo worker: executa jobs até receber SIGTERM/SIGINT."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    queue = SQLiteJobQueue(Path(queue_path))
+    processed = 0
+    while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+        if process_one(queue, worker_id, visibility_timeout):
+            processed += 1
+        else:
+            stop.wait(poll_interval)
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="forge-worker", description="Executa os jobs da fila do Game Concept Forge")
+    parser.add_argument("--queue", default=str(get_queue_path()), help="Arquivo SQLite da fila")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2, help="Número de processos worker")
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT,
+                        help="Segundos sem renovação até o job voltar para a fila")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Espera entre consultas à fila vazia (s)")
+    parser.add_argument("--max-jobs", type=int, help="Encerra cada processo após N jobs (útil para reciclar memória)")
+    parser.add_argument("--stats", action="store_true", help="Mostra a contagem de jobs por estado e sai")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        for status, count in sorted(SQLiteJobQueue(Path(args.queue)).stats().items()):
+            print(f"{status:<10} {count}")
+        return 0
+
+    host = socket.gethostname()
+    processes = []
+    for index in range(args.processes):
+        worker_id = f"{host}:{os.getpid()}:{index}"
+        process = multiprocessing.Process(
+            target=worker_loop, name=f"forge-worker-{index}",
+            args=(args.queue, worker_id, args.visibility_timeout, args.poll_interval, args.max_jobs)
+        )
+        process.start()
+        processes.append(process)
+    print(f"forge-worker: {len(processes)} processo(s) atendendo {args.queue}")
+
+    def _forward(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    while any(process.is_alive() for process in processes):
+        for process in processes:
+            process.join(timeout=1.0)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))